@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Transaction, Category, Budget, Report
+from .models import Transaction, Category, Budget, Report, MonthlyCategoryTotal, DeletedTransaction, ArchivedTransaction, ArchiveHorizon, RecurringTransaction, CategorizationRule, Notification
+from .forms import RecurringTransactionForm, CategorizationRuleForm
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
@@ -21,6 +22,54 @@ class BudgetAdmin(admin.ModelAdmin):
 
 @admin.register(Report)
 class ReportAdmin(admin.ModelAdmin):
-    list_display = ('user', 'report_type', 'created_at')
-    list_filter = ('report_type', 'created_at')
-    search_fields = ('user__username',)
\ No newline at end of file
+    list_display = ('user', 'report_type', 'status', 'created_at', 'started_at')
+    list_filter = ('report_type', 'status', 'created_at')
+    search_fields = ('user__username',)
+
+@admin.register(MonthlyCategoryTotal)
+class MonthlyCategoryTotalAdmin(admin.ModelAdmin):
+    list_display = ('user', 'year', 'month', 'category', 'is_income', 'total', 'count')
+    list_filter = ('is_income', 'year')
+    search_fields = ('user__username',)
+
+@admin.register(DeletedTransaction)
+class DeletedTransactionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'transaction_id', 'deleted_at')
+    list_filter = ('deleted_at',)
+    search_fields = ('user__username',)
+
+@admin.register(ArchivedTransaction)
+class ArchivedTransactionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'amount', 'category', 'date', 'is_income', 'archived_at')
+    list_filter = ('is_income', 'date')
+    search_fields = ('description', 'user__username')
+
+@admin.register(ArchiveHorizon)
+class ArchiveHorizonAdmin(admin.ModelAdmin):
+    list_display = ('user', 'before', 'updated_at')
+    search_fields = ('user__username',)
+
+@admin.register(RecurringTransaction)
+class RecurringTransactionAdmin(admin.ModelAdmin):
+    form = RecurringTransactionForm
+    # The form leaves user out, since views set it from the request
+    fields = ('user', 'description', 'amount', 'category', 'is_income', 'rule', 'start_date', 'end_date', 'active',
+              'next_date', 'last_occurrence')
+    list_display = ('user', 'description', 'amount', 'rule', 'next_date', 'active')
+    list_filter = ('active', 'is_income')
+    search_fields = ('description', 'user__username')
+    readonly_fields = ('next_date', 'last_occurrence')
+
+@admin.register(CategorizationRule)
+class CategorizationRuleAdmin(admin.ModelAdmin):
+    form = CategorizationRuleForm
+    fields = ('user', 'pattern', 'match_type', 'min_amount', 'max_amount', 'is_income', 'category', 'priority', 'active')
+    list_display = ('user', 'pattern', 'match_type', 'category', 'priority', 'active')
+    list_filter = ('match_type', 'active')
+    search_fields = ('pattern', 'user__username')
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'kind', 'message', 'created_at', 'read_at')
+    list_filter = ('kind', 'created_at')
+    search_fields = ('message', 'user__username')
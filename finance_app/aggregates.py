@@ -0,0 +1,90 @@
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db.models import Q, Sum
+
+from .models import Transaction, Budget
+from . import rollups
+
+
+@dataclass
+class CategorySeries:
+    category_id: int
+    name: str
+    expenses: Decimal = Decimal('0')
+    budget: Decimal = Decimal('0')
+
+
+@dataclass
+class DashboardSummary:
+    start_date: object
+    end_date: object
+    total_income: Decimal = Decimal('0')
+    transaction_expenses: Decimal = Decimal('0')
+    budget_expenses: Decimal = Decimal('0')
+    categories: list = field(default_factory=list)
+    budgets: list = field(default_factory=list)
+
+    @property
+    def balance(self):
+        return self.total_income - self.transaction_expenses
+
+    def chart_data(self):
+        """Category series in the shape expected by the dashboard chart"""
+        return {
+            'labels': [c.name for c in self.categories],
+            'expenses': [float(c.expenses) for c in self.categories],
+            'budgets': [float(c.budget) for c in self.categories],
+        }
+
+
+def get_dashboard_summary(user, start_date, end_date):
+    """
+    Income, expense and budget totals for a calendar month, plus the
+    per-category expense/budget series. Transaction totals come from the
+    monthly rollup, budgets from one grouped query.
+    """
+    summary = DashboardSummary(start_date=start_date, end_date=end_date)
+    series = {}
+
+    transaction_rows = rollups.month_by_category(user, start_date.year, start_date.month)
+
+    for row in transaction_rows:
+        income = row['income'] or Decimal('0')
+        expenses = row['expenses'] or Decimal('0')
+        summary.total_income += income
+        summary.transaction_expenses += expenses
+        if row['category_id'] is not None and expenses > 0:
+            series[row['category_id']] = CategorySeries(
+                category_id=row['category_id'],
+                name=row['category__name'],
+                expenses=expenses,
+            )
+
+    budget_rows = Budget.objects.filter(
+        user=user,
+        start_date__lte=end_date,
+        end_date__gte=start_date
+    ).values('category_id', 'category__name').annotate(
+        total=Sum('amount')
+    ).order_by()
+
+    for row in budget_rows:
+        total = row['total'] or Decimal('0')
+        summary.budget_expenses += total
+        if total > 0:
+            entry = series.setdefault(row['category_id'], CategorySeries(
+                category_id=row['category_id'],
+                name=row['category__name'],
+            ))
+            entry.budget = total
+
+    # Keep the chart in category creation order, as the per-category loop did
+    summary.categories = [series[pk] for pk in sorted(series)]
+    # Only the budgets of this month, not every one the user ever had
+    summary.budgets = list(Budget.objects.filter(
+        user=user,
+        start_date__lte=end_date,
+        end_date__gte=start_date
+    ).select_related('category').order_by('category__name', 'start_date'))
+    return summary
@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class FinanceAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'finance_app'
+
+    def ready(self):
+        from . import database, signals  # noqa: F401
+        checks.register(database.check_search_triggers, checks.Tags.database)
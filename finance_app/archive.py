@@ -0,0 +1,112 @@
+"""
+Archival of old transactions. archive_user() moves a user's transactions
+dated before a horizon into ArchivedTransaction, in batches that each
+commit on their own so an interrupted run can simply be repeated. Ids are
+kept, and the monthly rollup and budget spending are left untouched since
+both go on counting archived rows.
+
+Reads go through older()/sources(), which add the archive table only when
+the requested range starts before the user's horizon. Archived transactions
+are read-only; restore_user() moves them back.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchiveHorizon, ArchivedTransaction, Transaction
+from . import user_cache
+
+DEFAULT_BATCH_SIZE = 500
+COPIED_FIELDS = (
+    'id', 'user_id', 'amount', 'category_id', 'description', 'date',
+    'created_at', 'updated_at', 'is_income', 'transaction_type', 'recurring_id', 'occurrence',
+)
+
+
+def horizon(months=None, today=None):
+    """First day of the month ``months`` (TRANSACTION_ARCHIVE_MONTHS) before this one"""
+    if months is None:
+        months = getattr(settings, 'TRANSACTION_ARCHIVE_MONTHS', 24)
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def archived_before(user):
+    return ArchiveHorizon.objects.filter(user=user).values_list('before', flat=True).first()
+
+
+# ============== Reads ==============
+def older(user, start_date=None):
+    """
+    (archived queryset, horizon) when a range starting at ``start_date``
+    (None for all time) reaches the user's archive, else None. Every
+    archived row is dated before the horizon.
+    """
+    before = archived_before(user)
+    if before is None or (start_date is not None and start_date >= before):
+        return None
+    return ArchivedTransaction.objects.filter(user=user).select_related('category'), before
+
+
+def sources(user, start_date=None):
+    """Querysets holding the user's transactions from ``start_date`` on: the live table, then the archive if reached"""
+    parts = [Transaction.objects.filter(user=user)]
+    archived = older(user, start_date)
+    if archived is not None:
+        parts.append(archived[0])
+    return parts
+
+
+# ============== Moving rows ==============
+def _move(source, target, batch_size, **values):
+    """Move ``source`` rows into the ``target`` model one committed batch at a time"""
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(source.order_by('date', 'pk').values(*COPIED_FIELDS)[:batch_size])
+            if not rows:
+                return moved
+            target.objects.bulk_create([target(**row, **values) for row in rows])
+            # bulk_create stamps auto_now_add fields with the current time
+            stamped = [field.name for field in target._meta.concrete_fields if getattr(field, 'auto_now_add', False)]
+            if stamped:
+                target.objects.bulk_update(
+                    [target(id=row['id'], **{name: row[name] for name in stamped}) for row in rows], stamped
+                )
+            # Raw delete: the move must not fire the signals that update
+            # rollups, budgets and sync tombstones
+            source.model.objects.filter(pk__in=[row['id'] for row in rows])._raw_delete(source.db)
+        moved += len(rows)
+
+
+def archive_user(user, before, batch_size=DEFAULT_BATCH_SIZE):
+    """Archive the user's transactions dated before ``before``; returns the number moved"""
+    # The horizon is raised first, so reads include the archive while rows move
+    with transaction.atomic():
+        state, created = ArchiveHorizon.objects.select_for_update().get_or_create(
+            user=user, defaults={'before': before}
+        )
+        if not created and state.before < before:
+            state.before = before
+            state.save(update_fields=['before', 'updated_at'])
+
+    moved = _move(
+        Transaction.objects.filter(user=user, date__lt=before), ArchivedTransaction, batch_size,
+        archived_at=timezone.now(),
+    )
+    if moved:
+        user_cache.bump_version(user.pk)
+    return moved
+
+
+def restore_user(user, batch_size=DEFAULT_BATCH_SIZE):
+    """Move all of the user's archived transactions back to the live table"""
+    moved = _move(ArchivedTransaction.objects.filter(user=user), Transaction, batch_size)
+    # Only once the archive is empty can reads stop looking at it
+    ArchiveHorizon.objects.filter(user=user).delete()
+    if moved:
+        user_cache.bump_version(user.pk)
+    return moved
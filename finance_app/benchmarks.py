@@ -0,0 +1,187 @@
+"""
+Load-test benchmarks. A synthetic dataset is provisioned and the main views
+and API endpoints are driven through the test client, recording latency
+percentiles, query counts and peak memory per endpoint. Results are plain
+JSON so runs can be compared against a stored baseline.
+"""
+import platform
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Transaction
+from .utils import percentile
+from . import provisioning
+
+# Relative slowdown of p95 latency or peak memory reported as a regression,
+# and the absolute change below which latency differences are noise
+DEFAULT_THRESHOLD = 0.25
+MIN_LATENCY_DELTA_MS = 2.0
+
+
+@dataclass
+class Dataset:
+    users: int = 3
+    categories: int = 12
+    years: int = 2
+    per_month: int = 60
+    budget_months: int = 12
+    seed: int = 0
+
+    @property
+    def transactions_per_user(self):
+        return self.years * 12 * self.per_month
+
+
+def build_dataset(spec):
+    """Provision the benchmark users; returns the one the scenarios log in as"""
+    provisioning.provision_users(
+        spec.users,
+        prefix='bench',
+        categories=[(f"Category {index + 1}", index % 4 == 0) for index in range(spec.categories)],
+        transactions=spec.transactions_per_user,
+        years=spec.years,
+        budget_months=spec.budget_months,
+        seed=spec.seed,
+    )
+    return User.objects.get(username='bench1')
+
+
+def scenarios(today=None):
+    """(name, method, url, data) for every benchmarked endpoint"""
+    today = today or date.today()
+    last_year = (today - timedelta(days=365)).isoformat()
+    last_month = (today - timedelta(days=30)).isoformat()
+    return [
+        ('dashboard', 'get', reverse('dashboard'), {}),
+        ('transaction_list', 'get', reverse('transactions'), {}),
+        ('budget_list', 'get', reverse('budget_list'), {}),
+        ('expense_list', 'get', reverse('expense_list'), {}),
+        ('report_monthly_html', 'post', reverse('generate_report'), {
+            'report_type': 'monthly', 'start_date': last_year, 'end_date': today.isoformat(), 'format': 'html',
+        }),
+        ('report_category_json', 'post', reverse('generate_report'), {
+            'report_type': 'category', 'start_date': last_year, 'end_date': today.isoformat(), 'format': 'json',
+        }),
+        ('report_transactions_csv', 'post', reverse('generate_report'), {
+            'report_type': 'transactions', 'start_date': last_month, 'end_date': today.isoformat(), 'format': 'csv',
+        }),
+        # The longest exports still streamed inline (see REPORT_BACKGROUND_AFTER_DAYS); their
+        # peak memory should stay flat as --per-month grows
+        ('export_transactions_csv', 'post', reverse('generate_report'), {
+            'report_type': 'transactions', 'start_date': last_year, 'end_date': today.isoformat(), 'format': 'csv',
+        }),
+        ('export_transactions_ndjson', 'post', reverse('generate_report'), {
+            'report_type': 'transactions', 'start_date': last_year, 'end_date': today.isoformat(), 'format': 'ndjson',
+        }),
+        ('api_transactions', 'get', reverse('api_transactions'), {'page_size': 100}),
+        ('api_summary', 'get', reverse('api_summary'), {}),
+        ('api_forecast', 'get', reverse('api_forecast'), {}),
+    ]
+
+
+def _request(client, method, url, data):
+    """Issue one request and read the whole body; returns (status, bytes)"""
+    response = getattr(client, method)(url, data)
+    if response.streaming:
+        # Chunk by chunk, like a client would, so peak memory is the server's alone
+        return response.status_code, sum(len(chunk) for chunk in response.streaming_content)
+    return response.status_code, len(response.content)
+
+
+def measure(client, method, url, data, iterations=20):
+    """Latency, query and memory figures for one endpoint"""
+    queries = []
+
+    def count(execute, *args):
+        queries[-1] += 1
+        return execute(*args)
+
+    timings = []
+    with connection.execute_wrapper(count):
+        for _ in range(iterations + 1):
+            queries.append(0)
+            started = time.perf_counter()
+            status, size = _request(client, method, url, data)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    # Memory is measured on its own run since tracemalloc slows everything down
+    tracemalloc.start()
+    try:
+        _request(client, method, url, data)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    # The first request runs against a cold cache and is reported separately
+    first, timings = timings[0], timings[1:]
+    return {
+        'status': status,
+        'bytes': size,
+        'first_ms': round(first, 2),
+        'mean_ms': round(statistics.fmean(timings), 2),
+        'p50_ms': round(percentile(timings, 0.50), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'p99_ms': round(percentile(timings, 0.99), 2),
+        'max_ms': round(max(timings), 2),
+        'queries': int(statistics.median(queries[1:])),
+        'first_queries': queries[0],
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run(spec, iterations=20, only=None, progress=None):
+    """Build the dataset and benchmark every scenario; returns the results document"""
+    user = build_dataset(spec)
+    client = Client(raise_request_exception=False)
+    client.force_login(user)
+
+    results = {}
+    for name, method, url, data in scenarios():
+        if only and name not in only:
+            continue
+        results[name] = measure(client, method, url, data, iterations)
+        if progress:
+            progress(name, results[name])
+
+    return {
+        'created_at': timezone.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'debug': settings.DEBUG,
+        },
+        'dataset': dict(asdict(spec), transactions=Transaction.objects.count()),
+        'iterations': iterations,
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Regressions of ``current`` against ``baseline``, as readable strings"""
+    regressions = []
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            continue
+        if result['status'] != before['status']:
+            regressions.append(f"{name}: status {before['status']} -> {result['status']}")
+        if result['queries'] > before['queries']:
+            regressions.append(f"{name}: queries {before['queries']} -> {result['queries']}")
+        delta = result['p95_ms'] - before['p95_ms']
+        if delta > MIN_LATENCY_DELTA_MS and delta > threshold * before['p95_ms']:
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result['peak_kb'] > (1 + threshold) * before['peak_kb']:
+            regressions.append(f"{name}: peak memory {before['peak_kb']}KB -> {result['peak_kb']}KB")
+    return regressions
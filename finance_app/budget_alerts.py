@@ -0,0 +1,118 @@
+"""
+Budget alerts. Writes that change budgets' spending note what they touched
+(categories and a date range) with touched(); once the surrounding
+transaction commits, flush() evaluates every budget that could have been
+affected against BUDGET_ALERT_THRESHOLDS (percent of the amount spent) in
+one query, however many rows or batches the write had. A Notification is
+stored for each budget that crossed a threshold.
+
+A budget's alerted_threshold is the highest threshold already notified, so
+each crossing alerts once; jumping past several at once notifies the
+highest. When spending falls back below it (or the amount is raised) it is
+lowered again, and crossing it again alerts again. Budgets whose period is
+over aren't evaluated, so importing an old statement doesn't alert about
+past months.
+"""
+import threading
+from collections import defaultdict
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Budget, Notification
+
+DEFAULT_THRESHOLDS = (70, 90, 100)
+
+_pending = threading.local()
+
+
+def thresholds():
+    return sorted(set(getattr(settings, 'BUDGET_ALERT_THRESHOLDS', DEFAULT_THRESHOLDS)))
+
+
+def _message(category, level, spent, amount):
+    if level >= 100:
+        return f"{category} budget is used up: ${spent:,.2f} of ${amount:,.2f} spent"
+    return f"{category} budget has reached {level}%: ${spent:,.2f} of ${amount:,.2f} spent"
+
+
+def evaluate(budgets, today=None):
+    """Bring ``budgets`` (a queryset) up to date with the thresholds; returns the notifications created"""
+    today = today or date.today()
+    levels = thresholds()
+    with transaction.atomic():
+        rows = budgets.filter(end_date__gte=today).select_for_update(of=('self',)).values_list(
+            'pk', 'user_id', 'category__name', 'amount', 'spent', 'alerted_threshold'
+        )
+        notifications, moves = [], defaultdict(list)
+        for pk, user_id, category, amount, spent, alerted in rows:
+            spent = spent or 0
+            percent = spent * 100 / amount
+            level = max((threshold for threshold in levels if percent >= threshold), default=0)
+            if level == alerted:
+                continue
+            moves[level].append(pk)
+            if level > alerted:
+                notifications.append(Notification(
+                    user_id=user_id,
+                    kind=Notification.BUDGET_ALERT,
+                    budget_id=pk,
+                    threshold=level,
+                    message=_message(category, level, spent, amount),
+                ))
+        # One UPDATE per level rather than per budget
+        for level, ids in moves.items():
+            Budget.objects.filter(pk__in=ids).update(alerted_threshold=level)
+        Notification.objects.bulk_create(notifications)
+    return notifications
+
+
+# ============== Debounced evaluation ==============
+def touched(category_ids, first, last):
+    """
+    Note that spending of these categories between ``first`` and ``last``
+    changed. Everything noted before the transaction commits is evaluated
+    together (at once outside a transaction).
+    """
+    category_ids = {category_id for category_id in category_ids if category_id is not None}
+    if not category_ids:
+        return
+    state = getattr(_pending, 'state', None)
+    if state is None:
+        state = _pending.state = [category_ids, first, last, None]
+    else:
+        state[0] |= category_ids
+        state[1] = min(state[1], first)
+        state[2] = max(state[2], last)
+    # One callback per transaction, registered again only if rolling back a
+    # savepoint (or the transaction) dropped it
+    if not _queued(state[3]):
+        state[3] = _register()
+
+
+def _register():
+    def callback():
+        flush()
+    # An alert failing mustn't fail the write that was just committed
+    transaction.on_commit(callback, robust=True)
+    return callback
+
+
+def _queued(callback):
+    """Whether ``callback`` is still waiting for the current transaction to commit"""
+    connection = transaction.get_connection()
+    return callback is not None and connection.in_atomic_block and any(
+        function is callback for _, function, _ in connection.run_on_commit
+    )
+
+
+def flush():
+    """Evaluate everything noted by touched() so far"""
+    state = getattr(_pending, 'state', None)
+    if state is None:
+        return []
+    _pending.state = None
+    category_ids, first, last, _ = state
+    # Categories belong to one user, so they pick out the budgets on their own
+    return evaluate(Budget.objects.filter(category_id__in=category_ids, start_date__lte=last, end_date__gte=first))
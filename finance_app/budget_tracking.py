@@ -0,0 +1,114 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import ArchivedTransaction, Budget, Transaction
+from . import budget_alerts
+
+
+SPENT_FIELD = DecimalField(max_digits=10, decimal_places=2)
+
+
+def _spent_subquery(model):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            user=OuterRef('user'),
+            category=OuterRef('category'),
+            is_income=False,
+            date__gte=OuterRef('start_date'),
+            date__lte=OuterRef('end_date')
+        ).order_by().values('category').annotate(total=Sum('amount')).values('total'),
+        output_field=SPENT_FIELD
+    ), Value(Decimal('0')), output_field=SPENT_FIELD)
+
+
+def actual_spent():
+    """Expression for a budget's spending computed from its live and archived transactions"""
+    return ExpressionWrapper(
+        _spent_subquery(Transaction) + _spent_subquery(ArchivedTransaction), output_field=SPENT_FIELD
+    )
+
+
+def compute_spent(budget):
+    total = Decimal('0')
+    for model in (Transaction, ArchivedTransaction):
+        total += model.objects.filter(
+            user_id=budget.user_id,
+            category_id=budget.category_id,
+            is_income=False,
+            date__range=[budget.start_date, budget.end_date]
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    return total
+
+
+def _apply(user_id, day, category_id, amount):
+    Budget.objects.filter(
+        user_id=user_id,
+        category_id=category_id,
+        start_date__lte=day,
+        end_date__gte=day
+    ).update(spent=Coalesce(F('spent'), Value(Decimal('0'))) + amount)
+    budget_alerts.touched({category_id}, day, day)
+
+
+def record_change(old, new):
+    """
+    Update the stored spending of every budget covering an expense. ``old``
+    and ``new`` are rollups.snapshot() tuples taken before and after the
+    write, or None.
+    """
+    if old == new:
+        return
+    with transaction.atomic():
+        if old is not None:
+            user_id, day, category_id, is_income, amount = old
+            if not is_income and category_id is not None:
+                _apply(user_id, day, category_id, -Decimal(amount))
+        if new is not None:
+            user_id, day, category_id, is_income, amount = new
+            if not is_income and category_id is not None:
+                _apply(user_id, day, category_id, Decimal(amount))
+
+
+def record_changes(changes):
+    """
+    record_change() for a batch of (old, new) snapshot pairs: recomputes
+    the budgets the batch's expenses fall into with one reconcile().
+    """
+    categories, days = set(), []
+    for old, new in changes:
+        if old == new:
+            continue
+        for snap in (old, new):
+            if snap is not None and not snap[3] and snap[2] is not None:
+                categories.add(snap[2])
+                days.append(snap[1])
+    if not days:
+        return 0
+    # Categories belong to one user, so they pick out the budgets on their
+    # own; adding user_id__in makes SQLite probe every user/category pair
+    updated = reconcile(Budget.objects.filter(
+        category_id__in=categories,
+        start_date__lte=max(days),
+        end_date__gte=min(days)
+    ))
+    budget_alerts.touched(categories, min(days), max(days))
+    return updated
+
+
+def find_drift(budgets=None):
+    """Budgets whose stored spending differs from their transactions"""
+    if budgets is None:
+        budgets = Budget.objects.all()
+    return budgets.annotate(actual=actual_spent()).filter(
+        Q(spent__isnull=True) | ~Q(spent=F('actual'))
+    )
+
+
+def reconcile(budgets=None):
+    """Recompute stored spending in a single UPDATE; returns rows updated"""
+    if budgets is None:
+        budgets = Budget.objects.all()
+    return budgets.update(spent=actual_spent())
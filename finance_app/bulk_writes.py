@@ -0,0 +1,149 @@
+"""
+Batch create/update/delete of transactions for the bulk API. Each batch is
+validated item by item against data loaded once for the whole batch, and
+the valid items are written together in one transaction; invalid items are
+reported back by index without failing the rest. bulk_create/bulk_update
+skip signals, so the rollup, budget spending, cache version and deletion
+log are updated here once per batch.
+"""
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Category, Transaction
+from .serializers import TransactionWriteSerializer
+from . import budget_tracking, categorization, rollups, sync, user_cache
+
+
+@dataclass
+class BulkResult:
+    objects: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+    def error(self, index, errors):
+        self.errors.append({'index': index, 'errors': errors})
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _category_map(user, items):
+    """The user's categories referenced by a batch, in one query"""
+    ids = {_as_id(item.get('category_id')) for item in items if isinstance(item, dict)} - {None}
+    if not ids:
+        return {}
+    return Category.objects.filter(user=user, pk__in=ids).in_bulk()
+
+
+def _transaction_type(is_income):
+    return Transaction.INCOME if is_income else Transaction.EXPENSE
+
+
+def _after_write(user, changes):
+    if not changes:
+        return
+    rollups.record_changes(changes)
+    budget_tracking.record_changes(changes)
+    user_cache.bump_version(user.pk)
+
+
+def create(user, items):
+    result = BulkResult()
+    categories = _category_map(user, items)
+    for index, item in enumerate(items):
+        serializer = TransactionWriteSerializer(data=item, context={'categories': categories})
+        if not serializer.is_valid():
+            result.error(index, serializer.errors)
+            continue
+        data = serializer.validated_data
+        instance = Transaction(user=user, transaction_type=_transaction_type(data.get('is_income', False)), **data)
+        instance.category = categories.get(instance.category_id)
+        result.objects.append(instance)
+
+    # Items sent without a category get one from the user's rules
+    matched = categorization.categorize(user.pk, result.objects)
+    if matched:
+        found = Category.objects.filter(user=user, pk__in={instance.category_id for instance in matched}).in_bulk()
+        for instance in matched:
+            instance.category = found.get(instance.category_id)
+
+    with transaction.atomic():
+        Transaction.objects.bulk_create(result.objects)
+        _after_write(user, [(None, rollups.snapshot(instance)) for instance in result.objects])
+    return result
+
+
+def update(user, items):
+    """Partial updates; every item needs the ``id`` of one of the user's transactions"""
+    result = BulkResult()
+    categories = _category_map(user, items)
+    ids = [_as_id(item.get('id')) if isinstance(item, dict) else None for item in items]
+    existing = Transaction.objects.filter(
+        user=user, pk__in={pk for pk in ids if pk is not None}
+    ).select_related('category').in_bulk()
+
+    changes, fields, seen = [], set(), set()
+    now = timezone.now()
+    for index, (item, pk) in enumerate(zip(items, ids)):
+        instance = existing.get(pk)
+        if instance is None:
+            result.error(index, {'id': ['Not found.']})
+            continue
+        if pk in seen:
+            result.error(index, {'id': ['Duplicate id in batch.']})
+            continue
+        serializer = TransactionWriteSerializer(
+            instance, data=item, partial=True, context={'categories': categories}
+        )
+        if not serializer.is_valid():
+            result.error(index, serializer.errors)
+            continue
+        seen.add(pk)
+
+        before = rollups.snapshot(instance)
+        for name, value in serializer.validated_data.items():
+            setattr(instance, name, value)
+            fields.add(name)
+        if 'category_id' in serializer.validated_data:
+            instance.category = categories.get(instance.category_id)
+        instance.transaction_type = _transaction_type(instance.is_income)
+        instance.updated_at = now
+        changes.append((before, rollups.snapshot(instance)))
+        result.objects.append(instance)
+
+    if result.objects:
+        with transaction.atomic():
+            Transaction.objects.bulk_update(result.objects, sorted(fields | {'transaction_type', 'updated_at'}))
+            _after_write(user, changes)
+    return result
+
+
+def delete(user, ids):
+    result = BulkResult()
+    ids = [_as_id(pk) for pk in ids]
+    rows = {
+        row[0]: row[1:] for row in Transaction.objects.filter(
+            user=user, pk__in={pk for pk in ids if pk is not None}
+        ).values_list('pk', *rollups.ROLLUP_FIELDS)
+    }
+    seen = set()
+    for index, pk in enumerate(ids):
+        if pk not in rows:
+            result.error(index, {'id': ['Not found.']})
+        elif pk not in seen:
+            seen.add(pk)
+            result.objects.append(pk)
+
+    if result.objects:
+        with transaction.atomic():
+            # Nothing references transactions, so the per-row delete signals
+            # can be skipped like they are for bulk_create
+            Transaction.objects.filter(pk__in=result.objects)._raw_delete(Transaction.objects.db)
+            sync.record_deletions(user.pk, result.objects)
+            _after_write(user, [(rows[pk], None) for pk in result.objects])
+    return result
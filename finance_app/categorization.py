@@ -0,0 +1,223 @@
+"""
+Rule-based categorization. A user's active CategorizationRules are compiled
+into a Matcher: "contains" rules into one Aho-Corasick automaton that finds
+every keyword in a description in a single pass, and regex rules into one
+combined pattern that rules them all out with a single search. Only the
+rules that survive are checked individually, in priority order, so a batch
+costs one pass per description rather than one test per rule per row.
+
+Matchers are cached per process, keyed by the user's rules_version, which
+signals.py bumps whenever a rule is saved or deleted.
+
+New transactions without a category go through categorize(): single saves
+from signals.py, and the bulk API and statement imports per batch.
+recategorize() applies the rules to the stored uncategorized transactions.
+"""
+import logging
+import re
+from collections import defaultdict, deque
+from functools import lru_cache
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import CategorizationRule, Transaction
+from . import budget_tracking, rollups, user_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+# None of these survive being combined with other rules' patterns (matching
+# is case-insensitive anyway, and scoped flags like (?s:...) still work)
+UNSUPPORTED_SYNTAX = re.compile(r'\\[1-9]|\(\?P[<=]|\(\?[aiLmsux]+\)')
+
+
+class InvalidPattern(ValueError):
+    pass
+
+
+def validate_pattern(match_type, pattern):
+    if match_type != CategorizationRule.REGEX or not pattern:
+        return
+    if UNSUPPORTED_SYNTAX.search(pattern):
+        raise InvalidPattern('Named groups, backreferences and inline flags are not supported')
+    try:
+        re.compile(pattern)
+    except re.error as exc:
+        raise InvalidPattern(f'Invalid regular expression: {exc}') from exc
+
+
+class _Automaton:
+    """Aho-Corasick automaton: every (keyword, value) whose keyword occurs in a text, in one pass over it"""
+    def __init__(self, keywords):
+        self.goto, self.fail, self.out = [{}], [0], [()]
+        for keyword, value in keywords:
+            state = 0
+            for char in keyword:
+                following = self.goto[state].get(char)
+                if following is None:
+                    following = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                    self.goto[state][char] = following
+                state = following
+            self.out[state] += (value,)
+
+        # Failure links breadth first, so a state's fallback is complete before its children
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self.goto[state].items():
+                queue.append(following)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[following] = self.goto[fallback].get(char, 0)
+                self.out[following] += self.out[self.fail[following]]
+
+    def find(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class Matcher:
+    """A user's active rules compiled for matching many transactions"""
+    def __init__(self, rules):
+        self.rules = []
+        self.unconditional = set()
+        self.regexes = {}
+        keywords, alternatives = [], []
+        for rule in rules:
+            index = len(self.rules)
+            if not rule.pattern:
+                self.unconditional.add(index)
+            elif rule.match_type == CategorizationRule.REGEX:
+                try:
+                    validate_pattern(rule.match_type, rule.pattern)
+                except InvalidPattern:
+                    logger.warning("Skipping categorization rule %s with an invalid pattern", rule.pk)
+                    continue
+                self.regexes[index] = re.compile(rule.pattern, re.IGNORECASE)
+                alternatives.append(f'(?:{rule.pattern})')
+            else:
+                keywords.append((rule.pattern.lower(), index))
+            self.rules.append((rule.category_id, rule.min_amount, rule.max_amount, rule.is_income))
+
+        self.automaton = _Automaton(keywords) if keywords else None
+        self.prefilter = re.compile('|'.join(alternatives), re.IGNORECASE) if alternatives else None
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def _candidates(self, description):
+        """Indexes of the rules that may match ``description``, in priority order"""
+        found = self.automaton.find(description.lower()) if self.automaton else set()
+        # Keyword hits are exact; regex rules are all candidates once any of them matches
+        regexes = self.regexes if self.prefilter and self.prefilter.search(description) else {}
+        return sorted(found | self.unconditional | regexes.keys())
+
+    def match(self, description, amount, is_income, candidates=None):
+        """Category id of the first rule by priority that matches, or None"""
+        if candidates is None:
+            candidates = self._candidates(description or '')
+        for index in candidates:
+            category_id, min_amount, max_amount, rule_income = self.rules[index]
+            if rule_income is not None and rule_income != is_income:
+                continue
+            if (min_amount is not None and amount < min_amount) or (max_amount is not None and amount > max_amount):
+                continue
+            if index in self.regexes and not self.regexes[index].search(description or ''):
+                continue
+            return category_id
+        return None
+
+    def apply(self, transactions):
+        """Set the category of the uncategorized ``transactions`` that match; returns those changed"""
+        changed = []
+        seen = {}
+        for instance in transactions:
+            if instance.category_id is not None:
+                continue
+            description = instance.description or ''
+            # Statements repeat descriptions a lot; the text part only depends on it
+            if description not in seen:
+                seen[description] = self._candidates(description)
+            category_id = self.match(description, instance.amount, instance.is_income, seen[description])
+            if category_id is not None:
+                instance.category_id = category_id
+                changed.append(instance)
+        return changed
+
+
+@lru_cache(maxsize=256)
+def _compiled(user_id, version):
+    return Matcher(CategorizationRule.objects.filter(user_id=user_id, active=True).order_by('priority', 'pk'))
+
+
+def matcher_for(user_id):
+    """The user's compiled rules, recompiled only after they change"""
+    # The version is read before the rules, so a cached Matcher is never older than its key
+    return _compiled(user_id, user_cache.get_version(user_id, 'rules_version'))
+
+
+def categorize(user_id, transactions):
+    """Categorize unsaved uncategorized transactions of one user; returns those changed"""
+    transactions = [instance for instance in transactions if instance.category_id is None]
+    if not transactions:
+        return []
+    matcher = matcher_for(user_id)
+    return matcher.apply(transactions) if matcher else []
+
+
+# ============== Stored transactions ==============
+def recategorize(user, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """
+    Apply the user's rules to their stored uncategorized transactions, one
+    committed batch at a time; returns the number categorized. Archived
+    transactions are left alone.
+    """
+    matcher = matcher_for(user.pk)
+    if not matcher:
+        return 0
+    uncategorized = Transaction.objects.filter(user=user, category__isnull=True).order_by('pk')
+    total, last_pk = 0, 0
+    while True:
+        with transaction.atomic():
+            rows = list(uncategorized.select_for_update().filter(pk__gt=last_pk).values_list(
+                'pk', 'date', 'description', 'amount', 'is_income'
+            )[:batch_size])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+
+            groups, changes = defaultdict(list), []
+            for pk, day, description, amount, is_income in rows:
+                category_id = matcher.match(description, amount, is_income)
+                if category_id is not None:
+                    groups[category_id].append(pk)
+                    changes.append((
+                        (user.pk, day, None, is_income, amount),
+                        (user.pk, day, category_id, is_income, amount),
+                    ))
+            total += len(changes)
+            if dry_run or not changes:
+                continue
+            # One UPDATE per category; updated_at moves so sync clients pick the change up
+            now = timezone.now()
+            for category_id, ids in groups.items():
+                Transaction.objects.filter(pk__in=ids).update(category_id=category_id, updated_at=now)
+            rollups.record_changes(changes)
+            budget_tracking.record_changes(changes)
+
+    if total and not dry_run:
+        user_cache.bump_version(user.pk)
+    return total
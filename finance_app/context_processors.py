@@ -0,0 +1,9 @@
+from .models import Notification
+
+
+def notifications(request):
+    """Unread notification count for the navigation bar"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'unread_notifications': Notification.objects.filter(user=user, read_at__isnull=True).count()}
@@ -0,0 +1,178 @@
+"""
+Database backend support. Every new SQLite connection is switched to WAL
+with relaxed fsyncs, a busy timeout and larger page/mmap caches, so gunicorn
+workers can read while another one writes instead of queueing on the
+database lock.
+
+The date functions below compile to the backend's native SQL: EXTRACT and
+date_trunc on PostgreSQL, strftime()/date() on SQLite, where Django's own
+versions call back into Python for every row.
+"""
+from django.conf import settings
+from django.core import checks
+from django.db import connections
+from django.db.models.functions import ExtractMonth, ExtractYear, TruncDay as _TruncDay, TruncWeek as _TruncWeek
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_pragmas():
+    """The defaults above with any overrides from settings.SQLITE_PRAGMAS"""
+    return {**SQLITE_PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+
+
+def apply_sqlite_pragmas(cursor, pragmas=None):
+    """Run the PRAGMA statements on a DB-API cursor"""
+    for name, value in (sqlite_pragmas() if pragmas is None else pragmas).items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def configure_connection(connection):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            apply_sqlite_pragmas(cursor)
+
+
+# ============== Portable date functions ==============
+class Year(ExtractYear):
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.lhs)
+        return f"CAST(strftime('%%Y', {sql}) AS INTEGER)", params
+
+
+class Month(ExtractMonth):
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.lhs)
+        return f"CAST(strftime('%%m', {sql}) AS INTEGER)", params
+
+
+class TruncDay(_TruncDay):
+    """Day of a date or datetime column; a no-op for DateFields on SQLite"""
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.lhs)
+        return f"date({sql})", params
+
+
+class TruncWeek(_TruncWeek):
+    """Monday starting the week, as date_trunc('week') gives on PostgreSQL"""
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.lhs)
+        return f"date({sql}, '-6 days', 'weekday 1')", params
+
+
+# ============== Backend-specific indexes ==============
+# Partial indexes only pay off where the planner can match their predicate
+# against a bound parameter; SQLite can't, so it keeps using the full
+# txn_user_type_date_idx / txn_user_category_date_idx from the models.
+POSTGRES_PARTIAL_INDEXES = [
+    ('txn_expense_user_cat_date_pidx', 'finance_app_transaction', '(user_id, category_id, date DESC)', 'NOT is_income'),
+    ('txn_expense_user_date_pidx', 'finance_app_transaction', '(user_id, date DESC)', 'NOT is_income'),
+]
+
+
+def create_partial_indexes(schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, columns, condition in POSTGRES_PARTIAL_INDEXES:
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {columns} WHERE {condition}")
+
+
+def drop_partial_indexes(schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, *_ in POSTGRES_PARTIAL_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+# ============== Full-text search ==============
+# SQLite: a contentless FTS5 table over transaction descriptions, kept in step
+# by triggers so bulk_create, queryset updates and raw deletes are covered as
+# well as saves. Each entry also holds an "owner" token (u<user id>), so a
+# search only walks one user's entries. PostgreSQL: a GIN index on the
+# description's tsvector, which the database maintains itself. See search.py.
+FTS_TABLE = 'finance_app_transaction_fts'
+SEARCH_CONFIG = 'simple'
+
+SQLITE_FTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        description, owner, content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON finance_app_transaction BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, description, owner) VALUES (new.id, new.description, 'u' || new.user_id);
+    END""",
+    # A contentless table can only drop an entry given the values it was indexed with
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON finance_app_transaction BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, description, owner)
+            VALUES ('delete', old.id, old.description, 'u' || old.user_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF description, user_id
+            ON finance_app_transaction BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, description, owner)
+            VALUES ('delete', old.id, old.description, 'u' || old.user_id);
+        INSERT INTO {FTS_TABLE} (rowid, description, owner) VALUES (new.id, new.description, 'u' || new.user_id);
+    END""",
+]
+POSTGRES_SEARCH_INDEX = (
+    f"CREATE INDEX IF NOT EXISTS txn_description_search_idx ON finance_app_transaction "
+    f"USING gin (to_tsvector('{SEARCH_CONFIG}', description))"
+)
+
+
+def create_search_index(schema_editor):
+    """Create the search index and fill it from the existing transactions"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_FTS:
+            schema_editor.execute(statement)
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, description, owner) "
+            f"SELECT id, description, 'u' || user_id FROM finance_app_transaction"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_SEARCH_INDEX)
+
+
+def drop_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for action in ('insert', 'delete', 'update'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{action}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS txn_description_search_idx")
+
+
+def missing_search_triggers(connection):
+    """Names of the SQLite search triggers absent while the search table exists"""
+    if connection.vendor != 'sqlite':
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master WHERE name LIKE %s", [f'{FTS_TABLE}%'])
+        existing = {name for kind, name in cursor.fetchall() if kind in ('table', 'trigger')}
+    if FTS_TABLE not in existing:
+        # Not migrated that far yet
+        return []
+    return [name for name in (f'{FTS_TABLE}_{action}' for action in ('insert', 'delete', 'update'))
+            if name not in existing]
+
+
+def check_search_triggers(app_configs, databases=None, **kwargs):
+    """System check: the search index silently goes stale without its triggers"""
+    errors = []
+    for alias in databases or []:
+        missing = missing_search_triggers(connections[alias])
+        if missing:
+            errors.append(checks.Warning(
+                f"Transaction search triggers are missing on database {alias!r}: {', '.join(missing)}",
+                hint="A migration rebuilt finance_app_transaction, which drops its triggers. Add a migration "
+                     "running finance_app.database.drop_search_index and then create_search_index.",
+                id='finance_app.W001',
+            ))
+    return errors
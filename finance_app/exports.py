@@ -0,0 +1,70 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+BUFFER_SIZE = 64 * 1024
+
+
+class _Echo:
+    """File-like object whose write() hands the value back to the caller"""
+    def write(self, value):
+        return value
+
+
+def _buffered(pieces):
+    # Coalesce small writes so the response isn't flushed once per row
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def csv_lines(fields, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def json_lines(fields, rows):
+    """A JSON array of objects, written one element at a time"""
+    encoder = DjangoJSONEncoder()
+    yield '['
+    separator = ''
+    for row in rows:
+        yield separator + encoder.encode(dict(zip(fields, row)))
+        separator = ','
+    yield ']'
+
+
+def ndjson_lines(fields, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+RENDERERS = {
+    'csv': (csv_lines, 'text/csv', 'csv'),
+    'json': (json_lines, 'application/json', 'json'),
+    'ndjson': (ndjson_lines, 'application/x-ndjson', 'ndjson'),
+}
+
+
+def export_response(result, format):
+    """
+    Stream a computed report as CSV, JSON or NDJSON. Raw transaction rows
+    come from a server-side iterator, so memory stays flat however long
+    the range is.
+    """
+    render, content_type, extension = RENDERERS[format]
+    response = StreamingHttpResponse(_buffered(render(result.columns, result.rows)), content_type=content_type)
+    if format != 'json':
+        filename = f"{result.report_type}_report_{result.start_date}_{result.end_date}.{extension}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,189 @@
+"""
+Spending forecasts: where each current budget and each category is headed
+by the end of its period. Everything comes from one grouped query of daily
+expense totals per category, laid out as a (category x day) array:
+
+- the daily rate is the category's moving average over the last
+  MOVING_AVERAGE_DAYS complete days;
+- weekly seasonality scales it by weekday, from the category's mean per
+  weekday over the last SEASONALITY_WEEKS weeks relative to its overall
+  mean (so a week of forecast days still adds up to seven times the rate);
+- a projection is the spending so far in the period plus the expected
+  spending of each day left in it. A budget's spending so far is its
+  maintained spent total (as on its progress bar), so however long the
+  period, only the last SEASONALITY_WEEKS weeks are read.
+
+All budgets and categories are projected together with array operations.
+Results are cached per user until their data changes (see user_cache.py).
+"""
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+
+import numpy as np
+from django.db.models import Sum
+
+from .models import Budget
+from . import archive, user_cache
+
+MOVING_AVERAGE_DAYS = 28
+SEASONALITY_WEEKS = 13
+
+
+@dataclass
+class BudgetForecast:
+    budget_id: int
+    category_id: int
+    category: str
+    amount: float
+    start_date: object
+    end_date: object
+    spent: float
+    projected: float
+    # The day projected spending passes the budget, if that falls in the period
+    runs_out_on: object = None
+
+    @property
+    def projected_percentage(self):
+        return round(self.projected * 100 / self.amount, 1) if self.amount else 0
+
+    @property
+    def over_budget(self):
+        return self.projected > self.amount
+
+
+@dataclass
+class CategoryForecast:
+    category_id: int
+    category: str
+    spent: float
+    projected: float
+
+
+@dataclass
+class Forecast:
+    as_of: object
+    period_start: object
+    period_end: object
+    budgets: list = field(default_factory=list)
+    categories: list = field(default_factory=list)
+
+    def as_dict(self):
+        data = asdict(self)
+        for entry, forecast in zip(data['budgets'], self.budgets):
+            entry['projected_percentage'] = forecast.projected_percentage
+            entry['over_budget'] = forecast.over_budget
+        return data
+
+
+def _daily_expenses(user, first, last, category_ids):
+    """(category ids, names, category x day array of expenses from ``first`` through ``last``)"""
+    rows = {category_id: index for index, category_id in enumerate(category_ids)}
+    names = {}
+    cells, days, totals = [], [], []
+    for queryset in archive.sources(user, first):
+        grouped = queryset.filter(is_income=False, date__range=[first, last]).values_list(
+            'category_id', 'category__name', 'date'
+        ).annotate(total=Sum('amount')).order_by()
+        for category_id, name, day, total in grouped:
+            cells.append(rows.setdefault(category_id, len(rows)))
+            names[category_id] = name
+            days.append((day - first).days)
+            totals.append(total)
+
+    matrix = np.zeros((len(rows), (last - first).days + 1))
+    # add.at, not +=: a day can appear once per source
+    np.add.at(matrix, (np.asarray(cells, dtype=int), np.asarray(days, dtype=int)), np.asarray(totals, dtype=float))
+    return list(rows), names, matrix
+
+
+def _weekday_factors(history, first_weekday):
+    """(category x weekday) multipliers from whole weeks of ``history``, whose first day is ``first_weekday``"""
+    weeks = history.shape[1] // 7
+    means = history[:, history.shape[1] - weeks * 7:].reshape(len(history), weeks, 7).mean(axis=1)
+    # Column k is the weekday of the window's k-th day; roll so column w is weekday w
+    start = (first_weekday + history.shape[1] - weeks * 7) % 7
+    means = np.roll(means, start, axis=1)
+    overall = means.mean(axis=1, keepdims=True)
+    return np.divide(means, overall, out=np.ones_like(means), where=overall > 0)
+
+
+def _expected(rates, factors, today, rows, ends):
+    """Expected spending on each day after ``today`` (zero past its end) for each (category row, end) pair"""
+    remaining = np.array([(end - today).days for end in ends], dtype=int)
+    offsets = np.arange(1, remaining.max(initial=0) + 1)
+    weekdays = (today.weekday() + offsets) % 7
+    expected = rates[rows, None] * factors[rows][:, weekdays]
+    expected *= offsets[None, :] <= remaining[:, None]
+    return expected
+
+
+def build_forecast(user, today=None):
+    """Forecast for the user's budgets covering ``today`` and their spending this month"""
+    today = today or date.today()
+    period_start = today.replace(day=1)
+    period_end = (period_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    budgets = list(Budget.objects.filter(
+        user=user, start_date__lte=today, end_date__gte=today
+    ).select_related('category').order_by('end_date', 'category__name'))
+
+    history_days = max(MOVING_AVERAGE_DAYS, SEASONALITY_WEEKS * 7)
+    first = min(today - timedelta(days=history_days), period_start)
+    names = {budget.category_id: budget.category.name for budget in budgets}
+    category_ids, found, matrix = _daily_expenses(user, first, today, list(names))
+    names.update(found)
+    forecast = Forecast(as_of=today, period_start=period_start, period_end=period_end)
+    if not category_ids:
+        return forecast
+
+    # Rates and seasonality from complete days only; today is still going
+    history = matrix[:, -history_days - 1:-1]
+    rates = history[:, -MOVING_AVERAGE_DAYS:].mean(axis=1)
+    season_start = today - timedelta(days=SEASONALITY_WEEKS * 7)
+    factors = _weekday_factors(history[:, -SEASONALITY_WEEKS * 7:], season_start.weekday())
+
+    # Budgets and categories are projected together; budgets come first
+    rows = {category_id: index for index, category_id in enumerate(category_ids)}
+    row_index = np.array([rows[budget.category_id] for budget in budgets] + list(range(len(category_ids))), dtype=int)
+    ends = [budget.end_date for budget in budgets] + [period_end] * len(category_ids)
+    expected = _expected(rates, factors, today, row_index, ends)
+    spent = np.concatenate([
+        np.array([budget.get_spent_amount() for budget in budgets], dtype=float),
+        matrix[:, (period_start - first).days:].sum(axis=1),
+    ])
+    projected = spent + expected.sum(axis=1)
+
+    count = len(budgets)
+    amounts = np.array([budget.amount for budget in budgets], dtype=float)
+    # First remaining day on which the running projection passes the amount
+    passed = spent[:count, None] + expected[:count].cumsum(axis=1) > amounts[:, None]
+    crossing = np.where(passed.any(axis=1) & (spent[:count] <= amounts), passed.argmax(axis=1) + 1, 0)
+
+    spent, projected = np.round(spent, 2).tolist(), np.round(projected, 2).tolist()
+    for index, budget in enumerate(budgets):
+        forecast.budgets.append(BudgetForecast(
+            budget_id=budget.pk,
+            category_id=budget.category_id,
+            category=budget.category.name,
+            amount=float(budget.amount),
+            start_date=budget.start_date,
+            end_date=budget.end_date,
+            spent=spent[index],
+            projected=projected[index],
+            runs_out_on=today + timedelta(days=int(crossing[index])) if crossing[index] else None,
+        ))
+    for index, category_id in enumerate(category_ids, start=count):
+        if projected[index] > 0:
+            forecast.categories.append(CategoryForecast(
+                category_id=category_id,
+                category=names.get(category_id) or 'Uncategorized',
+                spent=spent[index],
+                projected=projected[index],
+            ))
+    forecast.categories.sort(key=lambda entry: -entry.projected)
+    return forecast
+
+
+def forecast(user, today=None):
+    """build_forecast(), cached until the user's transactions, budgets or categories change"""
+    today = today or date.today()
+    return user_cache.cached(user.pk, 'forecast', lambda: build_forecast(user, today), today.isoformat())
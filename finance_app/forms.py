@@ -2,7 +2,9 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from .models import Transaction, Category, Budget
+from .models import Transaction, Category, Budget, CategorizationRule, RecurringTransaction
+from .categorization import InvalidPattern, validate_pattern
+from .recurring import InvalidRule, parse_rule
 
 class UserRegisterForm(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -92,9 +94,113 @@ class ReportForm(forms.Form):
         ('monthly', 'Monthly Summary'),
         ('yearly', 'Yearly Summary'),
         ('category', 'Category Breakdown'),
+        ('transactions', 'All Transactions'),
+    ]
+
+    GRANULARITIES = [
+        ('', 'Default'),
+        ('day', 'Daily'),
+        ('week', 'Weekly'),
+        ('month', 'Monthly'),
+        ('year', 'Yearly'),
     ]
 
     report_type = forms.ChoiceField(choices=REPORT_TYPES)
     start_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
     end_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
-    format = forms.ChoiceField(choices=[('html', 'HTML'), ('json', 'JSON'), ('csv', 'CSV')])
+    granularity = forms.ChoiceField(choices=GRANULARITIES, required=False)
+    format = forms.ChoiceField(choices=[('html', 'HTML'), ('json', 'JSON'), ('ndjson', 'NDJSON'), ('csv', 'CSV'), ('pdf', 'PDF')])
+    background = forms.BooleanField(required=False, label='Generate in the background')
+
+    def get_report_type_display(self):
+        return dict(self.REPORT_TYPES).get(self.cleaned_data.get('report_type'), '')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date and start_date > end_date:
+            raise ValidationError("The start date must be on or before the end date.")
+        if cleaned_data.get('format') == 'html' and cleaned_data.get('background'):
+            raise ValidationError("Web view reports cannot be generated in the background.")
+        return cleaned_data
+
+class ImportForm(forms.Form):
+    file = forms.FileField(help_text='CSV with date and amount columns, or an OFX/QFX export')
+    format = forms.ChoiceField(choices=[('', 'Detect from file name'), ('csv', 'CSV'), ('ofx', 'OFX')], required=False)
+    dry_run = forms.BooleanField(required=False, label='Preview only (do not save)')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload = cleaned_data.get('file')
+        if upload and not cleaned_data.get('format'):
+            extension = upload.name.rsplit('.', 1)[-1].lower()
+            if extension not in ('csv', 'ofx', 'qfx'):
+                raise ValidationError("Choose the file format; it could not be detected from the file name.")
+            cleaned_data['format'] = 'csv' if extension == 'csv' else 'ofx'
+        return cleaned_data
+
+class RecurringTransactionForm(forms.ModelForm):
+    class Meta:
+        model = RecurringTransaction
+        fields = ['description', 'amount', 'category', 'is_income', 'rule', 'start_date', 'end_date', 'active']
+        widgets = {
+            'description': forms.TextInput(),
+            'rule': forms.TextInput(attrs={'placeholder': 'FREQ=MONTHLY;BYMONTHDAY=1'}),
+            'start_date': forms.DateInput(attrs={'type': 'date'}),
+            'end_date': forms.DateInput(attrs={'type': 'date'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        if self.user:
+            self.fields['category'].queryset = Category.objects.filter(user=self.user)
+
+    def clean_rule(self):
+        rule = self.cleaned_data['rule'].strip()
+        try:
+            parse_rule(rule)
+        except InvalidRule as exc:
+            raise ValidationError(str(exc))
+        return rule
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date and start_date > end_date:
+            raise ValidationError("The end date must be on or after the start date.")
+        return cleaned_data
+
+class CategorizationRuleForm(forms.ModelForm):
+    class Meta:
+        model = CategorizationRule
+        fields = ['pattern', 'match_type', 'min_amount', 'max_amount', 'is_income', 'category', 'priority', 'active']
+        labels = {'is_income': 'Applies to'}
+        widgets = {
+            'pattern': forms.TextInput(attrs={'placeholder': 'e.g. starbucks'}),
+            'is_income': forms.Select(choices=[(None, 'Income and expenses'), (True, 'Income only'), (False, 'Expenses only')]),
+        }
+
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        if self.user:
+            self.fields['category'].queryset = Category.objects.filter(user=self.user)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        pattern = cleaned_data.get('pattern', '').strip()
+        cleaned_data['pattern'] = pattern
+        try:
+            validate_pattern(cleaned_data.get('match_type'), pattern)
+        except InvalidPattern as exc:
+            self.add_error('pattern', str(exc))
+        min_amount = cleaned_data.get('min_amount')
+        max_amount = cleaned_data.get('max_amount')
+        if min_amount is not None and max_amount is not None and min_amount > max_amount:
+            raise ValidationError("The minimum amount can't be more than the maximum.")
+        if not pattern and min_amount is None and max_amount is None:
+            raise ValidationError("Give a description pattern or an amount range.")
+        return cleaned_data
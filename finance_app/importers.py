@@ -0,0 +1,312 @@
+"""
+Bulk import of bank statements (CSV or OFX). Files are parsed as a stream
+and written in batches with bulk_create, so signals don't fire; the rollup,
+budget spending, budget alerts and cache version are brought up to date
+once per import.
+"""
+import csv
+import hashlib
+import io
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .models import Budget, Category, Transaction
+from . import archive, budget_alerts, budget_tracking, categorization, rollups, user_cache
+
+FORMATS = ('csv', 'ofx')
+DEFAULT_BATCH_SIZE = 1000
+MAX_AMOUNT = Decimal('9999999999.99')
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y', '%d.%m.%Y')
+
+CSV_COLUMNS = {
+    'date': ('date', 'posted', 'transaction date'),
+    'description': ('description', 'memo', 'payee', 'name', 'details'),
+    'amount': ('amount', 'value'),
+    'category': ('category',),
+    'type': ('type', 'is_income'),
+}
+
+
+class StatementError(ValueError):
+    pass
+
+
+@dataclass
+class ImportResult:
+    dry_run: bool = False
+    parsed: int = 0
+    created: int = 0
+    duplicates: int = 0
+    categorized: int = 0
+    errors: list = field(default_factory=list)
+    new_categories: list = field(default_factory=list)
+
+
+@dataclass
+class ParsedRow:
+    line: int
+    date: date
+    amount: Decimal
+    description: str
+    is_income: bool
+    category: str = ''
+
+
+# ============== Parsing ==============
+def _parse_date(value):
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise StatementError(f"Unrecognised date {value!r}")
+
+
+def _parse_amount(value):
+    try:
+        amount = Decimal(value.strip().replace(',', '').replace('$', ''))
+    except InvalidOperation:
+        raise StatementError(f"Unrecognised amount {value!r}")
+    if not amount or abs(amount) > MAX_AMOUNT:
+        raise StatementError(f"Amount out of range: {value!r}")
+    return amount
+
+
+def _resolve_columns(header):
+    lookup = {name.strip().lower(): name for name in header}
+    columns = {}
+    for column, aliases in CSV_COLUMNS.items():
+        columns[column] = next((lookup[alias] for alias in aliases if alias in lookup), None)
+    missing = [column for column in ('date', 'amount') if columns[column] is None]
+    if missing:
+        raise StatementError(f"Missing CSV column(s): {', '.join(missing)}")
+    return columns
+
+
+def parse_csv(stream):
+    """
+    Yield (line, ParsedRow or error message) from a CSV statement. A
+    negative amount is an expense unless a type column says otherwise.
+    """
+    reader = csv.DictReader(stream)
+    columns = _resolve_columns(reader.fieldnames or [])
+    for record in reader:
+        line = reader.line_num
+        try:
+            amount = _parse_amount(record[columns['amount']] or '')
+            is_income = amount > 0
+            if columns['type'] and record[columns['type']]:
+                is_income = record[columns['type']].strip().lower() in ('income', 'in', 'credit', 'true', '1')
+            yield line, ParsedRow(
+                line=line,
+                date=_parse_date(record[columns['date']] or ''),
+                amount=abs(amount),
+                description=(record[columns['description']] or '').strip() if columns['description'] else '',
+                is_income=is_income,
+                category=(record[columns['category']] or '').strip() if columns['category'] else '',
+            )
+        except StatementError as exc:
+            yield line, str(exc)
+
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def parse_ofx(stream):
+    """
+    Yield (line, ParsedRow or error message) from an OFX statement, reading
+    it line by line. Handles both the SGML (unclosed tags) and XML dialects.
+    """
+    current, start = None, 0
+    for line_number, line in enumerate(stream, 1):
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if not closing:
+                    current, start = {}, line_number
+                    continue
+                if current is not None:
+                    yield start, _ofx_row(start, current)
+                current = None
+            elif current is not None and not closing and value.strip():
+                current[tag] = value.strip()
+
+
+def _ofx_row(line, record):
+    try:
+        if 'DTPOSTED' not in record or 'TRNAMT' not in record:
+            raise StatementError('Transaction without DTPOSTED or TRNAMT')
+        amount = _parse_amount(record['TRNAMT'])
+        posted = record['DTPOSTED'][:8]
+        description = ' - '.join(part for part in (record.get('NAME'), record.get('MEMO')) if part)
+        return ParsedRow(
+            line=line,
+            date=date(int(posted[:4]), int(posted[4:6]), int(posted[6:8])),
+            amount=abs(amount),
+            description=description,
+            is_income=amount > 0,
+        )
+    except (StatementError, ValueError) as exc:
+        return str(exc)
+
+
+PARSERS = {
+    'csv': parse_csv,
+    'ofx': parse_ofx,
+}
+
+
+# ============== Deduplication ==============
+def fingerprint(day, amount, description, is_income):
+    key = f"{day.isoformat()}|{Decimal(amount):.2f}|{' '.join(description.lower().split())}|{int(is_income)}"
+    return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+
+class _ExistingIndex:
+    """
+    Fingerprint counts of the user's stored transactions, loaded per date
+    range as the import advances. Counts rather than a set, so genuinely
+    repeated transactions (two identical coffees in a day) survive.
+    """
+    def __init__(self, user):
+        self.user = user
+        self.counts = Counter()
+        self.loaded_dates = set()
+
+    def load(self, first, last):
+        # Only dates not seen by an earlier chunk, whose rows may include
+        # ones this import has already inserted
+        dates = {first + timedelta(days=offset) for offset in range((last - first).days + 1)}
+        new_dates = dates - self.loaded_dates
+        if not new_dates:
+            return
+        for queryset in archive.sources(self.user, min(new_dates)):
+            rows = queryset.filter(
+                date__range=[min(new_dates), max(new_dates)]
+            ).values_list('date', 'amount', 'description', 'is_income').iterator(chunk_size=DEFAULT_BATCH_SIZE)
+            for day, amount, description, is_income in rows:
+                if day in new_dates:
+                    self.counts[fingerprint(day, amount, description, is_income)] += 1
+        self.loaded_dates |= new_dates
+
+
+# ============== Import ==============
+def _chunks(rows, size):
+    chunk = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_transactions(user, stream, format='csv', dry_run=False,
+                        batch_size=DEFAULT_BATCH_SIZE, create_categories=True):
+    """
+    Import a statement for ``user``. ``stream`` is a text file object.
+    Rows matching already stored transactions are skipped; unknown category
+    names are created unless ``create_categories`` is False, and rows left
+    without a category go through the user's categorization rules. With
+    ``dry_run`` nothing is written.
+    """
+    if format not in PARSERS:
+        raise StatementError(f"Unsupported format {format!r}")
+
+    result = ImportResult(dry_run=dry_run)
+    categories = {name.lower(): pk for name, pk in Category.objects.filter(user=user).values_list('name', 'pk')}
+    existing = _ExistingIndex(user)
+    matcher = categorization.matcher_for(user.pk)
+    seen = Counter()
+    buckets = defaultdict(lambda: [Decimal('0'), 0])
+    touched = {'first': date.max, 'last': date.min, 'categories': set()}
+
+    with transaction.atomic():
+        for chunk in _chunks(PARSERS[format](stream), batch_size):
+            rows = []
+            for line, row in chunk:
+                if isinstance(row, str):
+                    result.errors.append((line, row))
+                else:
+                    rows.append(row)
+            result.parsed += len(chunk)
+            if not rows:
+                continue
+
+            existing.load(min(row.date for row in rows), max(row.date for row in rows))
+            new_names = {}
+            for row in rows:
+                key = row.category.lower()
+                if key and key not in categories and key not in new_names:
+                    new_names[key] = Category(user=user, name=row.category, is_income=row.is_income)
+            if new_names and create_categories:
+                result.new_categories += [category.name for category in new_names.values()]
+                if not dry_run:
+                    for category in Category.objects.bulk_create(new_names.values()):
+                        categories[category.name.lower()] = category.pk
+                else:
+                    categories.update({key: None for key in new_names})
+
+            objects = []
+            for row in rows:
+                digest = fingerprint(row.date, row.amount, row.description, row.is_income)
+                seen[digest] += 1
+                if seen[digest] <= existing.counts[digest]:
+                    result.duplicates += 1
+                    continue
+                category_id = categories.get(row.category.lower()) if row.category else None
+                # Names only known to a dry run map to None; those aren't uncategorized
+                if category_id is None and matcher and row.category.lower() not in categories:
+                    category_id = matcher.match(row.description, row.amount, row.is_income)
+                    result.categorized += category_id is not None
+                objects.append(Transaction(
+                    user=user,
+                    amount=row.amount,
+                    category_id=category_id,
+                    description=row.description,
+                    date=row.date,
+                    is_income=row.is_income,
+                    transaction_type=Transaction.INCOME if row.is_income else Transaction.EXPENSE,
+                ))
+                bucket = buckets[(row.date.year, row.date.month, category_id, row.is_income)]
+                bucket[0] += row.amount
+                bucket[1] += 1
+                if not row.is_income and category_id:
+                    touched['categories'].add(category_id)
+                touched['first'] = min(touched['first'], row.date)
+                touched['last'] = max(touched['last'], row.date)
+
+            result.created += len(objects)
+            if not dry_run:
+                Transaction.objects.bulk_create(objects, batch_size=batch_size)
+
+        if not dry_run and result.created:
+            _after_import(user, buckets, touched)
+    return result
+
+
+def _after_import(user, buckets, touched):
+    """Apply the derived-data updates that bulk_create skipped, once per import"""
+    for (year, month, category_id, is_income), (total, count) in buckets.items():
+        rollups.apply_delta(user.pk, date(year, month, 1), category_id, is_income, total, count)
+    if touched['categories']:
+        budget_tracking.reconcile(Budget.objects.filter(
+            user=user,
+            category_id__in=touched['categories'],
+            start_date__lte=touched['last'],
+            end_date__gte=touched['first'],
+        ))
+        budget_alerts.touched(touched['categories'], touched['first'], touched['last'])
+    user_cache.bump_version(user.pk)
+
+
+def open_text(uploaded_file, encoding='utf-8-sig'):
+    """Text stream over an uploaded file without reading it into memory"""
+    return io.TextIOWrapper(uploaded_file, encoding=encoding, errors='replace', newline='')
@@ -0,0 +1,226 @@
+"""
+Per-request instrumentation. RequestMetricsMiddleware times every request,
+counts its SQL queries (and repeated ones, see _QueryLog) and keeps the figures
+in a bounded in-process ring buffer, summarised per view by summary(). With
+REQUEST_PROFILE_SAMPLE_RATE set, a sample of requests also runs under
+cProfile and the stats of the slowest ones are kept.
+
+Figures are per process: under gunicorn each worker has its own buffer.
+"""
+import cProfile
+import heapq
+import io
+import itertools
+import pstats
+import random
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .utils import percentile
+
+
+@dataclass
+class RequestRecord:
+    view: str
+    method: str
+    status: int
+    started_at: str
+    wall_ms: float
+    db_ms: float
+    queries: int
+    duplicates: int
+    similar: int
+    repeated_sql: str
+    bytes: int = None
+
+
+class _Buffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = deque(maxlen=getattr(settings, 'REQUEST_METRICS_SIZE', 1000))
+        self.profiles = []
+        self.sequence = itertools.count()
+
+    def add(self, record):
+        with self.lock:
+            self.records.append(record)
+
+    def add_profile(self, record, stats):
+        # Min-heap on wall time, so the fastest kept profile is dropped first
+        keep = getattr(settings, 'REQUEST_PROFILE_KEEP', 10)
+        entry = (record.wall_ms, next(self.sequence), record, stats)
+        with self.lock:
+            if len(self.profiles) < keep:
+                heapq.heappush(self.profiles, entry)
+            elif self.profiles and record.wall_ms > self.profiles[0][0]:
+                heapq.heapreplace(self.profiles, entry)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.records), sorted(self.profiles, reverse=True)
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+            self.profiles.clear()
+
+
+_buffer = _Buffer()
+_profiler_lock = threading.Lock()
+
+
+class _QueryLog:
+    """execute_wrapper that times each query and counts repeated statements"""
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.statements[(sql, repr(params))] += 1
+
+    def duplicates(self):
+        """Exact repeats (same SQL and parameters) of earlier queries"""
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+    def similar(self):
+        """Repeats of the same SQL with any parameters (the N+1 pattern), and the most repeated statement"""
+        by_sql = Counter()
+        for (sql, _), count in self.statements.items():
+            by_sql[sql] += count
+        repeated = [(count, sql) for sql, count in by_sql.items() if count > 1]
+        worst = max(repeated, default=(0, ''))
+        return sum(count - 1 for count, _ in repeated), worst[1][:300]
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match.route or match._func_path
+
+
+def _profile_stats(profiler):
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats('cumulative').print_stats(getattr(settings, 'REQUEST_PROFILE_LINES', 40))
+    return output.getvalue()
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        profiler = None
+        rate = getattr(settings, 'REQUEST_PROFILE_SAMPLE_RATE', 0)
+        # One profiled request at a time; cProfile can't nest across threads on newer Pythons
+        if rate and random.random() < rate and _profiler_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+
+        log = _QueryLog()
+        started_at = timezone.now()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(log))
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            if profiler is not None:
+                _profiler_lock.release()
+        wall_ms = (time.perf_counter() - started) * 1000
+
+        similar, repeated_sql = log.similar()
+        record = RequestRecord(
+            view=_view_name(request),
+            method=request.method,
+            status=response.status_code,
+            started_at=started_at.isoformat(),
+            wall_ms=round(wall_ms, 2),
+            db_ms=round(log.seconds * 1000, 2),
+            queries=log.count,
+            duplicates=log.duplicates(),
+            similar=similar,
+            repeated_sql=repeated_sql,
+            # Streaming bodies are produced after this returns; not counted
+            bytes=None if response.streaming else len(response.content),
+        )
+        _buffer.add(record)
+        if profiler is not None:
+            _buffer.add_profile(record, _profile_stats(profiler))
+
+        if getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', True):
+            response['Server-Timing'] = (
+                f'total;dur={record.wall_ms}, '
+                f'db;dur={record.db_ms};desc="{record.queries} queries"'
+            )
+        return response
+
+
+def summary():
+    """Per-view percentiles over the requests currently in the buffer"""
+    records, _ = _buffer.snapshot()
+    by_view = {}
+    for record in records:
+        by_view.setdefault((record.method, record.view), []).append(record)
+
+    views = []
+    for (method, view), rows in by_view.items():
+        wall = [row.wall_ms for row in rows]
+        sizes = [row.bytes for row in rows if row.bytes is not None]
+        views.append({
+            'view': view,
+            'method': method,
+            'requests': len(rows),
+            'errors': sum(1 for row in rows if row.status >= 500),
+            'p50_ms': percentile(wall, 0.50),
+            'p95_ms': percentile(wall, 0.95),
+            'p99_ms': percentile(wall, 0.99),
+            'max_ms': max(wall),
+            'mean_db_ms': round(sum(row.db_ms for row in rows) / len(rows), 2),
+            'mean_queries': round(sum(row.queries for row in rows) / len(rows), 1),
+            'max_queries': max(row.queries for row in rows),
+            'requests_with_duplicates': sum(1 for row in rows if row.duplicates),
+            'max_similar': max(row.similar for row in rows),
+            'mean_bytes': round(sum(sizes) / len(sizes)) if sizes else None,
+        })
+    views.sort(key=lambda view: view['p95_ms'], reverse=True)
+    return {'buffered': len(records), 'capacity': _buffer.records.maxlen, 'views': views}
+
+
+def recent(limit=50):
+    records, _ = _buffer.snapshot()
+    return [asdict(record) for record in records[-limit:]]
+
+
+def profiles():
+    """Profiles of the slowest sampled requests, slowest first"""
+    _, entries = _buffer.snapshot()
+    return [dict(asdict(record), stats=stats) for _, _, record, stats in entries]
+
+
+def reset():
+    _buffer.clear()
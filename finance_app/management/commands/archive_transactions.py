@@ -0,0 +1,66 @@
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finance_app import archive
+from finance_app.models import ArchivedTransaction, ArchiveHorizon, Transaction
+
+
+class Command(BaseCommand):
+    help = ('Move transactions older than TRANSACTION_ARCHIVE_MONTHS to the archive table. '
+            'Each batch commits on its own, so an interrupted run can be started again.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, help='Archive before this many whole months ago '
+                                                       'instead of TRANSACTION_ARCHIVE_MONTHS')
+        parser.add_argument('--before', type=date.fromisoformat, help='Archive before this date (YYYY-MM-DD)')
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME',
+                            help='Limit to this user (may be repeated)')
+        parser.add_argument('--batch-size', type=int, default=archive.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived')
+        parser.add_argument('--restore', action='store_true',
+                            help='Move archived transactions back to the live table instead')
+
+    def handle(self, *args, **options):
+        if options['months'] is not None and options['before'] is not None:
+            raise CommandError('Pass --months or --before, not both')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        before = options['before'] or archive.horizon(options['months'])
+
+        users = User.objects.order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+        elif options['restore']:
+            users = users.filter(pk__in=ArchiveHorizon.objects.values('user'))
+        else:
+            users = users.filter(pk__in=Transaction.objects.filter(date__lt=before).values('user'))
+
+        if options['dry_run']:
+            if options['restore']:
+                count = ArchivedTransaction.objects.filter(user__in=users).count()
+                self.stdout.write(f"{count} archived transaction(s) would be restored")
+            else:
+                count = Transaction.objects.filter(user__in=users, date__lt=before).count()
+                self.stdout.write(f"{count} transaction(s) dated before {before} would be archived")
+            return
+
+        started = time.perf_counter()
+        total = 0
+        for user in list(users):
+            if options['restore']:
+                moved = archive.restore_user(user, options['batch_size'])
+            else:
+                moved = archive.archive_user(user, before, options['batch_size'])
+            total += moved
+            if moved:
+                self.stdout.write(f"{user.username}: {moved} transaction(s)")
+
+        elapsed = time.perf_counter() - started
+        action = 'Restored' if options['restore'] else f'Archived (before {before})'
+        self.stdout.write(self.style.SUCCESS(f"{action} {total} transaction(s) in {elapsed:.1f}s"))
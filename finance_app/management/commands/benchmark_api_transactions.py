@@ -0,0 +1,92 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.renderers import JSONRenderer
+
+from finance_app import api_rows
+from finance_app.models import Category, Transaction
+from finance_app.pagination import paginate
+from finance_app.serializers import TransactionSerializer
+
+
+class Command(BaseCommand):
+    help = ('Compare the TransactionSerializer and values_list read paths of api_transactions. '
+            'Data is generated inside a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+        parser.add_argument('--page-size', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=20)
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            with transaction.atomic():
+                user = self._populate(rows, options['categories'])
+                queryset = Transaction.objects.filter(user=user)
+                serializer = self._measure(lambda cursor: self._serializer_page(queryset, cursor, options['page_size']))
+                fast = self._measure(lambda cursor: self._fast_page(user, queryset, cursor, options['page_size']))
+                transaction.set_rollback(True)
+
+            self.stdout.write(f"{rows:,} rows in pages of {options['page_size']}:")
+            for label, (elapsed, queries, size) in (('serializer', serializer), ('values_list', fast)):
+                self.stdout.write(
+                    f"  {label:<12} {elapsed:8.3f}s  {rows / elapsed:>10,.0f} rows/s  "
+                    f"{queries:>7,} queries  {size / 1e6:7.1f} MB"
+                )
+            self.stdout.write(self.style.SUCCESS(f"  speedup {serializer[0] / fast[0]:.1f}x"))
+
+    def _populate(self, rows, category_count):
+        user = User.objects.create(username=f'benchmark-{time.time_ns()}')
+        categories = Category.objects.bulk_create([
+            Category(user=user, name=f'Category {index}', is_income=index % 5 == 0)
+            for index in range(category_count)
+        ])
+        rng = random.Random(rows)
+        start = date.today() - timedelta(days=3 * 365)
+        Transaction.objects.bulk_create([
+            Transaction(
+                user=user,
+                amount=Decimal(rng.randrange(100, 100000)) / 100,
+                category=rng.choice(categories),
+                description=f'Transaction {index}',
+                date=start + timedelta(days=rng.randrange(3 * 365)),
+                is_income=rng.random() < 0.2,
+            )
+            for index in range(rows)
+        ], batch_size=5000)
+        return user
+
+    def _measure(self, fetch_page):
+        """Walk every page; returns (seconds, queries, bytes)"""
+        size, cursor, queries = 0, None, 0
+
+        def count(execute, *args):
+            nonlocal queries
+            queries += 1
+            return execute(*args)
+
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            while True:
+                body, cursor = fetch_page(cursor)
+                size += len(body)
+                if cursor is None:
+                    break
+            elapsed = time.perf_counter() - started
+        return elapsed, queries, size
+
+    def _serializer_page(self, queryset, cursor, page_size):
+        page = paginate(queryset, cursor, page_size)
+        body = JSONRenderer().render(TransactionSerializer(page.items, many=True).data)
+        return body, page.next_cursor
+
+    def _fast_page(self, user, queryset, cursor, page_size):
+        columns = api_rows.columns_for(api_rows.FIELDS)
+        page = paginate(queryset, cursor, page_size, fields=columns)
+        body = api_rows.encode(api_rows.to_dicts(user, page.items, api_rows.FIELDS, columns))
+        return body, page.next_cursor
@@ -0,0 +1,119 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from finance_app import search
+from finance_app.models import Category, Transaction
+
+MERCHANTS = [
+    'Starbucks', 'Blue Bottle Coffee', 'Local coffee shop', 'Shell gas station', 'Chevron gas station',
+    'Amazon Marketplace', 'Whole Foods Market', 'Trader Joes', 'Target', 'Walmart', 'CVS Pharmacy',
+    'Uber trip', 'Lyft ride', 'Delta Air Lines', 'Airbnb', 'Netflix', 'Spotify', 'Electric bill',
+    'Water utility', 'Rent payment', 'Salary', 'Gym membership', 'Bookstore', 'Pizzeria', 'Sushi bar',
+]
+CITIES = ['Austin', 'Boston', 'Chicago', 'Denver', 'Portland', 'Seattle', 'Miami', 'Phoenix']
+# (label, search string, extra filters)
+QUERIES = [
+    ('common word', 'coffee', {}),
+    ('phrase', '"gas station"', {}),
+    ('prefix', 'star*', {}),
+    ('two words', 'sushi boston', {}),
+    ('rare word', 'xylophone', {}),
+    ('word + filters', 'coffee', {'recent': True, 'amount__gte': Decimal('20')}),
+]
+
+
+class Command(BaseCommand):
+    help = ('Compare full-text search with an icontains scan of transaction descriptions. '
+            'Data is generated inside a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Transactions across all users')
+        parser.add_argument('--users', type=int, default=10, help='Searches run as the first of them')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['users'] < 1 or options['repeat'] < 1:
+            raise CommandError('--rows, --users and --repeat must be positive')
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            user = self._populate(options['rows'], options['users'])
+            self.stdout.write(f"{options['rows']:,} rows for {options['users']} users "
+                              f"in {time.perf_counter() - started:.1f}s; searching as one of them")
+            self.stdout.write(f"{'query':<16} {'matches':>8} {'search':>10} {'icontains':>10}")
+            for label, text, filters in QUERIES:
+                queryset = self._filtered(user, filters)
+                matches = queryset.filter(self._icontains(text)).count()
+                fts = self._time(lambda: search.search(user, text, queryset).items, options['repeat'])
+                scan = self._time(
+                    lambda: list(queryset.filter(self._icontains(text)).order_by('-date', '-pk')[:search.DEFAULT_PAGE_SIZE]),
+                    options['repeat'],
+                )
+                self.stdout.write(f"{label:<16} {matches:>8,} {fts:>8.1f}ms {scan:>8.1f}ms")
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS(
+            'search: first page ranked by relevance; icontains: first page newest first (no ranking)'
+        ))
+
+    def _populate(self, rows, user_count):
+        stamp = time.time_ns()
+        users = User.objects.bulk_create([
+            User(username=f'search-benchmark-{stamp}-{index}') for index in range(user_count)
+        ])
+        categories = Category.objects.bulk_create([
+            Category(user=user, name=f'Category {index}', is_income=index == 0)
+            for user in users for index in range(10)
+        ])
+        by_user = {}
+        for category in categories:
+            by_user.setdefault(category.user_id, []).append(category)
+
+        rng = random.Random(rows)
+        # Skewed, like real statements: a few merchants make up most rows
+        weights = [1 / (rank + 1) for rank in range(len(MERCHANTS))]
+        start = date.today() - timedelta(days=3 * 365)
+        for offset in range(0, rows, 10000):
+            batch = []
+            for index in range(offset, min(rows, offset + 10000)):
+                user = users[index % user_count]
+                merchant = rng.choices(MERCHANTS, weights)[0]
+                batch.append(Transaction(
+                    user=user,
+                    amount=Decimal(rng.randrange(100, 30000)) / 100,
+                    category=rng.choice(by_user[user.pk]),
+                    description=f'{merchant} {rng.choice(CITIES)} #{rng.randrange(100000)}',
+                    date=start + timedelta(days=rng.randrange(3 * 365)),
+                ))
+            Transaction.objects.bulk_create(batch, batch_size=5000)
+        return users[0]
+
+    def _filtered(self, user, filters):
+        queryset = Transaction.objects.filter(user=user)
+        filters = dict(filters)
+        if filters.pop('recent', False):
+            queryset = queryset.filter(date__gte=date.today() - timedelta(days=90))
+        return queryset.filter(**filters)
+
+    def _icontains(self, text):
+        condition = Q()
+        for words, prefix in search.parse_query(text):
+            condition &= Q(description__icontains=' '.join(words))
+        return condition
+
+    def _time(self, run, repeat):
+        """Median milliseconds of ``repeat`` runs after a warm-up"""
+        run()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,138 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance_app.database import apply_sqlite_pragmas, sqlite_pragmas
+from finance_app.utils import percentile
+
+# SQLite's own defaults, with the same busy timeout Django's driver uses
+DEFAULT_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 5000}
+USERS = 50
+
+SCHEMA = """
+CREATE TABLE bench_transaction (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    amount DECIMAL NOT NULL,
+    description TEXT NOT NULL,
+    date DATE NOT NULL
+);
+CREATE INDEX bench_user_date ON bench_transaction (user_id, date DESC);
+"""
+
+
+def _seed(path, rows):
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    rng = random.Random(0)
+    connection.executemany(
+        "INSERT INTO bench_transaction (user_id, amount, description, date) VALUES (?, ?, ?, ?)",
+        ((rng.randrange(USERS) + 1, rng.randrange(100, 100000) / 100, f"Transaction {index}",
+          f"20{rng.randrange(20, 26)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}")
+         for index in range(rows))
+    )
+    connection.commit()
+    connection.close()
+
+
+def _worker(path, role, pragmas, start_at, stop_at, seed):
+    """Run reads or writes in a loop until stop_at; returns (role, ops, errors, latencies)"""
+    connection = sqlite3.connect(path, timeout=pragmas.get('busy_timeout', 5000) / 1000, isolation_level=None)
+    cursor = connection.cursor()
+    apply_sqlite_pragmas(cursor, pragmas)
+    rng = random.Random(seed)
+    ops, errors, latencies = 0, 0, []
+    while time.time() < start_at:
+        time.sleep(0.001)
+    while time.time() < stop_at:
+        user_id = rng.randrange(USERS) + 1
+        started = time.perf_counter()
+        try:
+            if role == 'reader':
+                # One transaction list page and one summary per "request"
+                cursor.execute(
+                    "SELECT id, date, amount, description FROM bench_transaction "
+                    "WHERE user_id = ? ORDER BY date DESC, id DESC LIMIT 50", (user_id,)
+                ).fetchall()
+                cursor.execute(
+                    "SELECT SUM(amount), COUNT(*) FROM bench_transaction WHERE user_id = ? AND date >= '2025-01-01'",
+                    (user_id,)
+                ).fetchone()
+            else:
+                cursor.execute("BEGIN")
+                cursor.execute(
+                    "INSERT INTO bench_transaction (user_id, amount, description, date) VALUES (?, ?, ?, ?)",
+                    (user_id, rng.randrange(100, 100000) / 100, 'Benchmark write', '2025-06-01')
+                )
+                cursor.execute("COMMIT")
+            ops += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+        except sqlite3.OperationalError:
+            errors += 1
+            if connection.in_transaction:
+                cursor.execute("ROLLBACK")
+    connection.close()
+    return role, ops, errors, latencies
+
+
+class Command(BaseCommand):
+    help = ('Measure reader/writer throughput of concurrent processes on a scratch SQLite database, '
+            'with SQLite defaults and with the pragmas from finance_app/database.py')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--rows', type=int, default=100000, help='Rows seeded before each run')
+
+    def handle(self, *args, **options):
+        if options['readers'] < 0 or options['writers'] < 0 or not options['readers'] + options['writers']:
+            raise CommandError('Need at least one reader or writer')
+
+        self.stdout.write(f"{options['readers']} reader and {options['writers']} writer processes, "
+                          f"{options['seconds']}s per run, {options['rows']:,} seeded rows")
+        results = {}
+        for label, pragmas in (('defaults', DEFAULT_PRAGMAS), ('tuned', sqlite_pragmas())):
+            results[label] = self._run(pragmas, options)
+            self._report(label, results[label], options['seconds'])
+
+        for role in ('reader', 'writer'):
+            before, after = results['defaults'][role][0], results['tuned'][role][0]
+            if before and after:
+                self.stdout.write(self.style.SUCCESS(f"{role} throughput x{after / before:.1f}"))
+
+    def _run(self, pragmas, options):
+        roles = ['reader'] * options['readers'] + ['writer'] * options['writers']
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            _seed(path, options['rows'])
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=len(roles), mp_context=context) as pool:
+                # Leave time for the spawned interpreters to start
+                start_at = time.time() + 2
+                stop_at = start_at + options['seconds']
+                futures = [
+                    pool.submit(_worker, path, role, pragmas, start_at, stop_at, seed)
+                    for seed, role in enumerate(roles)
+                ]
+                outcomes = [future.result() for future in futures]
+
+        totals = {}
+        for role, ops, errors, latencies in outcomes:
+            total_ops, total_errors, all_latencies = totals.get(role, (0, 0, []))
+            totals[role] = (total_ops + ops, total_errors + errors, all_latencies + latencies)
+        return totals
+
+    def _report(self, label, totals, seconds):
+        self.stdout.write(f"{label}:")
+        for role, (ops, errors, latencies) in sorted(totals.items()):
+            p99 = percentile(latencies, 0.99) if latencies else 0
+            self.stdout.write(
+                f"  {role + 's':<8} {ops / seconds:>10,.0f} ops/s  p99 {p99:8.2f}ms  {errors} lock errors"
+            )
@@ -0,0 +1,43 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finance_app import categorization
+from finance_app.models import CategorizationRule
+
+
+class Command(BaseCommand):
+    help = ("Apply users' categorization rules to their stored uncategorized transactions. "
+            'Each batch commits on its own, so an interrupted run can be started again.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME',
+                            help='Limit to this user (may be repeated)')
+        parser.add_argument('--batch-size', type=int, default=categorization.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be categorized')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        users = User.objects.filter(pk__in=CategorizationRule.objects.filter(active=True).values('user')).order_by('pk')
+        if options['usernames']:
+            missing = set(options['usernames']) - set(
+                User.objects.filter(username__in=options['usernames']).values_list('username', flat=True)
+            )
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+            users = users.filter(username__in=options['usernames'])
+
+        started = time.perf_counter()
+        total = 0
+        for user in list(users):
+            count = categorization.recategorize(user, options['batch_size'], dry_run=options['dry_run'])
+            total += count
+            if count:
+                self.stdout.write(f"{user.username}: {count} transaction(s)")
+
+        elapsed = time.perf_counter() - started
+        verb = 'Would categorize' if options['dry_run'] else 'Categorized'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total} transaction(s) in {elapsed:.1f}s"))
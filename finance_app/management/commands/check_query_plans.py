@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from finance_app import query_plans
+
+
+class Command(BaseCommand):
+    help = 'Fail if any hot query falls back to a full table scan (SQLite only); also run as QueryPlanTests'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Query plan checks are only implemented for SQLite')
+
+        failures = 0
+        for name, problems in query_plans.check().items():
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"{name}: {'; '.join(problems)}"))
+            else:
+                self.stdout.write(f"{name}: ok")
+
+        if failures:
+            raise CommandError(f"{failures} query plan(s) don't use an index")
+        self.stdout.write(self.style.SUCCESS('All query plans use an index'))
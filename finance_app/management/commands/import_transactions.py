@@ -0,0 +1,57 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finance_app import importers
+
+
+class Command(BaseCommand):
+    help = 'Import a CSV or OFX bank statement for a user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help='Username to import for')
+        parser.add_argument('--format', choices=importers.FORMATS,
+                            help='Statement format (default: from the file extension)')
+        parser.add_argument('--dry-run', action='store_true', help='Parse and deduplicate without writing')
+        parser.add_argument('--batch-size', type=int, default=importers.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--no-create-categories', action='store_true',
+                            help='Leave rows with unknown categories uncategorized')
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user {options['user']!r}")
+        format = options['format'] or options['path'].rsplit('.', 1)[-1].lower()
+        if format not in importers.FORMATS:
+            raise CommandError(f"Cannot tell the format of {options['path']!r}; pass --format")
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], encoding=options['encoding'], errors='replace', newline='') as stream:
+                result = importers.import_transactions(
+                    user, stream, format,
+                    dry_run=options['dry_run'],
+                    batch_size=options['batch_size'],
+                    create_categories=not options['no_create_categories'],
+                )
+        except importers.StatementError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        for line, message in result.errors[:20]:
+            self.stderr.write(f"line {line}: {message}")
+        if len(result.errors) > 20:
+            self.stderr.write(f"... and {len(result.errors) - 20} more errors")
+        if result.new_categories:
+            self.stdout.write(f"New categories: {', '.join(result.new_categories)}")
+        verb = 'Would import' if result.dry_run else 'Imported'
+        rate = result.parsed / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result.created} of {result.parsed} rows "
+            f"({result.duplicates} duplicates, {result.categorized} categorized by rules, {len(result.errors)} errors) "
+            f"in {elapsed:.2f}s, {rate:,.0f} rows/sec"
+        ))
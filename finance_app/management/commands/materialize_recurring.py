@@ -0,0 +1,32 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance_app import recurring
+
+
+class Command(BaseCommand):
+    help = 'Create the transactions of every recurring rule that are due'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--until', type=date.fromisoformat,
+                            help='Create occurrences up to this date (default: today)')
+        parser.add_argument('--batch-size', type=int, default=recurring.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep running, once every --interval seconds')
+        parser.add_argument('--interval', type=float, default=3600)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        while True:
+            started = time.perf_counter()
+            result = recurring.materialize(options['until'], batch_size=options['batch_size'])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"Created {result.created} transaction(s) from {result.rules} due rule(s) in {elapsed:.1f}s"
+                + (f", {result.skipped} already existed" if result.skipped else '')
+            ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance_app import provisioning
+
+
+class Command(BaseCommand):
+    help = 'Create users with default categories (and optional sample budgets and transactions) in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int)
+        parser.add_argument('--prefix', default='user', help='Usernames are PREFIX1, PREFIX2, ...')
+        parser.add_argument('--start', type=int, default=1, help='First number to use')
+        parser.add_argument('--template', help='Category template (default: FINANCE_CATEGORY_TEMPLATE)')
+        parser.add_argument('--password', help='Password for every account; unusable passwords if omitted')
+        parser.add_argument('--no-budgets', action='store_true', help='Skip the sample monthly budgets')
+        parser.add_argument('--transactions', type=int, default=0, help='Random transactions per user')
+        parser.add_argument('--years', type=float, default=1, help='How far back the transactions go')
+        parser.add_argument('--batch-size', type=int, default=500, help='Users per database transaction')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['count'] < 1 or options['batch_size'] < 1:
+            raise CommandError('count and --batch-size must be positive')
+
+        def progress(result):
+            self.stdout.write(f"  {result.users + result.skipped}/{options['count']} users processed")
+
+        started = time.perf_counter()
+        try:
+            result = provisioning.provision_users(
+                options['count'],
+                prefix=options['prefix'],
+                start=options['start'],
+                template=options['template'],
+                password=options['password'],
+                budgets=not options['no_budgets'],
+                transactions=options['transactions'],
+                years=options['years'],
+                batch_size=options['batch_size'],
+                seed=options['seed'],
+                progress=progress if options['verbosity'] > 1 else None,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if result.skipped:
+            self.stdout.write(f"Skipped {result.skipped} existing username(s)")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.users} users, {result.categories} categories, {result.budgets} budgets "
+            f"and {result.transactions} transactions in {time.perf_counter() - started:.1f}s"
+        ))
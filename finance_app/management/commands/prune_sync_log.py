@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from finance_app import sync
+
+
+class Command(BaseCommand):
+    help = 'Delete transaction tombstones older than SYNC_TOMBSTONE_DAYS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Keep this many days instead of SYNC_TOMBSTONE_DAYS')
+
+    def handle(self, *args, **options):
+        deleted = sync.prune_tombstones(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} tombstone(s)"))
@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finance_app import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild or verify the monthly per-category transaction rollup'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME',
+                            help='Limit to this user (may be repeated)')
+        parser.add_argument('--verify', action='store_true',
+                            help='Only report buckets that differ from the transactions')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+
+        if options['verify']:
+            drift = rollups.verify(users)
+            for bucket, expected, stored in drift:
+                self.stdout.write(f"{bucket}: expected {expected}, stored {stored}")
+            if drift:
+                raise CommandError(f"{len(drift)} rollup bucket(s) out of date")
+            self.stdout.write(self.style.SUCCESS('Rollup is up to date'))
+            return
+
+        count = rollups.rebuild(users, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} rollup bucket(s)'))
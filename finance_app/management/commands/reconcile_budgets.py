@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finance_app import budget_tracking
+from finance_app.models import Budget
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored spent amount of budgets from their transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME',
+                            help='Limit to this user (may be repeated)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report budgets whose stored amount has drifted')
+
+    def handle(self, *args, **options):
+        budgets = Budget.objects.all()
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+            budgets = budgets.filter(user__in=users)
+
+        drift = list(budget_tracking.find_drift(budgets).values_list('pk', 'spent', 'actual'))
+        for pk, spent, actual in drift:
+            self.stdout.write(f"Budget #{pk}: stored {spent}, actual {actual}")
+
+        if options['dry_run']:
+            self.stdout.write(f"{len(drift)} budget(s) out of date")
+            return
+
+        if drift:
+            budget_tracking.reconcile(budgets.filter(pk__in=[pk for pk, _, _ in drift]))
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {len(drift)} budget(s)"))
@@ -0,0 +1,75 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from finance_app import benchmarks
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the main views and API endpoints against a synthetic dataset in a '
+            'throwaway test database, optionally flagging regressions against a baseline')
+
+    def add_arguments(self, parser):
+        defaults = benchmarks.Dataset()
+        parser.add_argument('--users', type=int, default=defaults.users)
+        parser.add_argument('--categories', type=int, default=defaults.categories, help='Categories per user')
+        parser.add_argument('--years', type=int, default=defaults.years, help='Years of transaction history')
+        parser.add_argument('--per-month', type=int, default=defaults.per_month, help='Transactions per user per month')
+        parser.add_argument('--budget-months', type=int, default=defaults.budget_months,
+                            help='Months of budgets per expense category')
+        parser.add_argument('--seed', type=int, default=defaults.seed)
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per endpoint')
+        parser.add_argument('--only', action='append', metavar='NAME', help='Run only this scenario (may be repeated)')
+        parser.add_argument('--output', help='Write the results JSON here')
+        parser.add_argument('--baseline', help='Compare against this results JSON and fail on regressions')
+        parser.add_argument('--threshold', type=float, default=benchmarks.DEFAULT_THRESHOLD,
+                            help='Relative p95/memory increase counted as a regression')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be positive')
+        spec = benchmarks.Dataset(
+            users=options['users'],
+            categories=options['categories'],
+            years=options['years'],
+            per_month=options['per_month'],
+            budget_months=options['budget_months'],
+            seed=options['seed'],
+        )
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as handle:
+                baseline = json.load(handle)
+
+        def progress(name, result):
+            self.stdout.write(
+                f"{name:<26} {result['status']}  p50 {result['p50_ms']:>8.1f}ms  p95 {result['p95_ms']:>8.1f}ms  "
+                f"first {result['first_ms']:>8.1f}ms  {result['queries']:>4} queries  {result['peak_kb']:>9,.0f} KB"
+            )
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            self.stdout.write(f"Dataset: {spec.users} users x {spec.categories} categories x "
+                              f"{spec.transactions_per_user:,} transactions")
+            document = benchmarks.run(spec, options['iterations'], options['only'], progress)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(document, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is None:
+            return
+        if baseline.get('dataset') != document['dataset']:
+            self.stdout.write(self.style.WARNING('The baseline was recorded against a different dataset'))
+        regressions = benchmarks.compare(document, baseline, options['threshold'])
+        for regression in regressions:
+            self.stdout.write(self.style.ERROR(regression))
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
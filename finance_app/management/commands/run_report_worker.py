@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from finance_app import report_jobs
+
+
+class Command(BaseCommand):
+    help = 'Render queued reports into Report.file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Process the current queue and exit')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds to wait between polls of an empty queue')
+
+    def handle(self, *args, **options):
+        # Reports a previous worker was running when it stopped
+        swept = report_jobs.sweep_stale()
+        if swept:
+            self.stdout.write(f"Marked {swept} stale report(s) failed")
+        while True:
+            processed = report_jobs.run_pending()
+            if processed:
+                self.stdout.write(f"Processed {processed} report(s)")
+            if options['once']:
+                return
+            if not processed:
+                time.sleep(options['interval'])
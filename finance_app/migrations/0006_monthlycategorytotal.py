@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:39
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+import django.db.models.deletion
+
+
+def build_rollup(apps, schema_editor):
+    Transaction = apps.get_model('finance_app', 'Transaction')
+    MonthlyCategoryTotal = apps.get_model('finance_app', 'MonthlyCategoryTotal')
+    rows = Transaction.objects.annotate(
+        year=ExtractYear('date'),
+        month=ExtractMonth('date')
+    ).values('user_id', 'year', 'month', 'category_id', 'is_income').annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by()
+    MonthlyCategoryTotal.objects.bulk_create(
+        [MonthlyCategoryTotal(**row) for row in rows], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('finance_app', '0005_transaction_transaction_type_alter_category_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyCategoryTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('is_income', models.BooleanField(default=False)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='finance_app.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'year', 'month', 'category', 'is_income')},
+            },
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
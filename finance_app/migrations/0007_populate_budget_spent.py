@@ -0,0 +1,33 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_spent(apps, schema_editor):
+    Transaction = apps.get_model('finance_app', 'Transaction')
+    Budget = apps.get_model('finance_app', 'Budget')
+    spent = Transaction.objects.filter(
+        user=OuterRef('user'),
+        category=OuterRef('category'),
+        is_income=False,
+        date__gte=OuterRef('start_date'),
+        date__lte=OuterRef('end_date')
+    ).order_by().values('category').annotate(total=Sum('amount')).values('total')
+    Budget.objects.update(spent=Coalesce(
+        Subquery(spent, output_field=DecimalField(max_digits=10, decimal_places=2)),
+        Value(Decimal('0')),
+        output_field=DecimalField(max_digits=10, decimal_places=2)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance_app', '0006_monthlycategorytotal'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_spent, migrations.RunPython.noop),
+    ]
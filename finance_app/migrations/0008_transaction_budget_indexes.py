@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance_app', '0007_populate_budget_spent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='budget',
+            index=models.Index(fields=['user', 'start_date', 'end_date'], name='budget_user_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-date'], name='txn_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'is_income', '-date'], name='txn_user_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'category', '-date'], name='txn_user_category_date_idx'),
+        ),
+    ]
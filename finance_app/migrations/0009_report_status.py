@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:44
+
+from django.db import migrations, models
+
+
+def finish_existing_reports(apps, schema_editor):
+    # Reports created before the job queue existed were rendered inline
+    Report = apps.get_model('finance_app', 'Report')
+    Report.objects.update(status='done', progress=100)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance_app', '0008_transaction_budget_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='report',
+            name='report_type',
+            field=models.CharField(choices=[('monthly', 'Monthly Summary'), ('yearly', 'Yearly Summary'), ('category', 'Category Breakdown'), ('transactions', 'All Transactions')], max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['status', 'created_at'], name='report_status_idx'),
+        ),
+        migrations.RunPython(finish_existing_reports, migrations.RunPython.noop),
+    ]
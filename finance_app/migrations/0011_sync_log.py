@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('finance_app', '0010_dataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'updated_at'], name='txn_user_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='deletedtransaction',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deleted_transactions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='deletedtransaction',
+            index=models.Index(fields=['user', 'deleted_at'], name='deleted_txn_user_time_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from finance_app.database import create_partial_indexes, drop_partial_indexes
+
+
+def forwards(apps, schema_editor):
+    create_partial_indexes(schema_editor)
+
+
+def backwards(apps, schema_editor):
+    drop_partial_indexes(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance_app', '0011_sync_log'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('finance_app', '0012_postgres_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveHorizon',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive_horizon', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('before', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('description', models.TextField(blank=True)),
+                ('date', models.DateField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('is_income', models.BooleanField(default=False)),
+                ('transaction_type', models.CharField(choices=[('IN', 'Income'), ('EX', 'Expense')], default='EX', max_length=2)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='finance_app.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['user', '-date'], name='archived_txn_user_date_idx'), models.Index(fields=['user', 'category', '-date'], name='archived_txn_user_cat_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:14
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('finance_app', '0013_transaction_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12, validators=[django.core.validators.MinValueValidator(0.01)])),
+                ('description', models.TextField(blank=True)),
+                ('is_income', models.BooleanField(default=False)),
+                ('rule', models.CharField(help_text='RRULE, e.g. FREQ=MONTHLY;BYMONTHDAY=1', max_length=500)),
+                ('start_date', models.DateField(default=django.utils.timezone.localdate)),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('active', models.BooleanField(default=True)),
+                ('next_date', models.DateField(blank=True, editable=False, null=True)),
+                ('last_occurrence', models.DateField(blank=True, editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedtransaction',
+            name='occurrence',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='occurrence',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recurringtransaction',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='finance_app.category'),
+        ),
+        migrations.AddField(
+            model_name='recurringtransaction',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_transactions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedtransaction',
+            name='recurring',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='finance_app.recurringtransaction'),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='recurring',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='finance_app.recurringtransaction'),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(fields=('recurring', 'occurrence'), name='txn_recurring_occurrence_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringtransaction',
+            index=models.Index(fields=['active', 'next_date'], name='recurring_due_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('finance_app', '0014_recurring_transactions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataversion',
+            name='rules_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='CategorizationRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pattern', models.CharField(blank=True, help_text='Case-insensitive; leave empty to match on amount and type alone', max_length=200)),
+                ('match_type', models.CharField(choices=[('contains', 'Description contains'), ('regex', 'Description matches regex')], default='contains', max_length=10)),
+                ('min_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('max_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('is_income', models.BooleanField(blank=True, null=True)),
+                ('priority', models.PositiveSmallIntegerField(default=100, help_text='Rules with lower numbers are tried first')),
+                ('active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='finance_app.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='categorization_rules', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['priority', 'pk'],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# SQLite drops a table's triggers when it rebuilds the table, which Django
+# does for most AlterField/RemoveField operations. A later migration that
+# alters finance_app_transaction must end with a RunPython step calling
+# drop_search_index() and then create_search_index(), or search goes stale.
+# The finance_app.W001 system check reports the missing triggers.
+from django.db import migrations
+
+from finance_app.database import create_search_index, drop_search_index
+
+
+def forwards(apps, schema_editor):
+    create_search_index(schema_editor)
+
+
+def backwards(apps, schema_editor):
+    drop_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance_app', '0015_categorization_rules'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
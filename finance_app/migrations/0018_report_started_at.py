@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance_app', '0017_budget_alerts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
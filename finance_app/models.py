@@ -33,12 +33,25 @@ class Transaction(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_income = models.BooleanField(default=False)
     transaction_type = models.CharField(max_length=2, choices=TRANSACTION_TYPES, default=EXPENSE)
+    # Set on rows generated from a RecurringTransaction, see recurring.py
+    recurring = models.ForeignKey('RecurringTransaction', on_delete=models.SET_NULL, null=True, blank=True,
+                                  db_index=False, related_name='transactions')
+    occurrence = models.DateField(null=True, blank=True)
     
     def __str__(self):
         return f"{self.user.username} - {self.amount} - {self.date}"
     
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['user', '-date'], name='txn_user_date_idx'),
+            models.Index(fields=['user', 'is_income', '-date'], name='txn_user_type_date_idx'),
+            models.Index(fields=['user', 'category', '-date'], name='txn_user_category_date_idx'),
+            models.Index(fields=['user', 'updated_at'], name='txn_user_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['recurring', 'occurrence'], name='txn_recurring_occurrence_uniq'),
+        ]
 
 class Budget(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budgets')
@@ -49,15 +62,12 @@ class Budget(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     spent = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Highest alert threshold (percent spent) already notified, see budget_alerts.py
+    alerted_threshold = models.PositiveSmallIntegerField(default=0, editable=False)
     
     def get_spent_amount(self):
-        transactions = Transaction.objects.filter(
-            user=self.user,
-            category=self.category,
-            date__range=[self.start_date, self.end_date],
-            is_income=False
-        )
-        return transactions.aggregate(total=Sum('amount'))['total'] or 0
+        # Maintained on transaction writes, see budget_tracking.py
+        return self.spent or 0
     
     def get_remaining_amount(self):
         return self.amount - self.get_spent_amount()
@@ -72,12 +82,26 @@ class Budget(models.Model):
     
     class Meta:
         unique_together = ('user', 'category', 'start_date', 'end_date')
+        indexes = [
+            models.Index(fields=['user', 'start_date', 'end_date'], name='budget_user_period_idx'),
+        ]
 
 class Report(models.Model):
     REPORT_TYPE_CHOICES = [
         ('monthly', 'Monthly Summary'),
         ('yearly', 'Yearly Summary'),
         ('category', 'Category Breakdown'),
+        ('transactions', 'All Transactions'),
+    ]
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
     ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reports')
@@ -85,6 +109,189 @@ class Report(models.Model):
     parameters = models.JSONField()
     file = models.FileField(upload_to='reports/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    progress = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
     
     def __str__(self):
-        return f"{self.user.username} - {self.get_report_type_display()}"
\ No newline at end of file
+        return f"{self.user.username} - {self.get_report_type_display()}"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='report_status_idx'),
+        ]
+
+
+class MonthlyCategoryTotal(models.Model):
+    """Per-user, per-month, per-category rollup of transaction amounts"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_totals')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    is_income = models.BooleanField(default=False)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'year', 'month', 'category', 'is_income')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.year}-{self.month:02d} - {self.total}"
+
+
+class DataVersion(models.Model):
+    """Counter bumped on every write to a user's financial data"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='data_version')
+    version = models.PositiveBigIntegerField(default=0)
+    # Bumped only when the user's categorization rules change, see categorization.py
+    rules_version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user.username} - v{self.version}"
+
+
+class DeletedTransaction(models.Model):
+    """Tombstone left by a deleted transaction so sync clients can drop it"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='deleted_transactions')
+    transaction_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='deleted_txn_user_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - #{self.transaction_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class ArchivedTransaction(models.Model):
+    """A transaction moved out of the live table by archive.py, keeping its id"""
+    is_archived = True
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_transactions')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
+    description = models.TextField(blank=True)
+    date = models.DateField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_income = models.BooleanField(default=False)
+    transaction_type = models.CharField(max_length=2, choices=Transaction.TRANSACTION_TYPES, default=Transaction.EXPENSE)
+    recurring = models.ForeignKey('RecurringTransaction', on_delete=models.SET_NULL, null=True, blank=True,
+                                  db_index=False, related_name='+')
+    occurrence = models.DateField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['user', '-date'], name='archived_txn_user_date_idx'),
+            models.Index(fields=['user', 'category', '-date'], name='archived_txn_user_cat_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.amount} - {self.date} (archived)"
+
+
+class ArchiveHorizon(models.Model):
+    """A user's archive boundary: archived transactions are all dated before it"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='archive_horizon')
+    before = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} - archived before {self.before}"
+
+
+class RecurringTransaction(models.Model):
+    """A transaction repeated on an RRULE schedule; recurring.py creates the due occurrences"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_transactions')
+    amount = models.DecimalField(max_digits=12, decimal_places=2, validators=[MinValueValidator(0.01)])
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
+    description = models.TextField(blank=True)
+    is_income = models.BooleanField(default=False)
+    rule = models.CharField(max_length=500, help_text='RRULE, e.g. FREQ=MONTHLY;BYMONTHDAY=1')
+    start_date = models.DateField(default=timezone.localdate)
+    end_date = models.DateField(null=True, blank=True)
+    active = models.BooleanField(default=True)
+    # Next occurrence still to be created (None once the schedule has run out),
+    # and the last one created
+    next_date = models.DateField(null=True, blank=True, editable=False)
+    last_occurrence = models.DateField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['active', 'next_date'], name='recurring_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.description or self.rule} - {self.amount}"
+
+
+class CategorizationRule(models.Model):
+    """Puts new uncategorized transactions that match it in a category; see categorization.py"""
+    CONTAINS = 'contains'
+    REGEX = 'regex'
+    MATCH_TYPES = [
+        (CONTAINS, 'Description contains'),
+        (REGEX, 'Description matches regex'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='categorization_rules')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    pattern = models.CharField(max_length=200, blank=True,
+                               help_text='Case-insensitive; leave empty to match on amount and type alone')
+    match_type = models.CharField(max_length=10, choices=MATCH_TYPES, default=CONTAINS)
+    min_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    max_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    # None matches both income and expenses
+    is_income = models.BooleanField(null=True, blank=True)
+    priority = models.PositiveSmallIntegerField(default=100, help_text='Rules with lower numbers are tried first')
+    active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['priority', 'pk']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.pattern or 'any description'} -> {self.category.name}"
+
+
+class Notification(models.Model):
+    """An in-app message to a user, e.g. a budget alert from budget_alerts.py"""
+    BUDGET_ALERT = 'budget_alert'
+    KINDS = [
+        (BUDGET_ALERT, 'Budget alert'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    message = models.CharField(max_length=255)
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, null=True, blank=True, related_name='notifications')
+    threshold = models.PositiveSmallIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at', '-pk']
+        indexes = [
+            models.Index(fields=['user', 'read_at'], name='notification_user_read_idx'),
+        ]
+
+    @property
+    def is_read(self):
+        return self.read_at is not None
+
+    def __str__(self):
+        return f"{self.user.username} - {self.message}"
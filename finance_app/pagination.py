@@ -0,0 +1,126 @@
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db.models import Q, Sum
+
+from .models import MonthlyCategoryTotal
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(position, direction):
+    """Opaque token for a (date, id) position and paging direction"""
+    day, pk = position
+    payload = json.dumps([day.isoformat(), pk, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        day, pk, direction = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return (date.fromisoformat(day), int(pk)), direction
+    except (ValueError, TypeError, json.JSONDecodeError) as exc:
+        raise InvalidCursor(f"Invalid cursor: {token!r}") from exc
+
+
+@dataclass
+class KeysetPage:
+    items: list = field(default_factory=list)
+    next_cursor: str = None
+    previous_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def _fetch(queryset, position, direction, page_size, fields):
+    """Up to page_size + 1 rows past ``position`` in paging order"""
+    if position is not None:
+        day, pk = position
+        if direction == 'next':
+            queryset = queryset.filter(Q(date__lt=day) | Q(date=day, pk__lt=pk))
+        else:
+            queryset = queryset.filter(Q(date__gt=day) | Q(date=day, pk__gt=pk))
+
+    if direction == 'next':
+        queryset = queryset.order_by('-date', '-pk')
+    else:
+        queryset = queryset.order_by('date', 'pk')
+    if fields:
+        return list(queryset.values_list(*fields)[:page_size + 1])
+    return list(queryset[:page_size + 1])
+
+
+def paginate(queryset, cursor=None, page_size=10, fields=None, older=None):
+    """
+    Newest-first page of a transaction queryset, keyed on (date, id) so a
+    deep page costs the same as the first one. ``cursor`` is a token from a
+    previous page's next_cursor/previous_cursor. With ``fields`` (which must
+    include 'date' and 'id') the items are values_list() tuples instead of
+    model instances.
+
+    ``older`` is an optional (queryset, before) pair from archive.older():
+    rows all dated before ``before`` that are merged into the page, but
+    only queried when the page reaches that date.
+    """
+    direction, position = 'next', None
+    if cursor:
+        position, direction = decode_cursor(cursor)
+
+    if fields:
+        date_index, pk_index = fields.index('date'), fields.index('id')
+        key = lambda row: (row[date_index], row[pk_index])
+    else:
+        key = lambda row: (row.date, row.pk)
+    rows = _fetch(queryset, position, direction, page_size, fields)
+
+    if older is not None:
+        archived, before = older
+        if direction == 'next':
+            # A full page ending on or after the horizon can't contain archived rows
+            reached = len(rows) <= page_size or key(rows[-1])[0] < before
+        else:
+            reached = position is None or position[0] < before
+        if reached:
+            rows = sorted(
+                rows + _fetch(archived, position, direction, page_size, fields),
+                key=key, reverse=direction == 'next'
+            )[:page_size + 1]
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if direction == 'prev':
+        rows.reverse()
+
+    page = KeysetPage(items=rows)
+    if rows:
+        first, last = key(rows[0]), key(rows[-1])
+        if direction == 'next':
+            if has_more:
+                page.next_cursor = encode_cursor(last, 'next')
+            if cursor:
+                page.previous_cursor = encode_cursor(first, 'prev')
+        else:
+            if has_more:
+                page.previous_cursor = encode_cursor(first, 'prev')
+            page.next_cursor = encode_cursor(last, 'next')
+    return page
+
+
+def approximate_count(user):
+    """Transaction count read from the monthly rollup instead of COUNT(*)"""
+    return MonthlyCategoryTotal.objects.filter(user=user).aggregate(
+        count=Sum('count')
+    )['count'] or 0
@@ -0,0 +1,158 @@
+"""
+PDF rendering for reports. Everything here works on plain Python data so it
+can run in a separate worker process without Django set up.
+"""
+from decimal import Decimal
+from io import BytesIO
+from itertools import islice
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+# Splitting long tables keeps reportlab's layout roughly linear in row count
+ROWS_PER_TABLE = 400
+CHART_DPI = 150
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f2f2f2')]),
+])
+TOTALS_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('LINEABOVE', (0, 0), (-1, 0), 1, colors.black),
+])
+
+
+class TooManyRows(ValueError):
+    pass
+
+
+def report_payload(result, title, max_rows=None):
+    """
+    The picklable subset of a ReportResult needed to render it. The rows
+    have to be materialized to cross into the worker process, so with
+    ``max_rows`` no more than that many are read before giving up.
+    """
+    rows = result.rows if max_rows is None else islice(result.rows, max_rows + 1)
+    rows = [list(row) for row in rows]
+    if max_rows is not None and len(rows) > max_rows:
+        raise TooManyRows(
+            f"The report has more than {max_rows:,} rows, too many for a PDF; export it as CSV or NDJSON instead."
+        )
+    return {
+        'title': title,
+        'report_type': result.report_type,
+        'subtitle': f"{result.start_date} to {result.end_date}",
+        'granularity': result.granularity,
+        'columns': list(result.columns),
+        'rows': rows,
+    }
+
+
+def _format(value):
+    if value is None:
+        return '-'
+    if isinstance(value, (float, Decimal)):
+        return f"{value:,.2f}"
+    return str(value)
+
+
+def _totals(payload):
+    """Label/value pairs summarising the report"""
+    columns, rows = payload['columns'], payload['rows']
+    if payload['report_type'] in ('monthly', 'yearly'):
+        income = sum(row[columns.index('income')] for row in rows)
+        expenses = sum(row[columns.index('expenses')] for row in rows)
+        return [('Total income', income), ('Total expenses', expenses), ('Net', income - expenses)]
+    if payload['report_type'] == 'category':
+        income = sum(row[columns.index('total')] for row in rows if row[columns.index('type')] == 'Income')
+        expenses = sum(row[columns.index('total')] for row in rows if row[columns.index('type')] == 'Expense')
+        return [('Total income', income), ('Total expenses', expenses), ('Categories', len(rows))]
+    income = sum(row[columns.index('amount')] for row in rows if row[columns.index('is_income')])
+    expenses = sum(row[columns.index('amount')] for row in rows if not row[columns.index('is_income')])
+    return [('Transactions', len(rows)), ('Total income', income), ('Total expenses', expenses)]
+
+
+def _chart(payload):
+    """Rasterize the report's chart to PNG bytes, or None if it has none"""
+    from matplotlib.figure import Figure
+
+    columns, rows = payload['columns'], payload['rows']
+    if not rows or payload['report_type'] == 'transactions':
+        return None
+
+    figure = Figure(figsize=(8, 3.5))
+    axes = figure.add_subplot()
+    if payload['report_type'] in ('monthly', 'yearly'):
+        labels = [row[0] for row in rows]
+        positions = range(len(rows))
+        axes.bar([p - 0.2 for p in positions], [float(row[columns.index('income')]) for row in rows],
+                 width=0.4, label='Income', color='#4bc0c0')
+        axes.bar([p + 0.2 for p in positions], [float(row[columns.index('expenses')]) for row in rows],
+                 width=0.4, label='Expenses', color='#ff6384')
+        axes.plot(positions, [float(row[columns.index('running_balance')]) for row in rows],
+                  label='Running balance', color='#36a2eb')
+        step = max(1, len(labels) // 12)
+        axes.set_xticks(list(positions)[::step], labels[::step], rotation=45, ha='right', fontsize=7)
+        axes.legend(fontsize=7)
+    else:
+        expenses = [row for row in rows if row[columns.index('type')] == 'Expense']
+        if not expenses:
+            return None
+        expenses.sort(key=lambda row: row[columns.index('total')])
+        axes.barh([row[0] or 'Uncategorized' for row in expenses],
+                  [float(row[columns.index('total')]) for row in expenses], color='#ff6384')
+        axes.set_title('Expenses by category', fontsize=9)
+        axes.tick_params(labelsize=7)
+    figure.tight_layout()
+
+    buffer = BytesIO()
+    figure.savefig(buffer, format='png', dpi=CHART_DPI)
+    return buffer.getvalue()
+
+
+def render_pdf(payload):
+    """Build the full PDF for a report payload and return its bytes"""
+    styles = getSampleStyleSheet()
+    story = [
+        Paragraph(payload['title'], styles['Title']),
+        Paragraph(payload['subtitle'], styles['Normal']),
+        Spacer(1, 12),
+    ]
+
+    totals = Table([[label, _format(value)] for label, value in _totals(payload)], hAlign='LEFT')
+    totals.setStyle(TOTALS_STYLE)
+    story += [totals, Spacer(1, 12)]
+
+    chart = _chart(payload)
+    if chart:
+        story += [Image(BytesIO(chart), width=17 * cm, height=7.4 * cm), Spacer(1, 12)]
+
+    header = [column.replace('_', ' ').title() for column in payload['columns']]
+    rows = [[_format(value) for value in row] for row in payload['rows']]
+    if not rows:
+        story.append(Paragraph('No data for this period.', styles['Normal']))
+    for start in range(0, len(rows), ROWS_PER_TABLE):
+        table = Table([header] + rows[start:start + ROWS_PER_TABLE], repeatRows=1)
+        table.setStyle(TABLE_STYLE)
+        story.append(table)
+
+    output = BytesIO()
+    document = SimpleDocTemplate(output, pagesize=A4, title=payload['title'])
+    document.build(story, onLaterPages=_page_number, onFirstPage=_page_number)
+    return output.getvalue()
+
+
+def _page_number(canvas, document):
+    canvas.saveState()
+    canvas.setFont('Helvetica', 8)
+    canvas.drawRightString(A4[0] - 2 * cm, 1.2 * cm, f"Page {document.page}")
+    canvas.restoreState()
@@ -0,0 +1,154 @@
+"""
+Account setup: the default categories every new user gets, and batched
+provisioning of many users at once (with optional sample budgets and
+transactions) for onboarding imports and load-test fixtures.
+"""
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import Budget, Category, Transaction
+from . import budget_tracking, rollups
+
+
+def category_template(name=None):
+    """(name, is_income) pairs of a category template from settings"""
+    templates = getattr(settings, 'FINANCE_CATEGORY_TEMPLATES', {})
+    name = name or getattr(settings, 'FINANCE_CATEGORY_TEMPLATE', 'default')
+    if name not in templates:
+        raise ValueError(f"Unknown category template {name!r}")
+    return templates[name]
+
+
+def create_default_categories(users, template=None, pairs=None):
+    """Give each user the template's categories (or ``pairs``) in one bulk INSERT"""
+    return Category.objects.bulk_create([
+        Category(user=user, name=name, is_income=is_income)
+        for user in users
+        for name, is_income in (pairs or category_template(template))
+    ])
+
+
+@dataclass
+class ProvisionResult:
+    users: int = 0
+    skipped: int = 0
+    categories: int = 0
+    budgets: int = 0
+    transactions: int = 0
+
+
+def _sample_budgets(categories, rng, today, months=1):
+    """Monthly budgets for each expense category, this month and the ``months - 1`` before it"""
+    periods = []
+    start = today.replace(day=1)
+    for _ in range(months):
+        end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        periods.append((start, end))
+        start = (start - timedelta(days=1)).replace(day=1)
+    return [
+        Budget(
+            user_id=category.user_id,
+            category=category,
+            amount=Decimal(rng.randrange(2, 21) * 50),
+            start_date=start,
+            end_date=end,
+            spent=Decimal('0'),
+        )
+        for category in categories
+        if not category.is_income
+        for start, end in periods
+    ]
+
+
+def _sample_transactions(user, user_categories, count, years, rng, today):
+    incomes = [category for category in user_categories if category.is_income]
+    expenses = [category for category in user_categories if not category.is_income]
+    span = max(1, int(years * 365))
+    rows = []
+    for index in range(count):
+        is_income = bool(incomes) and (not expenses or rng.random() < 0.15)
+        choices = incomes if is_income else expenses
+        category = rng.choice(choices) if choices else None
+        amount = rng.randrange(50000, 500000) if is_income else rng.randrange(100, 25000)
+        rows.append(Transaction(
+            user=user,
+            category=category,
+            amount=Decimal(amount) / 100,
+            description=f"{category.name if category else 'Transaction'} #{index + 1}",
+            date=today - timedelta(days=rng.randrange(span)),
+            is_income=is_income,
+            transaction_type=Transaction.INCOME if is_income else Transaction.EXPENSE,
+        ))
+    return rows
+
+
+def provision_users(count, prefix='user', start=1, template=None, password=None,
+                    budgets=True, transactions=0, years=1, batch_size=500, seed=0, progress=None,
+                    categories=None, budget_months=1):
+    """
+    Create ``count`` users named ``prefix + number`` with their default
+    categories (or the given (name, is_income) ``categories``), plus
+    optional sample budgets for the last ``budget_months`` months and
+    ``transactions`` random transactions each over the last ``years`` years.
+    Existing usernames are skipped. Each batch of users is written in its
+    own transaction with bulk INSERTs, and the rollup and budget spending
+    are rebuilt per batch since bulk_create skips the signals that maintain
+    them. ``password`` is hashed once and shared; without it the accounts
+    get unusable passwords.
+    """
+    pairs = categories or category_template(template)
+    rng = random.Random(seed)
+    today = date.today()
+    password_hash = make_password(password) if password else None
+    result = ProvisionResult()
+
+    for offset in range(0, count, batch_size):
+        names = [f"{prefix}{number}" for number in range(start + offset, start + min(count, offset + batch_size))]
+        existing = set(User.objects.filter(username__in=names).values_list('username', flat=True))
+        result.skipped += len(existing)
+        new_users = []
+        for name in names:
+            if name in existing:
+                continue
+            user = User(username=name, email=f"{name}@example.com")
+            if password_hash:
+                user.password = password_hash
+            else:
+                user.set_unusable_password()
+            new_users.append(user)
+        if not new_users:
+            continue
+
+        with transaction.atomic():
+            users = User.objects.bulk_create(new_users)
+            user_categories = create_default_categories(users, pairs=pairs)
+            result.users += len(users)
+            result.categories += len(user_categories)
+
+            if budgets:
+                sample = _sample_budgets(user_categories, rng, today, budget_months)
+                result.budgets += len(Budget.objects.bulk_create(sample))
+
+            if transactions:
+                by_user = {}
+                for category in user_categories:
+                    by_user.setdefault(category.user_id, []).append(category)
+                rows = []
+                for user in users:
+                    rows += _sample_transactions(user, by_user.get(user.pk, []), transactions, years, rng, today)
+                Transaction.objects.bulk_create(rows, batch_size=5000)
+                result.transactions += len(rows)
+                rollups.rebuild(users=users)
+                if budgets:
+                    budget_tracking.reconcile(Budget.objects.filter(user__in=users))
+
+        if progress:
+            progress(result)
+    return result
@@ -0,0 +1,74 @@
+from datetime import date, datetime, timezone
+
+from django.db import connection
+from django.db.models import Q, Sum
+
+from .models import Budget, MonthlyCategoryTotal, Transaction
+
+APP_TABLES = (
+    Transaction._meta.db_table,
+    Budget._meta.db_table,
+    MonthlyCategoryTotal._meta.db_table,
+)
+
+
+def hot_queries(user_id=1):
+    """The main queries issued by the views and write-path maintenance"""
+    start, end = date(2024, 1, 1), date(2024, 1, 31)
+    transactions = Transaction.objects.filter(user_id=user_id)
+    expenses = transactions.filter(is_income=False)
+    return {
+        'TransactionListView': transactions.order_by('-date')[:10],
+        'dashboard recent transactions': transactions.select_related('category').order_by('-date')[:5],
+        'dashboard month by category': MonthlyCategoryTotal.objects.filter(
+            user_id=user_id, year=2024, month=1
+        ).values('category_id').annotate(
+            income=Sum('total', filter=Q(is_income=True)),
+            expenses=Sum('total', filter=Q(is_income=False)),
+        ).order_by(),
+        'dashboard budgets': Budget.objects.filter(
+            user_id=user_id, start_date__lte=end, end_date__gte=start
+        ).values('category_id').annotate(total=Sum('amount')).order_by(),
+        'expense_list': expenses.order_by('-date'),
+        'expense_list total': expenses.values('user_id').annotate(total=Sum('amount')).order_by(),
+        'monthly report edge months': transactions.filter(date__range=[start, end]),
+        'api_transactions': transactions,
+        'BudgetListView': Budget.objects.filter(user_id=user_id).select_related('category'),
+        'budget spent maintenance': Budget.objects.filter(
+            user_id=user_id, category_id=1, start_date__lte=start, end_date__gte=start
+        ),
+        'budget spent recompute': expenses.filter(category_id=1, date__range=[start, end]),
+        'dashboard budget progress': Budget.objects.filter(
+            user_id=user_id, start_date__lte=end, end_date__gte=start
+        ).select_related('category'),
+        'budget alerts': Budget.objects.filter(
+            category_id__in=[1, 2], start_date__lte=end, end_date__gte=start
+        ).values_list('pk', 'amount', 'spent', 'alerted_threshold'),
+        'sync changes': transactions.filter(updated_at__gt=datetime(2024, 1, 1, tzinfo=timezone.utc)).order_by('updated_at', 'pk'),
+        'forecast daily expenses': expenses.filter(date__range=[start, end]).values_list(
+            'category_id', 'date'
+        ).annotate(total=Sum('amount')).order_by(),
+    }
+
+
+def plan(queryset):
+    """The SQLite query plan of ``queryset``, one line per step"""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def _on_app_table(line):
+    return any(table in line.split()[1] for table in APP_TABLES)
+
+
+def check(user_id=1):
+    """{name: problems} for every hot query; an empty list means it only reaches app tables through an index"""
+    problems = {}
+    for name, queryset in hot_queries(user_id).items():
+        lines = plan(queryset)
+        problems[name] = [line for line in lines if line.startswith('SCAN ') and _on_app_table(line)]
+        if not any(line.startswith('SEARCH ') and _on_app_table(line) for line in lines):
+            problems[name].append('no index used: ' + '; '.join(lines))
+    return problems
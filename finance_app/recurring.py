@@ -0,0 +1,219 @@
+"""
+Recurring transactions. A RecurringTransaction holds an RRULE and the date
+of its next occurrence still to be created; materialize() turns every due
+occurrence of every active rule into a Transaction, a batch of rules at a
+time with bulk INSERTs. Generated rows carry (recurring, occurrence), which
+is unique, so a batch that was already written by another run fails as a
+whole instead of duplicating anything.
+
+Occurrences are computed with dateutil from the rule's next_date rather
+than its start date. next_date is always an occurrence, so the series is
+the same and doesn't have to be iterated from the beginning. The results
+are shared by every rule with the same RRULE and next date.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+
+from dateutil.rrule import DAILY, MONTHLY, WEEKLY, YEARLY, rrulestr
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+from .models import RecurringTransaction, Transaction
+from . import budget_tracking, rollups, user_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+# Times a batch is retried after another run wrote some of its occurrences first
+MAX_CONFLICT_RETRIES = 3
+FREQUENCIES = (DAILY, WEEKLY, MONTHLY, YEARLY)
+
+
+class InvalidRule(ValueError):
+    pass
+
+
+@lru_cache(maxsize=1024)
+def parse_rule(text):
+    """dateutil rrule for an RRULE value, e.g. 'FREQ=MONTHLY;BYMONTHDAY=1'"""
+    value = text.strip()
+    if value.upper().startswith('RRULE:'):
+        value = value[6:]
+    if not value or '\n' in value:
+        raise InvalidRule('Enter a single RRULE, e.g. FREQ=MONTHLY;BYMONTHDAY=1')
+    try:
+        rule = rrulestr(value, ignoretz=True)
+    except (ValueError, TypeError) as exc:
+        raise InvalidRule(f'Invalid RRULE: {exc}') from exc
+    if rule._freq not in FREQUENCIES:
+        raise InvalidRule('Only DAILY, WEEKLY, MONTHLY and YEARLY rules are supported')
+    if rule._count is not None:
+        # Occurrences are counted from next_date, not the start; see the module docstring
+        raise InvalidRule('COUNT is not supported; set an end date instead')
+    return rule
+
+
+def _start_of(day):
+    return datetime(day.year, day.month, day.day)
+
+
+def first_occurrence(recurring, after=None):
+    """The rule's first occurrence after ``after`` (or from its start), or None"""
+    series = parse_rule(recurring.rule).replace(dtstart=_start_of(recurring.start_date))
+    if after is None:
+        moment = series.after(_start_of(recurring.start_date), inc=True)
+    else:
+        moment = series.after(_start_of(after))
+    if moment is None or (recurring.end_date and moment.date() > recurring.end_date):
+        return None
+    return moment.date()
+
+
+def schedule(recurring):
+    """Set next_date from the rule and start date, past any occurrence already created"""
+    recurring.next_date = first_occurrence(recurring, after=recurring.last_occurrence)
+
+
+def _occurrences(rule, anchor, until):
+    """Occurrence dates from ``anchor`` (itself an occurrence) through ``until``, and the next one after"""
+    dates = []
+    for moment in parse_rule(rule).replace(dtstart=_start_of(anchor)):
+        day = moment.date()
+        if day > until:
+            return dates, day
+        dates.append(day)
+    return dates, None
+
+
+# ============== Materialization ==============
+@dataclass
+class MaterializeResult:
+    rules: int = 0
+    created: int = 0
+    skipped: int = 0
+    conflicts: int = 0
+
+
+def _materialize_batch(rules, until, series, result):
+    """Create the due occurrences of one batch of rules in one transaction"""
+    existing = set(Transaction.objects.filter(
+        recurring_id__in=[rule.pk for rule in rules],
+        occurrence__gte=min(rule.next_date for rule in rules),
+    ).values_list('recurring_id', 'occurrence'))
+
+    rows, skipped = [], 0
+    for rule in rules:
+        key = (rule.rule, rule.next_date)
+        if key not in series:
+            series[key] = _occurrences(rule.rule, rule.next_date, until)
+        dates, following = series[key]
+        if rule.end_date is not None:
+            dates = [day for day in dates if day <= rule.end_date]
+            if following is not None and following > rule.end_date:
+                following = None
+        for day in dates:
+            if (rule.pk, day) in existing:
+                skipped += 1
+                continue
+            rows.append(Transaction(
+                user_id=rule.user_id,
+                amount=rule.amount,
+                category_id=rule.category_id,
+                description=rule.description,
+                date=day,
+                is_income=rule.is_income,
+                transaction_type=Transaction.INCOME if rule.is_income else Transaction.EXPENSE,
+                recurring_id=rule.pk,
+                occurrence=day,
+            ))
+        if dates:
+            rule.last_occurrence = dates[-1]
+        rule.next_date = following
+
+    with transaction.atomic():
+        Transaction.objects.bulk_create(rows, batch_size=DEFAULT_BATCH_SIZE)
+        # One UPDATE per distinct value; rules on the same schedule share them
+        for field in ('next_date', 'last_occurrence'):
+            groups = {}
+            for rule in rules:
+                groups.setdefault(getattr(rule, field), []).append(rule.pk)
+            for value, ids in groups.items():
+                RecurringTransaction.objects.filter(pk__in=ids).update(**{field: value})
+        # bulk_create skips the signals that maintain these
+        changes = [(None, rollups.snapshot(row)) for row in rows]
+        rollups.record_changes(changes)
+        budget_tracking.record_changes(changes)
+        user_cache.bump_versions({row.user_id for row in rows})
+    result.rules += len(rules)
+    result.created += len(rows)
+    result.skipped += skipped
+
+
+def materialize(until=None, batch_size=DEFAULT_BATCH_SIZE, users=None, progress=None):
+    """
+    Create every occurrence of the active rules that falls on or before
+    ``until`` (today). Rules are read in primary key order, ``batch_size``
+    at a time; each batch commits on its own. Running it again, or from
+    several processes at once, doesn't create anything twice.
+    """
+    until = until or date.today()
+    due = RecurringTransaction.objects.filter(active=True, next_date__lte=until).order_by('pk')
+    if users is not None:
+        due = due.filter(user__in=users)
+
+    result = MaterializeResult()
+    series = {}
+    last_pk = retries = 0
+    while True:
+        rules = list(due.filter(pk__gt=last_pk)[:batch_size])
+        if not rules:
+            return result
+        try:
+            _materialize_batch(rules, until, series, result)
+        except IntegrityError:
+            # Another run created some of these occurrences first; its
+            # commit also moved those rules' next_date on, so re-read them
+            result.conflicts += 1
+            retries += 1
+            if retries > MAX_CONFLICT_RETRIES:
+                raise
+            continue
+        last_pk, retries = rules[-1].pk, 0
+        if progress:
+            progress(result)
+
+
+# ============== In-process scheduler ==============
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def _run_scheduler(interval):
+    while True:
+        try:
+            result = materialize()
+            if result.created:
+                logger.info("Created %s recurring transaction(s) from %s rule(s)", result.created, result.rules)
+        except Exception:
+            logger.exception("Recurring transaction run failed")
+        finally:
+            connection.close()
+        time.sleep(interval)
+
+
+def start_scheduler(interval=None):
+    """Run materialize() every ``interval`` seconds (RECURRING_INTERVAL_SECONDS) in a daemon thread"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            return _scheduler
+        interval = interval or getattr(settings, 'RECURRING_INTERVAL_SECONDS', 3600)
+        _scheduler = threading.Thread(
+            target=_run_scheduler, args=(interval,), name='recurring-scheduler', daemon=True
+        )
+        _scheduler.start()
+        return _scheduler
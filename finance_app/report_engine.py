@@ -0,0 +1,153 @@
+import heapq
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.db.models import Sum
+
+from .database import TruncDay, TruncWeek
+from . import archive, rollups
+
+GRANULARITIES = {
+    # granularity: (pandas period frequency, database truncation)
+    'day': ('D', TruncDay),
+    'week': ('W-SUN', TruncWeek),
+    'month': ('M', None),
+    'year': ('Y', None),
+}
+DEFAULT_GRANULARITY = {
+    'monthly': 'month',
+    'yearly': 'year',
+}
+MOVING_AVERAGE_WINDOW = 3
+TRANSACTION_CHUNK_SIZE = 2000
+CENT = Decimal('0.01')
+
+
+@dataclass
+class ReportResult:
+    report_type: str
+    start_date: object
+    end_date: object
+    columns: tuple
+    rows: object = field(default_factory=list)
+    granularity: str = None
+
+    def records(self):
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+
+def _money(values):
+    """Amounts aggregated as floats, back to Decimal cents like the stored amounts"""
+    # + 0.0 turns a rounded -0.0 into 0.0
+    return [Decimal(str(round(value, 2) + 0.0)).quantize(CENT) for value in values.tolist()]
+
+
+def _period_totals(user, start_date, end_date, granularity):
+    """(period, is_income, total) columns grouped by the database"""
+    freq, trunc = GRANULARITIES[granularity]
+    if trunc is None:
+        group = ('year', 'month') if granularity == 'month' else ('year',)
+        rows = rollups.range_totals(user, start_date, end_date, group)
+        periods = [pd.Period(year=row['year'], month=row.get('month', 1), day=1, freq=freq) for row in rows]
+        return periods, [row['is_income'] for row in rows], [row['total'] for row in rows]
+
+    periods, is_income, totals = [], [], []
+    for queryset in archive.sources(user, start_date):
+        rows = queryset.filter(
+            date__range=[start_date, end_date]
+        ).annotate(period=trunc('date')).values_list('period', 'is_income').annotate(
+            total=Sum('amount')
+        ).order_by()
+        for period, income, total in rows:
+            periods.append(pd.Period(period, freq=freq))
+            is_income.append(income)
+            totals.append(total)
+    return periods, is_income, totals
+
+
+def period_report(user, report_type, start_date, end_date, granularity=None):
+    """
+    Income, expenses and net per period over the whole range (empty periods
+    included), with running balance and moving average of expenses computed
+    on the columnar series.
+    """
+    granularity = granularity or DEFAULT_GRANULARITY[report_type]
+    freq = GRANULARITIES[granularity][0]
+    periods, is_income, totals = _period_totals(user, start_date, end_date, granularity)
+
+    index = pd.period_range(pd.Period(start_date, freq=freq), pd.Period(end_date, freq=freq), freq=freq)
+    frame = pd.DataFrame({
+        'period': pd.PeriodIndex(periods, freq=freq),
+        'is_income': np.asarray(is_income, dtype=bool),
+        'total': np.asarray(totals, dtype=float),
+    })
+    income = frame[frame['is_income']].groupby('period')['total'].sum().reindex(index, fill_value=0.0).to_numpy()
+    expenses = frame[~frame['is_income']].groupby('period')['total'].sum().reindex(index, fill_value=0.0).to_numpy()
+
+    net = income - expenses
+    running_balance = np.cumsum(net)
+    moving_average = pd.Series(expenses).rolling(MOVING_AVERAGE_WINDOW, min_periods=1).mean().to_numpy()
+
+    columns = ('period', 'income', 'expenses', 'net', 'running_balance', 'expenses_moving_avg')
+    rows = list(zip(
+        index.astype(str),
+        _money(income),
+        _money(expenses),
+        _money(net),
+        _money(running_balance),
+        _money(moving_average),
+    ))
+    return ReportResult(report_type, start_date, end_date, columns, rows, granularity)
+
+
+def category_report(user, report_type, start_date, end_date, granularity=None):
+    """Totals per category, with each category's share of its type's total"""
+    rows = rollups.range_totals(user, start_date, end_date, ('category_id', 'category__name'))
+    names = [row['category__name'] or 'Uncategorized' for row in rows]
+    is_income = np.array([row['is_income'] for row in rows], dtype=bool)
+    totals = np.array([row['total'] for row in rows], dtype=float)
+    counts = [row['count'] for row in rows]
+
+    type_totals = np.where(is_income, totals[is_income].sum(), totals[~is_income].sum())
+    share = np.divide(totals * 100, type_totals, out=np.zeros_like(totals), where=type_totals > 0)
+
+    columns = ('category', 'type', 'total', 'count', 'share')
+    rows = list(zip(
+        names,
+        np.where(is_income, 'Income', 'Expense').tolist(),
+        _money(totals),
+        counts,
+        np.round(share, 2).tolist(),
+    ))
+    return ReportResult(report_type, start_date, end_date, columns, rows)
+
+
+def transaction_report(user, report_type, start_date, end_date, granularity=None):
+    """
+    Raw transactions, read lazily in chunks; the rows can be consumed once.
+    Archived rows are merged in by (date, id) when the range reaches them.
+    """
+    parts = [
+        queryset.filter(date__range=[start_date, end_date]).order_by('date', 'pk').values_list(
+            'date', 'pk', 'description', 'category__name', 'is_income', 'amount'
+        ).iterator(chunk_size=TRANSACTION_CHUNK_SIZE)
+        for queryset in archive.sources(user, start_date)
+    ]
+    rows = ((row[0],) + row[2:] for row in heapq.merge(*parts))
+    columns = ('date', 'description', 'category', 'is_income', 'amount')
+    return ReportResult(report_type, start_date, end_date, columns, rows)
+
+
+BUILDERS = {
+    'monthly': period_report,
+    'yearly': period_report,
+    'category': category_report,
+    'transactions': transaction_report,
+}
+
+
+def build_report(user, report_type, start_date, end_date, granularity=None):
+    """Compute a report once; every output format renders the same result"""
+    return BUILDERS[report_type](user, report_type, start_date, end_date, granularity)
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Report
+from . import exports, pdf, report_engine, rollups, user_cache
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EVERY = 10000
+
+PDF_CACHE_DIR = 'reports/cache'
+
+STALE_ERROR = 'The report worker stopped before the report was finished; please generate it again.'
+
+_executor = None
+_pdf_pool = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'REPORT_WORKER_THREADS', 2),
+            thread_name_prefix='report-worker'
+        )
+    return _executor
+
+
+def _get_pdf_pool():
+    # Spawned rather than forked: the parent holds DB connections and threads
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(
+            max_workers=getattr(settings, 'REPORT_PDF_PROCESSES', 2),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _pdf_pool
+
+
+def pdf_cache_name(report):
+    key = json.dumps(
+        [report.user_id, report.report_type, report.parameters, user_cache.get_version(report.user_id)],
+        sort_keys=True
+    )
+    return f"{PDF_CACHE_DIR}/{hashlib.sha256(key.encode()).hexdigest()}.pdf"
+
+
+def _render_pdf(report, result, name):
+    """Render a report's PDF in the process pool and store it under ``name``"""
+    payload = pdf.report_payload(
+        result, report.get_report_type_display(), getattr(settings, 'REPORT_PDF_MAX_ROWS', 20000)
+    )
+    content = _get_pdf_pool().submit(pdf.render_pdf, payload).result()
+    return default_storage.save(name, ContentFile(content))
+
+
+def enqueue(user, report_type, start_date, end_date, format, granularity=None):
+    """
+    Record a report request and hand it to a worker. With the default
+    'thread' REPORT_WORKER it runs in this process once the transaction
+    commits; with 'queue' it waits for ``manage.py run_report_worker``.
+    """
+    sweep_stale()
+    report = Report.objects.create(
+        user=user,
+        report_type=report_type,
+        parameters={
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'format': format,
+            'granularity': granularity,
+        }
+    )
+    if getattr(settings, 'REPORT_WORKER', 'thread') == 'thread':
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, report.pk))
+    return report
+
+
+def _run_in_thread(report_id):
+    try:
+        run(report_id)
+    finally:
+        connection.close()
+
+
+def _claim(report_id):
+    """Move a pending report to running; False if another worker has it"""
+    return Report.objects.filter(pk=report_id, status=Report.PENDING).update(
+        status=Report.RUNNING, progress=0, started_at=timezone.now()
+    ) == 1
+
+
+def sweep_stale(now=None):
+    """
+    Mark failed the reports whose worker died with them: running for longer
+    than REPORT_STALE_AFTER_MINUTES or, with the 'thread' REPORT_WORKER
+    (whose queue is lost when the process exits), pending for that long.
+    Returns how many were marked.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(minutes=getattr(settings, 'REPORT_STALE_AFTER_MINUTES', 30))
+    # Reports claimed before started_at existed fall back to their creation time
+    stale = Q(status=Report.RUNNING) & (
+        Q(started_at__lt=cutoff) | Q(started_at__isnull=True, created_at__lt=cutoff)
+    )
+    if getattr(settings, 'REPORT_WORKER', 'thread') == 'thread':
+        stale |= Q(status=Report.PENDING, created_at__lt=cutoff)
+    swept = Report.objects.filter(stale).update(status=Report.FAILED, error=STALE_ERROR, completed_at=now)
+    if swept:
+        logger.warning("Marked %s stale report(s) failed", swept)
+    return swept
+
+
+def _set_progress(report, progress):
+    Report.objects.filter(pk=report.pk).update(progress=progress)
+
+
+def _tracked(rows, report, expected):
+    """Pass rows through, recording progress as they stream into the file"""
+    for index, row in enumerate(rows, 1):
+        if expected and index % PROGRESS_EVERY == 0:
+            _set_progress(report, min(95, 10 + int(85 * index / expected)))
+        yield row
+
+
+def _finish(report, file_name):
+    report.file.name = file_name
+    report.status = Report.DONE
+    report.progress = 100
+    report.completed_at = timezone.now()
+    report.save(update_fields=['file', 'status', 'progress', 'completed_at'])
+
+
+def run(report_id):
+    """Render one pending report into Report.file"""
+    if not _claim(report_id):
+        return
+    report = Report.objects.select_related('user').get(pk=report_id)
+    params = report.parameters
+    format = params.get('format', 'csv')
+    start_date = date.fromisoformat(params['start_date'])
+    end_date = date.fromisoformat(params['end_date'])
+
+    try:
+        cached_pdf = pdf_cache_name(report) if format == 'pdf' else None
+        if cached_pdf and default_storage.exists(cached_pdf):
+            # Same user, parameters and data as an earlier report
+            _finish(report, cached_pdf)
+            return
+
+        result = report_engine.build_report(
+            report.user, report.report_type, start_date, end_date, params.get('granularity')
+        )
+        _set_progress(report, 10)
+        if report.report_type == 'transactions':
+            expected = sum(row['count'] for row in rollups.range_totals(
+                report.user, start_date, end_date, ('year',)
+            ))
+            result.rows = _tracked(result.rows, report, expected)
+
+        if format == 'pdf':
+            _finish(report, _render_pdf(report, result, cached_pdf))
+        else:
+            with tempfile.TemporaryFile() as output:
+                render = exports.RENDERERS[format][0]
+                for line in render(result.columns, result.rows):
+                    output.write(line.encode())
+                output.seek(0)
+                report.file.save(f"report_{report.pk}.{format}", File(output), save=False)
+            _finish(report, report.file.name)
+    except Exception as exc:
+        logger.exception("Report #%s failed", report_id)
+        Report.objects.filter(pk=report_id).update(
+            status=Report.FAILED, error=str(exc), completed_at=timezone.now()
+        )
+
+
+def run_pending(limit=None):
+    """Process queued reports oldest first; returns how many were picked up"""
+    pending = Report.objects.filter(status=Report.PENDING).order_by('created_at')
+    report_ids = list(pending.values_list('pk', flat=True)[:limit])
+    for report_id in report_ids:
+        run(report_id)
+    return len(report_ids)
@@ -0,0 +1,279 @@
+from calendar import monthrange
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .database import Month, Year
+from .models import ArchivedTransaction, MonthlyCategoryTotal, Transaction
+from . import archive
+
+ROLLUP_FIELDS = ('user_id', 'date', 'category_id', 'is_income', 'amount')
+# Batches touching more buckets than this are applied with bulk queries
+BULK_THRESHOLD = 100
+
+
+def _bucket(user_id, day, category_id, is_income):
+    return {
+        'user_id': user_id,
+        'year': day.year,
+        'month': day.month,
+        'category_id': category_id,
+        'is_income': is_income,
+    }
+
+
+def _bucket_filter(bucket):
+    lookup = dict(bucket)
+    if lookup['category_id'] is None:
+        del lookup['category_id']
+        lookup['category__isnull'] = True
+    return lookup
+
+
+def apply_delta(user_id, day, category_id, is_income, amount, count):
+    """Add amount/count to the rollup bucket a transaction falls into"""
+    bucket = _bucket(user_id, day, category_id, is_income)
+    rows = MonthlyCategoryTotal.objects.filter(**_bucket_filter(bucket))
+    with transaction.atomic():
+        updated = rows.update(total=F('total') + amount, count=F('count') + count)
+        if updated:
+            if count < 0:
+                rows.filter(count__lte=0).delete()
+            return
+        if count <= 0:
+            # Nothing to take away from; the bucket was never built or the
+            # owning user is being deleted.
+            return
+        try:
+            with transaction.atomic():
+                MonthlyCategoryTotal.objects.create(total=amount, count=count, **bucket)
+        except IntegrityError:
+            rows.update(total=F('total') + amount, count=F('count') + count)
+
+
+def snapshot(instance):
+    return tuple(getattr(instance, name) for name in ROLLUP_FIELDS)
+
+
+def record_change(old, new):
+    """
+    Move a transaction between rollup buckets. ``old`` and ``new`` are
+    snapshots of its rollup fields before and after the write, or None.
+    """
+    if old == new:
+        return
+    if old is not None:
+        user_id, day, category_id, is_income, amount = old
+        apply_delta(user_id, day, category_id, is_income, -Decimal(amount), -1)
+    if new is not None:
+        user_id, day, category_id, is_income, amount = new
+        apply_delta(user_id, day, category_id, is_income, Decimal(amount), 1)
+
+
+def record_changes(changes):
+    """
+    record_change() for a batch of (old, new) snapshot pairs, netting the
+    deltas per bucket so each touched bucket is written once.
+    """
+    deltas = {}
+    for old, new in changes:
+        if old == new:
+            continue
+        for snap, sign in ((old, -1), (new, 1)):
+            if snap is None:
+                continue
+            user_id, day, category_id, is_income, amount = snap
+            key = (user_id, day.year, day.month, category_id, is_income)
+            total, count = deltas.get(key, (Decimal('0'), 0))
+            deltas[key] = (total + sign * Decimal(amount), count + sign)
+    deltas = {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+    if len(deltas) > BULK_THRESHOLD:
+        return _apply_deltas(deltas)
+    with transaction.atomic():
+        for (user_id, year, month, category_id, is_income), (total, count) in deltas.items():
+            apply_delta(user_id, date(year, month, 1), category_id, is_income, total, count)
+
+
+def _apply_deltas(deltas):
+    """
+    Apply many bucket deltas at once: the touched buckets are read in one
+    query and replaced by their new totals with one DELETE and one bulk
+    INSERT, instead of an UPDATE per bucket.
+    """
+    with transaction.atomic():
+        rows = MonthlyCategoryTotal.objects.select_for_update().filter(
+            user_id__in={bucket[0] for bucket in deltas},
+            year__in={bucket[1] for bucket in deltas},
+            month__in={bucket[2] for bucket in deltas},
+        ).values_list('pk', 'user_id', 'year', 'month', 'category_id', 'is_income', 'total', 'count')
+        # Tuples rather than instances: the filter also matches buckets the batch doesn't touch
+        existing = {tuple(row[1:6]): row for row in rows.iterator() if tuple(row[1:6]) in deltas}
+        replaced = []
+        for bucket, (total, count) in deltas.items():
+            row = existing.get(bucket)
+            if row is not None:
+                total, count = row[6] + total, row[7] + count
+            if count > 0:
+                user_id, year, month, category_id, is_income = bucket
+                replaced.append(MonthlyCategoryTotal(
+                    user_id=user_id, year=year, month=month, category_id=category_id,
+                    is_income=is_income, total=total, count=count
+                ))
+        MonthlyCategoryTotal.objects.filter(pk__in=[row[0] for row in existing.values()]).delete()
+        MonthlyCategoryTotal.objects.bulk_create(replaced, batch_size=1000)
+
+
+def fold_category(category):
+    """
+    Merge a category's buckets into the uncategorized ones before it is
+    deleted, mirroring the SET_NULL cascade on its transactions.
+    """
+    with transaction.atomic():
+        for row in MonthlyCategoryTotal.objects.filter(category=category):
+            apply_delta(row.user_id, date(row.year, row.month, 1), None,
+                        row.is_income, row.total, row.count)
+        MonthlyCategoryTotal.objects.filter(category=category).delete()
+
+
+def _grouped_transactions(users=None):
+    """Per-bucket totals and counts over live and archived transactions, keyed like the rollup"""
+    grouped = {}
+    for model in (Transaction, ArchivedTransaction):
+        queryset = model.objects.all()
+        if users is not None:
+            queryset = queryset.filter(user__in=users)
+        rows = queryset.annotate(
+            year=Year('date'),
+            month=Month('date')
+        ).values_list('user_id', 'year', 'month', 'category_id', 'is_income').annotate(
+            total=Sum('amount'),
+            count=Count('id')
+        ).order_by()
+        for *key, total, count in rows:
+            previous_total, previous_count = grouped.get(tuple(key), (Decimal('0'), 0))
+            grouped[tuple(key)] = (previous_total + total, previous_count + count)
+    return grouped
+
+
+def rebuild(users=None, batch_size=1000):
+    """Recompute the rollup from scratch, for all users or the given ones"""
+    rollups = MonthlyCategoryTotal.objects.all()
+    if users is not None:
+        rollups = rollups.filter(user__in=users)
+
+    with transaction.atomic():
+        rollups.delete()
+        rows = [
+            MonthlyCategoryTotal(
+                user_id=user_id, year=year, month=month, category_id=category_id,
+                is_income=is_income, total=total, count=count
+            )
+            for (user_id, year, month, category_id, is_income), (total, count) in _grouped_transactions(users).items()
+        ]
+        MonthlyCategoryTotal.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def verify(users=None):
+    """Return the buckets whose stored totals differ from the transactions"""
+    rollups = MonthlyCategoryTotal.objects.all()
+    if users is not None:
+        rollups = rollups.filter(user__in=users)
+
+    key = lambda row: (row['user_id'], row['year'], row['month'], row['category_id'], row['is_income'])
+    expected = _grouped_transactions(users)
+    stored = {}
+    for row in rollups.values('user_id', 'year', 'month', 'category_id', 'is_income', 'total', 'count'):
+        total, count = stored.get(key(row), (Decimal('0'), 0))
+        stored[key(row)] = (total + row['total'], count + row['count'])
+
+    drift = []
+    for bucket in expected.keys() | stored.keys():
+        if expected.get(bucket) != stored.get(bucket):
+            drift.append((bucket, expected.get(bucket), stored.get(bucket)))
+    return drift
+
+
+# ============== Read helpers ==============
+def totals_by_type(user):
+    """All-time income and expense totals"""
+    rows = MonthlyCategoryTotal.objects.filter(user=user).values('is_income').annotate(
+        total=Sum('total')
+    ).order_by()
+    totals = {row['is_income']: row['total'] for row in rows}
+    return totals.get(True) or 0, totals.get(False) or 0
+
+
+def month_by_category(user, year, month):
+    """Income/expense totals of one month grouped by category"""
+    return MonthlyCategoryTotal.objects.filter(
+        user=user, year=year, month=month
+    ).values('category_id', 'category__name').annotate(
+        income=Sum('total', filter=Q(is_income=True)),
+        expenses=Sum('total', filter=Q(is_income=False)),
+    ).order_by()
+
+
+def _full_months(start_date, end_date):
+    """First and last day of the whole calendar months inside a date range"""
+    first = start_date
+    if first.day != 1:
+        first = (first.replace(day=1) + timedelta(days=32)).replace(day=1)
+    last = end_date
+    if last.day != monthrange(last.year, last.month)[1]:
+        last = last.replace(day=1) - timedelta(days=1)
+    if first > last:
+        return None
+    return first, last
+
+
+def _sort_key(key):
+    return tuple((value is None, value) for value in key)
+
+
+def range_totals(user, start_date, end_date, group=('year', 'month')):
+    """
+    Income and expense totals for a date range grouped by ``group`` (any of
+    year, month, category_id, category__name). Whole months are read from
+    the rollup; partial months at either end of the range fall back to the
+    transactions themselves.
+    """
+    fields = tuple(group) + ('is_income',)
+    totals = {}
+
+    def add(rows):
+        for row in rows:
+            key = tuple(row[name] for name in fields)
+            total, count = totals.get(key, (0, 0))
+            totals[key] = (total + row['total'], count + row['count'])
+
+    def from_transactions(first, last):
+        for queryset in archive.sources(user, first):
+            add(queryset.filter(date__range=[first, last]).annotate(
+                month=Month('date'),
+                year=Year('date')
+            ).values(*fields).annotate(total=Sum('amount'), count=Count('id')).order_by())
+
+    months = _full_months(start_date, end_date)
+    if months is None:
+        from_transactions(start_date, end_date)
+    else:
+        first, last = months
+        if start_date < first:
+            from_transactions(start_date, first - timedelta(days=1))
+        if last < end_date:
+            from_transactions(last + timedelta(days=1), end_date)
+        add(MonthlyCategoryTotal.objects.filter(user=user).annotate(
+            period=F('year') * 12 + F('month')
+        ).filter(
+            period__gte=first.year * 12 + first.month,
+            period__lte=last.year * 12 + last.month
+        ).values(*fields).annotate(total=Sum('total'), count=Sum('count')).order_by())
+
+    return [
+        dict(zip(fields, key), total=total, count=count)
+        for key, (total, count) in sorted(totals.items(), key=lambda item: _sort_key(item[0]))
+    ]
+
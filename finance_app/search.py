@@ -0,0 +1,114 @@
+"""
+Full-text search over transaction descriptions, ranked by relevance. On
+SQLite queries go to the FTS5 table (bm25 ranking), on PostgreSQL to the
+tsvector index (ts_rank); see database.py for both. Any other queryset
+filters (dates, category, amounts) are applied in the same query.
+
+A search string is a list of words that must all appear; "quoted words"
+must appear together, and a trailing * matches any word starting with the
+text before it (coff* finds coffee). Archived transactions aren't indexed.
+"""
+import re
+from dataclasses import dataclass, field
+
+from django.db import connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+from .database import FTS_TABLE, SEARCH_CONFIG
+from .models import Transaction
+
+DEFAULT_PAGE_SIZE = 20
+MAX_TERMS = 10
+TERM = re.compile(r'"([^"]*)"?|(\S+)')
+# What the FTS5 unicode61 tokenizer treats as a word
+WORD = re.compile(r'[^\W_]+')
+
+
+class InvalidSearch(ValueError):
+    pass
+
+
+@dataclass
+class SearchPage:
+    items: list = field(default_factory=list)
+    number: int = 1
+    has_next: bool = False
+
+    @property
+    def has_previous(self):
+        return self.number > 1
+
+
+def parse_query(text):
+    """(words, prefix) for each term of a search string"""
+    terms = []
+    for phrase, word in TERM.findall(text or ''):
+        words = tuple(part.lower() for part in WORD.findall(phrase or word))
+        if words:
+            terms.append((words, word.endswith('*')))
+    return terms[:MAX_TERMS]
+
+
+def fts5_query(terms, user_id):
+    """FTS5 MATCH expression for the terms, limited to the user's entries"""
+    parts = [f'description : "{" ".join(words)}"{" *" if prefix else ""}' for words, prefix in terms]
+    return ' AND '.join(parts + [f'owner : u{user_id}'])
+
+
+def tsquery(terms):
+    """to_tsquery() text for the terms"""
+    parts = []
+    for words, prefix in terms:
+        quoted = [f"'{word}'" for word in words]
+        if prefix:
+            quoted[-1] += ':*'
+        parts.append(' <-> '.join(quoted))
+    return ' & '.join(parts)
+
+
+def _matching(queryset, terms, user_id):
+    """``queryset`` narrowed to matches and annotated with search_rank, lower is better"""
+    if connection.vendor == 'sqlite':
+        return queryset.extra(
+            # The owner column is only there to filter on; it mustn't weigh in the ranking.
+            # The + keeps SQLite from probing the FTS table once per row of a
+            # date or amount index scan; the MATCH always drives the query.
+            select={'search_rank': f'bm25({FTS_TABLE}, 1.0, 0.0)'},
+            tables=[FTS_TABLE],
+            where=[f'finance_app_transaction.id = +{FTS_TABLE}.rowid', f'{FTS_TABLE} MATCH %s'],
+            params=[fts5_query(terms, user_id)],
+        )
+    if connection.vendor == 'postgresql':
+        # The same expression as the index, so the planner can use it
+        vector = f"to_tsvector('{SEARCH_CONFIG}', finance_app_transaction.description)"
+        query = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+        return queryset.extra(where=[f'{vector} @@ {query}'], params=[tsquery(terms)]).annotate(
+            search_rank=RawSQL(f'-ts_rank({vector}, {query})', [tsquery(terms)], output_field=FloatField())
+        )
+    # No index to use elsewhere: every word has to be in the description
+    for words, prefix in terms:
+        queryset = queryset.filter(description__icontains=' '.join(words))
+    return queryset.annotate(search_rank=RawSQL('0', [], output_field=FloatField()))
+
+
+def search(user, text, queryset=None, page=1, page_size=DEFAULT_PAGE_SIZE, fields=None):
+    """
+    One page of the user's transactions matching ``text``, best first (then
+    newest). ``queryset`` (all the user's transactions by default) carries
+    any other filters; with ``fields`` the items are values_list() rows.
+    """
+    terms = parse_query(text)
+    if not terms:
+        raise InvalidSearch('Enter a word to search for')
+    if page < 1:
+        raise InvalidSearch('page must be positive')
+    if queryset is None:
+        queryset = Transaction.objects.filter(user=user)
+
+    matches = _matching(queryset, terms, user.pk).order_by('search_rank', '-date', '-pk')
+    if fields:
+        matches = matches.values_list(*fields)
+    offset = (page - 1) * page_size
+    rows = list(matches[offset:offset + page_size + 1])
+    return SearchPage(items=rows[:page_size], number=page, has_next=len(rows) > page_size)
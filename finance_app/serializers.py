@@ -20,7 +20,31 @@ class TransactionSerializer(serializers.ModelSerializer):
             'id', 'amount', 'category', 'category_id',
             'description', 'date', 'is_income'
         ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only the requesting user's categories can be referenced
+        request = self.context.get('request')
+        if request is not None:
+            self.fields['category_id'].queryset = Category.objects.filter(user=request.user)
     
     def create(self, validated_data):
         # The user is added from the request in the view
-        return Transaction.objects.create(**validated_data)
\ No newline at end of file
+        return Transaction.objects.create(**validated_data)
+
+class TransactionWriteSerializer(serializers.ModelSerializer):
+    """
+    Validates one item of a bulk write. Categories are checked against
+    ``context['categories']``, the user's categories preloaded for the
+    whole batch, instead of a query per item.
+    """
+    category_id = serializers.IntegerField(allow_null=True, required=False)
+
+    class Meta:
+        model = Transaction
+        fields = ['amount', 'category_id', 'description', 'date', 'is_income']
+
+    def validate_category_id(self, value):
+        if value is not None and value not in self.context['categories']:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
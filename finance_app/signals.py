@@ -1,17 +1,122 @@
-# signals.py
-from django.db.models.signals import post_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Category
+from .models import Budget, Category, CategorizationRule, RecurringTransaction, Transaction
+from django.utils import timezone
+from . import budget_alerts, budget_tracking, categorization, database, provisioning, recurring, rollups, sync, user_cache
 
-DEFAULT_CATEGORIES = [
-    ('Groceries', False),
-    ('Rent', False),
-    ('Salary', True),
-]
+def _cascade_from(origin, *models):
+    """Whether a delete is part of deleting an instance or a queryset of one of ``models``"""
+    return getattr(origin, 'model', type(origin)) in models
 
 @receiver(post_save, sender=User)
 def create_default_categories(sender, instance, created, **kwargs):
     if created:
-        for name, is_income in DEFAULT_CATEGORIES:
-            Category.objects.create(user=instance, name=name, is_income=is_income)
\ No newline at end of file
+        provisioning.create_default_categories([instance])
+
+# ============== Monthly rollup and budget spending maintenance ==============
+@receiver(pre_save, sender=Transaction)
+def remember_rollup_bucket(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if instance.pk and not raw:
+        previous = Transaction.objects.filter(pk=instance.pk).values_list(*rollups.ROLLUP_FIELDS).first()
+        instance._rollup_previous = previous
+
+@receiver(post_save, sender=Transaction)
+def update_rollup_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    current = rollups.snapshot(instance)
+    rollups.record_change(previous, current)
+    budget_tracking.record_change(previous, current)
+
+@receiver(post_delete, sender=Transaction)
+def update_rollup_on_delete(sender, instance, origin=None, **kwargs):
+    # The rollup and budgets go with the account; updating them row by row
+    # would turn its one cascaded delete into an UPDATE per transaction
+    if _cascade_from(origin, User):
+        return
+    rollups.record_change(rollups.snapshot(instance), None)
+    budget_tracking.record_change(rollups.snapshot(instance), None)
+
+@receiver(pre_delete, sender=Category)
+def fold_category_rollup(sender, instance, origin=None, **kwargs):
+    if not _cascade_from(origin, User):
+        rollups.fold_category(instance)
+
+
+@receiver(pre_save, sender=Budget)
+def refresh_budget_spent(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.spent = budget_tracking.compute_spent(instance)
+
+@receiver(post_save, sender=Budget)
+def check_budget_alerts(sender, instance, raw=False, **kwargs):
+    # A new or lowered amount can put the budget past a threshold
+    if not raw:
+        budget_alerts.touched({instance.category_id}, instance.start_date, instance.end_date)
+
+@receiver(pre_save, sender=RecurringTransaction)
+def schedule_recurring_transaction(sender, instance, raw=False, **kwargs):
+    # Recompute the next occurrence when the schedule itself changes
+    if raw:
+        return
+    if instance.pk:
+        previous = RecurringTransaction.objects.filter(pk=instance.pk).values_list(
+            'rule', 'start_date', 'end_date'
+        ).first()
+        if previous == (instance.rule, instance.start_date, instance.end_date):
+            return
+    recurring.schedule(instance)
+
+# ============== Auto-categorization ==============
+@receiver(pre_save, sender=Transaction)
+def categorize_new_transaction(sender, instance, raw=False, **kwargs):
+    # Only new rows; clearing the category of an existing one is deliberate
+    if not raw and instance.pk is None and instance.category_id is None:
+        categorization.categorize(instance.user_id, [instance])
+
+@receiver(post_save, sender=CategorizationRule)
+def bump_rules_version_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        user_cache.bump_version(instance.user_id, 'rules_version')
+
+@receiver(post_delete, sender=CategorizationRule)
+def bump_rules_version_on_delete(sender, instance, origin=None, **kwargs):
+    if not _cascade_from(origin, User):
+        user_cache.bump_version(instance.user_id, 'rules_version')
+
+# ============== Cache invalidation ==============
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=Budget)
+@receiver(post_save, sender=Category)
+def bump_data_version_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        user_cache.bump_version(instance.user_id)
+
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=Budget)
+@receiver(post_delete, sender=Category)
+def bump_data_version_on_delete(sender, instance, origin=None, **kwargs):
+    # Nothing left to invalidate when the whole account is being deleted
+    if not _cascade_from(origin, User):
+        user_cache.bump_version(instance.user_id)
+
+# ============== Delta sync ==============
+@receiver(post_delete, sender=Transaction)
+def record_transaction_tombstone(sender, instance, origin=None, **kwargs):
+    # The deletion log goes with the account, so there is nothing to record
+    if not _cascade_from(origin, User):
+        sync.record_deletions(instance.user_id, [instance.pk])
+
+@receiver(pre_delete, sender=Category)
+def touch_category_transactions(sender, instance, **kwargs):
+    # The SET_NULL cascade is a queryset update that leaves updated_at alone
+    Transaction.objects.filter(category=instance).update(updated_at=timezone.now())
+
+# ============== Database connections ==============
+@receiver(connection_created)
+def configure_database_connection(sender, connection, **kwargs):
+    database.configure_connection(connection)
@@ -0,0 +1,121 @@
+"""
+Delta sync for transactions. A client keeps the watermark from its last
+sync and gets back only the transactions written since (by updated_at) and
+the ids deleted since (from the DeletedTransaction log), both read in
+(timestamp, id) order so the pages of one sync never skip or repeat rows.
+
+The watermark handed out at the end of a sync is held back by
+SYNC_SETTLE_SECONDS, so a write whose transaction commits a little after
+its updated_at timestamp is still picked up next time; clients may see the
+last few seconds of changes twice and should apply them idempotently.
+"""
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DeletedTransaction, Transaction
+
+
+class InvalidWatermark(ValueError):
+    pass
+
+
+def _settle():
+    return timedelta(seconds=getattr(settings, 'SYNC_SETTLE_SECONDS', 60))
+
+
+def _retention():
+    return timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_DAYS', 90))
+
+
+def encode_watermark(changed, deleted):
+    """Opaque token for the (timestamp, id) positions of both streams"""
+    payload = json.dumps(
+        [changed[0].isoformat(), changed[1], deleted[0].isoformat(), deleted[1]],
+        separators=(',', ':')
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_watermark(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        changed_at, changed_id, deleted_at, deleted_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        changed_at, deleted_at = datetime.fromisoformat(changed_at), datetime.fromisoformat(deleted_at)
+        if timezone.is_naive(changed_at) or timezone.is_naive(deleted_at):
+            raise ValueError('naive timestamp')
+        return (changed_at, int(changed_id)), (deleted_at, int(deleted_id))
+    except (ValueError, TypeError, json.JSONDecodeError) as exc:
+        raise InvalidWatermark(f"Invalid watermark: {token!r}") from exc
+
+
+@dataclass
+class SyncPage:
+    changed: list = field(default_factory=list)
+    deleted: list = field(default_factory=list)
+    watermark: str = None
+    has_more: bool = False
+    reset: bool = False
+
+
+def _after(queryset, field_name, position):
+    moment, pk = position
+    return queryset.filter(Q(**{f'{field_name}__gt': moment}) | Q(**{field_name: moment, 'pk__gt': pk}))
+
+
+def changes_since(user, watermark=None, page_size=500):
+    """
+    One page of changes after ``watermark`` (a token from a previous page, or
+    None for a full sync). Keep requesting with the returned watermark while
+    ``has_more`` is set. ``reset`` means the watermark was too old to serve
+    deletions for, so this is a full sync and local data should be replaced.
+    """
+    now = timezone.now()
+    page = SyncPage()
+    if watermark:
+        changed_pos, deleted_pos = decode_watermark(watermark)
+        if deleted_pos[0] < now - _retention():
+            page.reset = True
+    if not watermark or page.reset:
+        # Everything that exists now; only deletions from here on matter
+        earliest = datetime.min.replace(tzinfo=timezone.utc)
+        changed_pos, deleted_pos = (earliest, 0), (now - _settle(), 0)
+
+    changed = list(_after(
+        Transaction.objects.filter(user=user), 'updated_at', changed_pos
+    ).select_related('category').order_by('updated_at', 'pk')[:page_size + 1])
+    deleted = list(_after(
+        DeletedTransaction.objects.filter(user=user), 'deleted_at', deleted_pos
+    ).order_by('deleted_at', 'pk').values_list('deleted_at', 'pk', 'transaction_id')[:page_size + 1])
+
+    page.has_more = len(changed) > page_size or len(deleted) > page_size
+    page.changed = changed[:page_size]
+    deleted = deleted[:page_size]
+    page.deleted = [transaction_id for _, _, transaction_id in deleted]
+
+    if page.changed:
+        changed_pos = (page.changed[-1].updated_at, page.changed[-1].pk)
+    if deleted:
+        deleted_pos = deleted[-1][:2]
+    if not page.has_more:
+        # Caught up: restart both streams from the settle horizon
+        changed_pos = deleted_pos = (now - _settle(), 0)
+    page.watermark = encode_watermark(changed_pos, deleted_pos)
+    return page
+
+
+def record_deletions(user_id, transaction_ids):
+    DeletedTransaction.objects.bulk_create([
+        DeletedTransaction(user_id=user_id, transaction_id=pk) for pk in transaction_ids
+    ])
+
+
+def prune_tombstones(days=None):
+    """Drop tombstones older than the retention period; returns how many"""
+    cutoff = timezone.now() - (timedelta(days=days) if days is not None else _retention())
+    return DeletedTransaction.objects.filter(deleted_at__lt=cutoff).delete()[0]
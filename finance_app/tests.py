@@ -1,3 +1,1620 @@
-from django.test import TestCase
+import json
+import tempfile
+import warnings
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from itertools import count
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from dateutil.rrule import rrulestr
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.models.query import QuerySet
+from django.db.transaction import atomic
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import (
+    api_rows, archive, benchmarks, budget_alerts, budget_tracking, categorization, database, exports, forecasting,
+    importers, instrumentation, pagination, pdf, provisioning, query_plans, recurring, report_engine, report_jobs, rollups, search, sync, user_cache,
+)
+from .models import (
+    ArchivedTransaction, ArchiveHorizon, Budget, CategorizationRule, Category, DataVersion, DeletedTransaction,
+    MonthlyCategoryTotal, Notification, RecurringTransaction, Report, Transaction,
+)
+from .serializers import TransactionSerializer
+
+
+@override_settings(
+    FINANCE_CATEGORY_TEMPLATES={'small': [('Household', False), ('Travel', False), ('Payroll', True)]},
+    FINANCE_CATEGORY_TEMPLATE='small',
+)
+class ProvisioningTests(TestCase):
+    TEMPLATE = {('Household', False), ('Travel', False), ('Payroll', True)}
+
+    def _categories(self, user):
+        return set(Category.objects.filter(user=user).values_list('name', 'is_income'))
+
+    def test_new_user_gets_the_template_in_one_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            user = User.objects.create_user('newcomer')
+        inserts = [query['sql'] for query in queries if query['sql'].startswith('INSERT INTO "finance_app_category"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self._categories(user), self.TEMPLATE)
+        self.assertEqual(Category.objects.filter(user=user).count(), 3)
+
+    def test_provision_users_is_idempotent(self):
+        out = StringIO()
+        call_command('provision_users', '3', '--prefix', 'load', '--transactions', '4', stdout=out)
+        self.assertIn('Created 3 users, 9 categories, 6 budgets and 12 transactions', out.getvalue())
+        users = User.objects.filter(username__startswith='load')
+        before = (Category.objects.count(), Budget.objects.count(), Transaction.objects.count())
+
+        out = StringIO()
+        call_command('provision_users', '3', '--prefix', 'load', '--transactions', '4', stdout=out)
+        self.assertIn('Skipped 3 existing username(s)', out.getvalue())
+        self.assertIn('Created 0 users', out.getvalue())
+        self.assertEqual((Category.objects.count(), Budget.objects.count(), Transaction.objects.count()), before)
+        for user in users:
+            self.assertEqual(self._categories(user), self.TEMPLATE)
+        self.assertEqual(rollups.verify(users), [])
+        self.assertFalse(budget_tracking.find_drift(Budget.objects.filter(user__in=users)).exists())
+
+    def test_unknown_template_is_rejected(self):
+        with self.assertRaises(ValueError):
+            provisioning.category_template('missing')
+
+
+class AccountDeletionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+        self.category = Category.objects.create(user=self.user, name='Household')
+        Budget.objects.create(user=self.user, category=self.category, amount=Decimal('100'),
+                              start_date=date(2026, 1, 1), end_date=date(2026, 1, 31))
+        for day in range(1, 4):
+            Transaction.objects.create(user=self.user, category=self.category, amount=Decimal('10'),
+                                       description='Shop', date=date(2026, 1, day))
+
+    def test_queryset_delete_does_not_recreate_data_version(self):
+        # The admin's "delete selected" action deletes through a queryset
+        User.objects.filter(pk=self.user.pk).delete()
+        self.assertFalse(DataVersion.objects.filter(user_id=self.user.pk).exists())
+        self.assertFalse(Transaction.objects.filter(user_id=self.user.pk).exists())
+
+    def test_account_deletion_writes_no_tombstones(self):
+        deletes = [lambda user: user.delete(), lambda user: User.objects.filter(pk=user.pk).delete()]
+        for index, delete in enumerate(deletes):
+            user = User.objects.create_user(f'deleted-{index}')
+            Transaction.objects.create(user=user, amount=Decimal('5'), description='Coffee', date=date(2026, 1, 5))
+            delete(user)
+            self.assertFalse(DeletedTransaction.objects.filter(user_id=user.pk).exists())
+
+    def test_single_delete_writes_tombstone(self):
+        transaction = Transaction.objects.filter(user=self.user).first()
+        pk = transaction.pk
+        transaction.delete()
+        self.assertTrue(DeletedTransaction.objects.filter(user=self.user, transaction_id=pk).exists())
+
+    def _queries_to_delete_account(self, transactions):
+        user = User.objects.create_user(f'sized-{transactions}')
+        category = Category.objects.create(user=user, name='Household')
+        Transaction.objects.bulk_create([
+            Transaction(user=user, category=category, amount=Decimal('1'), description='x', date=date(2026, 1, 1))
+            for _ in range(transactions)
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            user.delete()
+        return len(queries)
+
+    def test_account_deletion_cost_does_not_grow_with_transactions(self):
+        self.assertEqual(self._queries_to_delete_account(5), self._queries_to_delete_account(50))
+
+    def test_account_deletion_removes_rollup(self):
+        self.assertTrue(MonthlyCategoryTotal.objects.filter(user=self.user).exists())
+        User.objects.filter(pk=self.user.pk).delete()
+        self.assertFalse(MonthlyCategoryTotal.objects.filter(user_id=self.user.pk).exists())
+
+    def test_deleting_a_transaction_updates_rollup_and_budget(self):
+        Transaction.objects.filter(user=self.user).first().delete()
+        self.assertEqual(MonthlyCategoryTotal.objects.get(user=self.user, category=self.category).total, Decimal('20'))
+        self.assertEqual(Budget.objects.get(user=self.user).spent, Decimal('20'))
+
+
+class DashboardQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('dashboard')
+        self.categories = []
+        self._add_categories(1)
+        self.client.force_login(self.user)
+
+    def _add_categories(self, count):
+        start = len(self.categories)
+        self.categories += [
+            Category.objects.create(user=self.user, name=f'Spending {index}') for index in range(start, start + count)
+        ]
+
+    def _grow(self, months):
+        """Add a month of transactions and a budget per category for each of the last ``months`` months"""
+        first = date.today().replace(day=1)
+        for offset in range(months):
+            start = (first - timedelta(days=31 * offset)).replace(day=1)
+            end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            for category in self.categories:
+                Budget.objects.get_or_create(user=self.user, category=category, start_date=start, end_date=end,
+                                             defaults={'amount': Decimal('500')})
+                Transaction.objects.bulk_create([
+                    Transaction(user=self.user, category=category, amount=Decimal('12.50'), description='Shop',
+                                date=start + timedelta(days=day))
+                    for day in range(0, 28, 3)
+                ])
+        # bulk_create skips the signals; rebuild what they would have maintained
+        rollups.rebuild([self.user])
+        budget_tracking.reconcile(Budget.objects.filter(user=self.user))
+        user_cache.bump_version(self.user.pk)
+
+    def _dashboard_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_categories(self):
+        self._grow(1)
+        expected = self._dashboard_queries()
+        # Each new category has a budget and spending this month
+        self._add_categories(20)
+        self._grow(1)
+        with self.assertNumQueries(expected):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(len(response.context['summary'].budgets), 21)
+
+    def test_query_count_does_not_grow_with_months(self):
+        self._grow(1)
+        expected = self._dashboard_queries()
+        self._grow(12)
+        with self.assertNumQueries(expected):
+            self.client.get(reverse('dashboard'))
+
+    def test_only_this_months_budgets_are_listed(self):
+        self._add_categories(2)
+        self._grow(3)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(len(response.context['summary'].budgets), len(self.categories))
+
+
+class UserCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(user_cache, '_index', user_cache._LRUIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user('cached')
+        self.client.force_login(self.user)
+
+    @override_settings(FINANCE_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_entry_is_evicted(self):
+        compute = mock.Mock(side_effect=lambda: compute.call_count)
+        user_cache.cached(self.user.pk, 'a', compute)
+        user_cache.cached(self.user.pk, 'b', compute)
+        user_cache.cached(self.user.pk, 'a', compute)
+        user_cache.cached(self.user.pk, 'c', compute)
+        self.assertEqual(compute.call_count, 3)
+        # 'b' was the least recently used, so it went when 'c' came in
+        self.assertEqual(user_cache.cached(self.user.pk, 'a', compute), 1)
+        self.assertEqual(user_cache.cached(self.user.pk, 'b', compute), 4)
+        self.assertEqual(user_cache.stats()['evictions'], 2)
+        self.assertEqual(user_cache.stats()['entries'], 2)
+
+    def test_hits_and_misses_are_counted(self):
+        self.assertIsNone(user_cache.stats()['hit_rate'])
+        for part in (1, 1, 1, 2):
+            user_cache.cached(self.user.pk, 'summary', lambda: part, part)
+        stats = user_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (2, 2, 0.5))
+
+    def test_saving_a_transaction_invalidates_the_dashboard(self):
+        category = Category.objects.create(user=self.user, name='Household')
+        self.client.get(reverse('dashboard'))
+        misses = user_cache.stats()['misses']
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(user_cache.stats()['misses'], misses)
+        self.assertNotContains(response, 'Desk chair')
+
+        Transaction.objects.create(user=self.user, category=category, amount=Decimal('80'),
+                                   description='Desk chair', date=timezone.localdate())
+        response = self.client.get(reverse('dashboard'))
+        self.assertGreater(user_cache.stats()['misses'], misses)
+        self.assertContains(response, 'Desk chair')
+
+    def test_cache_stats_are_for_staff_only(self):
+        response = self.client.get(reverse('api_cache_stats'))
+        self.assertEqual(response.status_code, 403)
+        staff = User.objects.create_user('admin', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('api_cache_stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['max_entries'], settings.FINANCE_CACHE_MAX_ENTRIES)
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(instrumentation, '_buffer', instrumentation._Buffer())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user('measured')
+        self.client.force_login(self.user)
+
+    def _call(self, view):
+        middleware = instrumentation.RequestMetricsMiddleware(view)
+        response = middleware(RequestFactory().get('/'))
+        return response, instrumentation.recent(1)[0]
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+        [record] = instrumentation.recent()
+        self.assertEqual((record['view'], record['status']), ('dashboard', 200))
+        self.assertEqual(record['bytes'], len(response.content))
+
+    def test_repeated_queries_are_counted(self):
+        category = Category.objects.create(user=self.user, name='Household')
+        for day in range(1, 4):
+            Transaction.objects.create(user=self.user, category=category, amount=Decimal('5'),
+                                       description='Snack', date=date(2026, 1, day))
+
+        def n_plus_one(request):
+            # The category is loaded once per transaction
+            names = [transaction.category.name for transaction in Transaction.objects.filter(user=self.user)]
+            return HttpResponse(', '.join(names))
+
+        _, record = self._call(n_plus_one)
+        self.assertEqual(record['queries'], 4)
+        self.assertEqual(record['duplicates'], 2)
+        self.assertEqual(record['similar'], 2)
+        self.assertIn('finance_app_category', record['repeated_sql'])
+
+    def test_streaming_responses_have_no_size(self):
+        response, record = self._call(lambda request: StreamingHttpResponse(iter([b'a', b'b'])))
+        self.assertIsNone(record['bytes'])
+        self.assertEqual(b''.join(response.streaming_content), b'ab')
+        self.assertIsNone(instrumentation.summary()['views'][0]['mean_bytes'])
+
+    @override_settings(REQUEST_METRICS_SIZE=3)
+    def test_buffer_is_bounded(self):
+        instrumentation._buffer = instrumentation._Buffer()
+        for _ in range(5):
+            self._call(lambda request: HttpResponse('ok'))
+        self.assertEqual(instrumentation.summary()['buffered'], 3)
+        self.assertEqual(instrumentation.summary()['capacity'], 3)
+
+    def test_metrics_are_for_staff_only(self):
+        self.assertEqual(self.client.get(reverse('api_request_metrics')).status_code, 403)
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        response = self.client.get(reverse('api_request_metrics'), {'recent': 5})
+        self.assertEqual(response.status_code, 200)
+        # The request being answered isn't in the buffer yet
+        [denied] = response.json()['recent']
+        self.assertEqual((denied['view'], denied['status']), ('api_request_metrics', 403))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite syntax')
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_an_index(self):
+        for name, problems in query_plans.check().items():
+            with self.subTest(name):
+                self.assertEqual(problems, [])
+
+    def test_unindexed_query_is_reported(self):
+        unindexed = {'by description': Transaction.objects.filter(description='Shop')}
+        with mock.patch.object(query_plans, 'hot_queries', return_value=unindexed):
+            problems = query_plans.check()['by description']
+        self.assertTrue(any(problem.startswith('SCAN ') for problem in problems))
+
+
+class ExportTests(TestCase):
+    DATA = {'report_type': 'transactions', 'start_date': '2026-01-01', 'end_date': '2026-01-31'}
+
+    def setUp(self):
+        self.user = User.objects.create_user('exporter')
+        self.category = Category.objects.create(user=self.user, name='Household')
+        self._add(0, 60)
+        self.client.force_login(self.user)
+
+    def _add(self, first, last):
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, category=self.category, amount=Decimal('2.50'), description=f'Shop {index}',
+                        date=date(2026, 1, 1) + timedelta(days=index % 31))
+            for index in range(first, last)
+        ])
+
+    def test_exports_stream_rows_from_an_iterator(self):
+        for format, lines in (('csv', 61), ('ndjson', 60)):
+            with self.subTest(format), mock.patch.object(
+                QuerySet, 'iterator', autospec=True, side_effect=QuerySet.iterator
+            ) as iterator:
+                response = self.client.post(reverse('generate_report'), dict(self.DATA, format=format))
+                self.assertIsInstance(response, StreamingHttpResponse)
+                body = b''.join(response.streaming_content).decode()
+                iterator.assert_called()
+                self.assertEqual(len(body.splitlines()), lines)
+
+    def test_export_memory_does_not_grow_with_rows(self):
+        # Rows are read and written in small chunks, so fifty times the rows
+        # shouldn't take (anywhere near) fifty times the memory
+        url, data = reverse('generate_report'), dict(self.DATA, format='csv')
+        with mock.patch.object(report_engine, 'TRANSACTION_CHUNK_SIZE', 50), \
+                mock.patch.object(exports, 'BUFFER_SIZE', 1024):
+            small = benchmarks.measure(self.client, 'post', url, data, iterations=1)
+            self._add(60, 3000)
+            large = benchmarks.measure(self.client, 'post', url, data, iterations=1)
+        self.assertEqual(large['status'], 200)
+        self.assertGreater(large['bytes'], small['bytes'] * 40)
+        self.assertLess(large['peak_kb'], small['peak_kb'] * 2)
+
+    @override_settings(REPORT_HTML_MAX_ROWS=25)
+    def test_html_transactions_table_is_capped(self):
+        data = dict(self.DATA, end_date='2028-12-31', format='html')
+        response = self.client.post(reverse('generate_report'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['truncated'])
+        self.assertEqual(len(response.context['report'].rows), 25)
+        self.assertContains(response, 'Showing the first 25 transactions')
+        self.assertContains(response, 'name="format" value="ndjson"')
+
+        response = self.client.post(reverse('generate_report'), dict(self.DATA, end_date='2026-01-05', format='html'))
+        self.assertFalse(response.context['truncated'])
+        self.assertNotContains(response, 'Showing the first')
+
+
+class ReportAmountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reporter')
+        self.category = Category.objects.create(user=self.user, name='Household')
+        # Sums that floats get wrong: 0.1 + 0.2, and ten times 0.1
+        for day, amount in [(1, '0.10'), (2, '0.20')] + [(10 + day, '0.10') for day in range(10)]:
+            Transaction.objects.create(user=self.user, category=self.category, amount=Decimal(amount),
+                                       description='Shop', date=date(2026, 1, day))
+        Transaction.objects.create(user=self.user, amount=Decimal('1.00'), description='Refund',
+                                   is_income=True, date=date(2026, 2, 1))
+
+    def test_period_report_amounts_are_exact_decimals(self):
+        result = report_engine.build_report(self.user, 'monthly', date(2026, 1, 1), date(2026, 3, 31))
+        self.assertEqual(result.rows, [
+            ('2026-01', Decimal('0.00'), Decimal('1.30'), Decimal('-1.30'), Decimal('-1.30'), Decimal('1.30')),
+            ('2026-02', Decimal('1.00'), Decimal('0.00'), Decimal('1.00'), Decimal('-0.30'), Decimal('0.65')),
+            ('2026-03', Decimal('0.00'), Decimal('0.00'), Decimal('0.00'), Decimal('-0.30'), Decimal('0.43')),
+        ])
+        # Written with two places, like the stored amounts
+        self.assertTrue(all(amount.as_tuple().exponent == -2 for row in result.rows for amount in row[1:]))
+
+    def test_daily_granularity_matches_the_database(self):
+        result = report_engine.build_report(self.user, 'monthly', date(2026, 1, 1), date(2026, 1, 31), 'day')
+        expenses = dict((row[0], row[2]) for row in result.rows)
+        self.assertEqual(expenses['2026-01-02'], Decimal('0.20'))
+        self.assertEqual(sum(expenses.values()), Decimal('1.30'))
+
+    def test_category_report_totals_are_exact_decimals(self):
+        result = report_engine.build_report(self.user, 'category', date(2026, 1, 1), date(2026, 2, 28))
+        totals = {row[0]: row[2] for row in result.rows}
+        self.assertEqual(totals, {'Household': Decimal('1.30'), 'Uncategorized': Decimal('1.00')})
+
+    def test_json_export_writes_amounts_as_decimal_strings(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('generate_report'), {
+            'report_type': 'category', 'start_date': '2026-01-01', 'end_date': '2026-01-31', 'format': 'json',
+        })
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(body[0]['total'], '1.30')
+
+
+@override_settings(REPORT_WORKER='queue')
+class PdfReportTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.user = User.objects.create_user('printer')
+        self.category = Category.objects.create(user=self.user, name='Household')
+        for day in range(1, 6):
+            self._add(date(2026, 1, day))
+
+    def _add(self, day):
+        Transaction.objects.create(user=self.user, category=self.category, amount=Decimal('9.95'),
+                                   description=f'Item {day}', date=day)
+
+    def _run(self, report_type='monthly'):
+        report = report_jobs.enqueue(self.user, report_type, date(2026, 1, 1), date(2026, 3, 31), 'pdf')
+        report_jobs.run(report.pk)
+        return Report.objects.get(pk=report.pk)
+
+    def test_pdf_is_cached_until_the_data_changes(self):
+        first = self._run()
+        self.assertEqual(first.status, Report.DONE, first.error)
+        with first.file.open('rb') as output:
+            self.assertTrue(output.read().startswith(b'%PDF'))
+
+        with mock.patch.object(report_jobs, '_render_pdf', wraps=report_jobs._render_pdf) as render:
+            second = self._run()
+            render.assert_not_called()
+            self.assertEqual(second.file.name, first.file.name)
+
+            self._add(date(2026, 2, 1))
+            third = self._run()
+            render.assert_called_once()
+            self.assertEqual(third.status, Report.DONE)
+            self.assertNotEqual(third.file.name, first.file.name)
+
+    @override_settings(REPORT_PDF_MAX_ROWS=3)
+    def test_long_transaction_pdfs_are_refused(self):
+        with self.assertLogs('finance_app.report_jobs', 'ERROR'):
+            report = self._run('transactions')
+        self.assertEqual(report.status, Report.FAILED)
+        self.assertIn('export it as CSV or NDJSON', report.error)
+
+    def test_payload_reads_no_more_than_the_cap(self):
+        result = report_engine.ReportResult('transactions', date(2026, 1, 1), date(2026, 1, 31), ['n'],
+                                            ((number,) for number in count()))
+        with self.assertRaises(pdf.TooManyRows):
+            pdf.report_payload(result, 'Transactions', max_rows=100)
+        self.assertEqual(next(result.rows), (101,))
+
+
+@override_settings(REPORT_STALE_AFTER_MINUTES=30)
+class StaleReportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('waiting')
+        self.now = timezone.now()
+
+    def _report(self, status, minutes_ago, started=True):
+        when = self.now - timedelta(minutes=minutes_ago)
+        report = Report.objects.create(user=self.user, report_type='transactions', parameters={}, status=status,
+                                       started_at=when if started else None)
+        Report.objects.filter(pk=report.pk).update(created_at=when)
+        return report
+
+    def _status(self, report):
+        return Report.objects.get(pk=report.pk).status
+
+    def test_reports_running_too_long_are_failed(self):
+        stale = self._report(Report.RUNNING, 45)
+        claimed_before_upgrade = self._report(Report.RUNNING, 45, started=False)
+        running = self._report(Report.RUNNING, 5)
+        done = self._report(Report.DONE, 120)
+        with self.assertLogs('finance_app.report_jobs', 'WARNING'):
+            self.assertEqual(report_jobs.sweep_stale(self.now), 2)
+        self.assertEqual(self._status(stale), Report.FAILED)
+        self.assertEqual(self._status(claimed_before_upgrade), Report.FAILED)
+        self.assertEqual(Report.objects.get(pk=stale.pk).error, report_jobs.STALE_ERROR)
+        self.assertEqual(self._status(running), Report.RUNNING)
+        self.assertEqual(self._status(done), Report.DONE)
+
+    def test_pending_reports_are_only_failed_with_the_thread_worker(self):
+        pending = self._report(Report.PENDING, 45, started=False)
+        with self.settings(REPORT_WORKER='queue'):
+            self.assertEqual(report_jobs.sweep_stale(self.now), 0)
+        self.assertEqual(self._status(pending), Report.PENDING)
+        with self.settings(REPORT_WORKER='thread'), self.assertLogs('finance_app.report_jobs', 'WARNING'):
+            self.assertEqual(report_jobs.sweep_stale(self.now), 1)
+        self.assertEqual(self._status(pending), Report.FAILED)
+
+    def test_enqueue_sweeps_stale_reports(self):
+        stale = self._report(Report.RUNNING, 45)
+        with self.assertLogs('finance_app.report_jobs', 'WARNING'):
+            report = report_jobs.enqueue(self.user, 'transactions', date(2026, 1, 1), date(2026, 1, 31), 'csv')
+        self.assertEqual(self._status(stale), Report.FAILED)
+        self.assertEqual(self._status(report), Report.PENDING)
+
+    def test_claim_records_the_start(self):
+        report = self._report(Report.PENDING, 0, started=False)
+        self.assertTrue(report_jobs._claim(report.pk))
+        self.assertIsNotNone(Report.objects.get(pk=report.pk).started_at)
+        self.assertFalse(report_jobs._claim(report.pk))
+
+
+class TsqueryTests(TestCase):
+    def test_terms_become_tsquery_text(self):
+        terms = search.parse_query('Coffee "corner shop" bak*')
+        self.assertEqual(search.tsquery(terms), "'coffee' & 'corner' <-> 'shop' & 'bak':*")
+
+    def test_punctuation_cannot_reach_the_tsquery(self):
+        terms = search.parse_query("o'brien & | ! (x) \\:*")
+        self.assertEqual(search.tsquery(terms), "'o' <-> 'brien' & 'x'")
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL indexes and search')
+class PostgresTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('searcher')
+        for description in ('Coffee at the corner shop', 'Coffee beans', 'Corner shop', 'Bakery'):
+            Transaction.objects.create(user=self.user, amount=Decimal('3'), description=description,
+                                       date=date(2026, 1, 5))
+
+    def _indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s',
+                           [Transaction._meta.db_table])
+            return dict(cursor.fetchall())
+
+    def _plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            # The test tables are tiny; rule out sequential scans to see which index is usable
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}', params)
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def test_partial_indexes_exist(self):
+        indexes = self._indexes()
+        for name, table, columns, condition in database.POSTGRES_PARTIAL_INDEXES:
+            with self.subTest(name):
+                self.assertIn(name, indexes)
+                self.assertIn(f'WHERE ({condition})', indexes[name])
+
+    def test_expense_queries_use_an_index(self):
+        expenses = Transaction.objects.filter(user=self.user, is_income=False)
+        for queryset in (expenses.order_by('-date'), expenses.filter(category_id=1).order_by('-date')):
+            self.assertNotIn('Seq Scan', self._plan(queryset))
+
+    def test_search_index_exists(self):
+        definition = self._indexes()['txn_description_search_idx']
+        self.assertIn('USING gin', definition)
+        self.assertIn(f"to_tsvector('{database.SEARCH_CONFIG}'::regconfig, description)", definition)
+
+    def test_search_uses_the_search_index(self):
+        matches = search._matching(Transaction.objects.all(), search.parse_query('coffee'), self.user.pk)
+        self.assertIn('txn_description_search_idx', self._plan(matches))
+
+    def test_search_matches_words_phrases_and_prefixes(self):
+        cases = {
+            'coffee': {'Coffee at the corner shop', 'Coffee beans'},
+            '"corner shop"': {'Coffee at the corner shop', 'Corner shop'},
+            'shop coffee': {'Coffee at the corner shop'},
+            'bak*': {'Bakery'},
+            '"shop corner"': set(),
+        }
+        for text, expected in cases.items():
+            with self.subTest(text):
+                page = search.search(self.user, text)
+                self.assertEqual({transaction.description for transaction in page.items}, expected)
+
+    def test_search_only_finds_the_users_transactions(self):
+        other = User.objects.create_user('other')
+        Transaction.objects.create(user=other, amount=Decimal('3'), description='Coffee', date=date(2026, 1, 5))
+        self.assertEqual(len(search.search(self.user, 'coffee').items), 2)
+
+
+class ImporterTests(TestCase):
+    STATEMENT = (
+        'Date,Description,Amount\n'
+        '2026-01-05,Coffee,-3.50\n'
+        '2026-01-05,Coffee,-3.50\n'
+        '2026-01-06,Salary,2000.00\n'
+        '2026-01-09,Hardware store,-42.00\n'
+    )
+
+    def setUp(self):
+        self.user = User.objects.create_user('importer')
+
+    def _import(self, text, **kwargs):
+        return importers.import_transactions(self.user, StringIO(text), **kwargs)
+
+    def test_reimporting_a_statement_creates_nothing(self):
+        first = self._import(self.STATEMENT)
+        self.assertEqual((first.parsed, first.created, first.duplicates), (4, 4, 0))
+        second = self._import(self.STATEMENT, batch_size=1)
+        self.assertEqual((second.created, second.duplicates), (0, 4))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 4)
+
+    def test_repeated_transactions_are_counted_not_collapsed(self):
+        self._import(self.STATEMENT)
+        # A later statement with a third identical coffee that day
+        result = self._import('Date,Description,Amount\n' + '2026-01-05,  COFFEE ,-3.50\n' * 3)
+        self.assertEqual((result.created, result.duplicates), (1, 2))
+        self.assertEqual(Transaction.objects.filter(user=self.user, description__iexact='coffee').count(), 3)
+
+    def test_same_text_with_another_amount_or_type_is_not_a_duplicate(self):
+        self._import(self.STATEMENT)
+        result = self._import('Date,Description,Amount\n2026-01-05,Coffee,-3.60\n2026-01-05,Coffee,3.50\n')
+        self.assertEqual((result.created, result.duplicates), (2, 0))
+
+    def test_dry_run_writes_nothing(self):
+        result = self._import(self.STATEMENT + '2026-01-10,Lamp,-20\n', dry_run=True)
+        self.assertEqual((result.dry_run, result.created), (True, 5))
+        self.assertFalse(Transaction.objects.filter(user=self.user).exists())
+
+    def test_bad_rows_are_reported_and_the_rest_imported(self):
+        result = self._import(self.STATEMENT + 'someday,Lamp,-20\n2026-01-10,Lamp,lots\n')
+        self.assertEqual(result.created, 4)
+        self.assertEqual([line for line, message in result.errors], [6, 7])
+
+    def test_import_updates_rollup_and_budget(self):
+        category = Category.objects.create(user=self.user, name='Household')
+        budget = Budget.objects.create(user=self.user, category=category, amount=Decimal('100'),
+                                       start_date=date(2026, 1, 1), end_date=date(2026, 1, 31))
+        self._import('Date,Description,Amount,Category\n2026-01-09,Hardware store,-42.00,Household\n')
+        self.assertEqual(Budget.objects.get(pk=budget.pk).spent, Decimal('42.00'))
+        self.assertEqual(MonthlyCategoryTotal.objects.get(user=self.user, category=category).total, Decimal('42.00'))
+
+    def test_ofx_statement(self):
+        statement = (
+            '<OFX><BANKTRANLIST>\n'
+            '<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260105120000<TRNAMT>-3.50<NAME>Coffee\n'
+            '</STMTTRN>\n'
+            '<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260106<TRNAMT>2000.00<NAME>Salary<MEMO>January\n'
+            '</STMTTRN>\n'
+            '</BANKTRANLIST></OFX>\n'
+        )
+        result = self._import(statement, format='ofx')
+        self.assertEqual(result.created, 2)
+        self.assertEqual(
+            set(Transaction.objects.filter(user=self.user).values_list('date', 'description', 'is_income')),
+            {(date(2026, 1, 5), 'Coffee', False), (date(2026, 1, 6), 'Salary - January', True)},
+        )
+        self.assertEqual(self._import(statement, format='ofx').duplicates, 2)
+
+
+class BulkApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('bulk')
+        self.category = Category.objects.create(user=self.user, name='Household')
+        self.budget = Budget.objects.create(user=self.user, category=self.category, amount=Decimal('100'),
+                                            start_date=date(2026, 1, 1), end_date=date(2026, 1, 31))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('api_transactions_bulk')
+
+    def _item(self, amount='10.00', **fields):
+        return dict({'amount': amount, 'description': 'Shop', 'date': '2026-01-10',
+                     'category_id': self.category.pk}, **fields)
+
+    def _spent(self):
+        return Budget.objects.get(pk=self.budget.pk).spent
+
+    def test_create_writes_valid_items_and_reports_the_rest(self):
+        other = Category.objects.create(user=User.objects.create_user('other'), name='Household')
+        version = user_cache.get_version(self.user.pk)
+        response = self.client.post(self.url, [
+            self._item(), self._item(amount='nope'), self._item(category_id=other.pk), self._item('5.00'),
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['created']), 2)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertEqual(self._spent(), Decimal('15.00'))
+        self.assertEqual(MonthlyCategoryTotal.objects.get(user=self.user, category=self.category).count, 2)
+        self.assertNotEqual(user_cache.get_version(self.user.pk), version)
+
+    def _queries_to_create(self, count):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, [self._item() for _ in range(count)], format='json')
+        return len(queries)
+
+    def test_create_query_count_does_not_grow_with_items(self):
+        # The first batch also creates the month's rollup row
+        self._queries_to_create(1)
+        self.assertEqual(self._queries_to_create(5), self._queries_to_create(50))
+
+    def test_update_moves_spending_and_rejects_unknown_or_repeated_ids(self):
+        created = self.client.post(self.url, [self._item(), self._item()], format='json').data['created']
+        stranger = Transaction.objects.create(user=User.objects.create_user('stranger'), amount=Decimal('1'),
+                                              description='x', date=date(2026, 1, 1))
+        first, second = created[0]['id'], created[1]['id']
+        response = self.client.patch(self.url, [
+            {'id': first, 'amount': '30.00'},
+            {'id': first, 'amount': '40.00'},
+            {'id': second, 'category_id': None},
+            {'id': stranger.pk, 'amount': '1.00'},
+            {'id': 'x'},
+        ], format='json')
+        self.assertEqual([item['id'] for item in response.data['updated']], [first, second])
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 3, 4])
+        self.assertEqual(self._spent(), Decimal('30.00'))
+        self.assertEqual(Transaction.objects.get(pk=stranger.pk).amount, Decimal('1'))
+
+    def test_delete_removes_rows_and_writes_tombstones(self):
+        created = self.client.post(self.url, [self._item(), self._item('5.00')], format='json').data['created']
+        ids = [item['id'] for item in created]
+        response = self.client.delete(self.url, {'ids': ids + [ids[0], 0]}, format='json')
+        self.assertEqual(response.data['deleted'], ids)
+        self.assertEqual([error['index'] for error in response.data['errors']], [3])
+        self.assertFalse(Transaction.objects.filter(pk__in=ids).exists())
+        tombstones = DeletedTransaction.objects.filter(user=self.user).values_list('transaction_id', flat=True)
+        self.assertEqual(set(tombstones), set(ids))
+        self.assertEqual(self._spent(), Decimal('0'))
+        self.assertFalse(
+            MonthlyCategoryTotal.objects.filter(user=self.user, category=self.category, count__gt=0).exists()
+        )
+
+    @override_settings(API_BULK_MAX_ITEMS=2)
+    def test_malformed_and_oversized_batches_are_rejected(self):
+        self.assertEqual(self.client.post(self.url, {'amount': '1'}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(self.url, [self._item()] * 3, format='json').status_code, 400)
+        self.assertFalse(Transaction.objects.filter(user=self.user).exists())
+
+
+@override_settings(SYNC_SETTLE_SECONDS=60, SYNC_TOMBSTONE_DAYS=90)
+class SyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('syncer')
+        self.transactions = [
+            Transaction.objects.create(user=self.user, amount=Decimal('1'), description=f'Item {index}',
+                                       date=date(2026, 1, 1))
+            for index in range(5)
+        ]
+        # All written at the same moment, well before the settle window
+        self.hour_ago = timezone.now() - timedelta(hours=1)
+        Transaction.objects.filter(user=self.user).update(updated_at=self.hour_ago)
+        Transaction.objects.create(user=User.objects.create_user('neighbour'), amount=Decimal('1'),
+                                   description='Not mine', date=date(2026, 1, 1))
+
+    def _sync(self, watermark=None, page_size=500):
+        """Follow a sync to the end; returns (changed ids in order, deleted ids, last page)"""
+        changed, deleted = [], []
+        while True:
+            page = sync.changes_since(self.user, watermark, page_size)
+            changed += [transaction.pk for transaction in page.changed]
+            deleted += page.deleted
+            watermark = page.watermark
+            if not page.has_more:
+                return changed, deleted, page
+
+    def test_pages_neither_skip_nor_repeat_rows_with_equal_timestamps(self):
+        changed, deleted, page = self._sync(page_size=2)
+        self.assertEqual(changed, [transaction.pk for transaction in self.transactions])
+        self.assertEqual(deleted, [])
+        self.assertFalse(page.reset)
+
+    def test_caught_up_sync_returns_only_new_changes_and_deletions(self):
+        *_, page = self._sync()
+        self.assertEqual(self._sync(page.watermark)[:2], ([], []))
+
+        edited, removed = self.transactions[1], self.transactions[2]
+        edited.description = 'Edited'
+        edited.save()
+        removed_pk = removed.pk
+        removed.delete()
+        changed, deleted, page = self._sync(page.watermark)
+        self.assertEqual((changed, deleted), ([edited.pk], [removed_pk]))
+        # Changes inside the settle window are served again, to be applied idempotently
+        self.assertEqual(self._sync(page.watermark)[:2], ([edited.pk], [removed_pk]))
+
+    def test_watermark_older_than_the_tombstones_resets(self):
+        long_ago = (timezone.now() - timedelta(days=91), 0)
+        changed, deleted, page = self._sync(sync.encode_watermark(long_ago, long_ago))
+        self.assertTrue(page.reset)
+        self.assertEqual(len(changed), len(self.transactions))
+
+    def test_invalid_watermarks_are_rejected(self):
+        naive = sync.encode_watermark((datetime(2026, 1, 1), 0), (datetime(2026, 1, 1), 0))
+        for token in ('not-a-watermark', naive):
+            with self.subTest(token), self.assertRaises(sync.InvalidWatermark):
+                sync.changes_since(self.user, token)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(reverse('api_sync_transactions'), {'since': 'not-a-watermark'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_prune_drops_only_expired_tombstones(self):
+        expired = self.transactions[0].pk
+        for transaction in self.transactions[:2]:
+            transaction.delete()
+        DeletedTransaction.objects.filter(transaction_id=expired).update(
+            deleted_at=timezone.now() - timedelta(days=91)
+        )
+        self.assertEqual(sync.prune_tombstones(), 1)
+        self.assertEqual(DeletedTransaction.objects.filter(user=self.user).count(), 1)
+
+
+class PaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('pager')
+        self.category = Category.objects.create(user=self.user, name='Household')
+        # Five rows a day, so most page boundaries fall inside a date
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, category=self.category, amount=Decimal('1'), description=f'Item {index}',
+                        date=date(2025, 12, 28) + timedelta(days=index // 5))
+            for index in range(25)
+        ])
+        rollups.rebuild([self.user])
+        self.expected = list(Transaction.objects.filter(user=self.user).order_by('-date', '-pk')
+                             .values_list('pk', flat=True))
+        self.client.force_login(self.user)
+
+    def _walk(self, older=None, page_size=4):
+        """Pages forward from the start, then back from the last page"""
+        queryset = Transaction.objects.filter(user=self.user)
+        forward, pages, cursor = [], [], None
+        while True:
+            page = pagination.paginate(queryset, cursor, page_size, older=older)
+            pages.append([row.pk for row in page.items])
+            forward += pages[-1]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        backward = pages[-1]
+        while page.has_previous:
+            page = pagination.paginate(queryset, page.previous_cursor, page_size, older=older)
+            backward = [row.pk for row in page.items] + backward
+        return forward, backward, pages
+
+    def test_pages_step_forward_and_back_without_gaps(self):
+        forward, backward, pages = self._walk()
+        self.assertEqual(forward, self.expected)
+        self.assertEqual(backward, self.expected)
+        self.assertEqual([len(items) for items in pages], [4] * 6 + [1])
+
+    def test_first_page_has_no_previous_cursor(self):
+        queryset = Transaction.objects.filter(user=self.user)
+        first = pagination.paginate(queryset, page_size=4)
+        self.assertFalse(first.has_previous)
+        second = pagination.paginate(queryset, first.next_cursor, page_size=4)
+        self.assertTrue(second.has_previous)
+        # Coming back to the first page doesn't offer a page before it
+        back = pagination.paginate(queryset, second.previous_cursor, page_size=4)
+        self.assertEqual(back.items, first.items)
+        self.assertFalse(back.has_previous)
+
+    def test_tampered_cursors_are_rejected(self):
+        valid = pagination.encode_cursor((date(2026, 1, 1), 5), 'next')
+        wrong_direction = pagination.encode_cursor((date(2026, 1, 1), 5), 'sideways')
+        for cursor in ('not-a-cursor', valid[:-3], wrong_direction):
+            with self.subTest(cursor):
+                with self.assertRaises(pagination.InvalidCursor):
+                    pagination.decode_cursor(cursor)
+                response = self.client.get(reverse('transactions'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+                response = self.client.get(reverse('api_transactions'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+
+    def test_pages_merge_the_archive_across_the_horizon(self):
+        horizon = date(2025, 12, 31)
+        archive.archive_user(self.user, horizon)
+        self.assertEqual(ArchivedTransaction.objects.filter(user=self.user).count(), 15)
+        forward, backward, pages = self._walk(archive.older(self.user))
+        self.assertEqual(forward, self.expected)
+        self.assertEqual(backward, self.expected)
+
+        response = self.client.get(reverse('api_transactions'), {'page_size': 7, 'fields': 'id'})
+        ids = []
+        while True:
+            data = response.json()
+            ids += [row['id'] for row in data['results']]
+            if not data['next']:
+                break
+            response = self.client.get(data['next'])
+        self.assertEqual(ids, self.expected)
+
+    def test_approximate_count_matches_the_real_count(self):
+        self.assertEqual(pagination.approximate_count(self.user), 25)
+        Transaction.objects.create(user=self.user, category=self.category, amount=Decimal('3'),
+                                   description='Extra', date=date(2026, 1, 2))
+        Transaction.objects.filter(user=self.user).first().delete()
+        archive.archive_user(self.user, date(2025, 12, 31))
+        self.assertEqual(pagination.approximate_count(self.user),
+                         Transaction.objects.filter(user=self.user).count()
+                         + ArchivedTransaction.objects.filter(user=self.user).count())
+        response = self.client.get(reverse('api_transactions'), {'count': 'true'})
+        self.assertEqual(response.json()['count'], 25)
+
+
+class ApiRowsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader')
+        self.household = Category.objects.create(user=self.user, name='Household')
+        self.salary = Category.objects.create(user=self.user, name='Payroll', is_income=True)
+        self.transactions = [
+            Transaction.objects.create(user=self.user, category=category, amount=Decimal(amount),
+                                       description=description, date=day, is_income=category == self.salary)
+            for category, amount, description, day in (
+                (self.household, '12.50', 'Lamp', date(2026, 2, 3)),
+                (self.salary, '2000', 'February pay', date(2026, 2, 27)),
+                (None, '7.05', 'Café', date(2026, 3, 1)),
+                (self.household, '0.99', 'Bulb', date(2026, 3, 4)),
+            )
+        ]
+        self.client.force_login(self.user)
+
+    def _get(self, **params):
+        response = self.client.get(reverse('api_transactions'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def _ids(self, **params):
+        return [row['id'] for row in self._get(fields='id', **params)]
+
+    def test_default_output_matches_the_serializer(self):
+        expected = TransactionSerializer(
+            Transaction.objects.filter(user=self.user).order_by('-date', '-pk'), many=True
+        ).data
+        self.assertEqual(self._get(), json.loads(json.dumps(expected)))
+
+    def test_fields_selects_the_output(self):
+        rows = self._get(fields='date, amount')
+        self.assertEqual(rows[0], {'amount': '0.99', 'date': '2026-03-04'})
+        self.assertEqual(self._get(fields='category')[1], {'category': None})
+        response = self.client.get(reverse('api_transactions'), {'fields': 'amount,user'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['detail'], 'Unknown field(s): user')
+
+    def test_filters(self):
+        lamp, pay, cafe, bulb = (transaction.pk for transaction in self.transactions)
+        self.assertEqual(self._ids(start_date='2026-02-27', end_date='2026-03-01'), [cafe, pay])
+        self.assertEqual(self._ids(category=self.household.pk), [bulb, lamp])
+        self.assertEqual(self._ids(category='none'), [cafe])
+        self.assertEqual(self._ids(type='income'), [pay])
+        self.assertEqual(self._ids(type='expense', min_amount='1'), [cafe, lamp])
+        for params in ({'type': 'transfer'}, {'category': 'Household'}, {'start_date': '03/01/2026'},
+                       {'max_amount': 'lots'}):
+            with self.subTest(params):
+                response = self.client.get(reverse('api_transactions'), params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_categories_are_looked_up_for_the_user_only(self):
+        other = User.objects.create_user('other')
+        foreign = Category.objects.create(user=other, name='Household')
+        columns = api_rows.columns_for(api_rows.FIELDS)
+        row = dict(zip(columns, (1, Decimal('3'), foreign.pk, 'Stray', date(2026, 3, 1), False)))
+        [item] = api_rows.to_dicts(self.user, [tuple(row[column] for column in columns)], api_rows.FIELDS, columns)
+        self.assertIsNone(item['category'])
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('archivist')
+        self.category = Category.objects.create(user=self.user, name='Household')
+        self.budget = Budget.objects.create(user=self.user, category=self.category, amount=Decimal('100'),
+                                            start_date=date(2025, 12, 1), end_date=date(2026, 1, 31))
+        self.transactions = [
+            Transaction.objects.create(user=self.user, category=self.category, amount=Decimal('10'),
+                                       description=f'Item {day.isoformat()}', date=day)
+            for day in (date(2025, 11, 20), date(2025, 12, 5), date(2025, 12, 20), date(2026, 1, 5))
+        ]
+        self.horizon = date(2026, 1, 1)
+
+    def _state(self):
+        """What archiving must leave alone"""
+        return (
+            list(MonthlyCategoryTotal.objects.filter(user=self.user).order_by('year', 'month')
+                 .values_list('year', 'month', 'total', 'count')),
+            Budget.objects.get(pk=self.budget.pk).spent,
+            DeletedTransaction.objects.filter(user=self.user).count(),
+        )
+
+    def test_horizon_counts_whole_months_back(self):
+        self.assertEqual(archive.horizon(24, date(2026, 3, 15)), date(2024, 3, 1))
+        self.assertEqual(archive.horizon(2, date(2026, 1, 31)), date(2025, 11, 1))
+
+    def test_archive_moves_old_rows_and_keeps_derived_data(self):
+        before = self._state()
+        version = user_cache.get_version(self.user.pk)
+        self.assertEqual(archive.archive_user(self.user, self.horizon, batch_size=2), 3)
+        self.assertEqual(list(Transaction.objects.filter(user=self.user).values_list('pk', flat=True)),
+                         [self.transactions[3].pk])
+        archived = ArchivedTransaction.objects.get(pk=self.transactions[0].pk)
+        self.assertEqual(archived.created_at, self.transactions[0].created_at)
+        self.assertEqual(self._state(), before)
+        self.assertNotEqual(user_cache.get_version(self.user.pk), version)
+        # Repeating the run (as after an interruption) has nothing left to do
+        self.assertEqual(archive.archive_user(self.user, self.horizon), 0)
+
+    def test_horizon_is_never_lowered(self):
+        archive.archive_user(self.user, self.horizon)
+        archive.archive_user(self.user, date(2025, 12, 1))
+        self.assertEqual(archive.archived_before(self.user), self.horizon)
+
+    def test_reads_reach_into_the_archive_only_when_needed(self):
+        archive.archive_user(self.user, self.horizon)
+        self.assertEqual(len(archive.sources(self.user, self.horizon)), 1)
+        self.assertEqual(len(archive.sources(self.user, date(2025, 12, 31))), 2)
+        self.assertEqual(len(archive.sources(self.user)), 2)
+        result = report_engine.build_report(self.user, 'transactions', date(2025, 12, 1), date(2026, 1, 31))
+        self.assertEqual([row[0] for row in result.rows], [date(2025, 12, 5), date(2025, 12, 20), date(2026, 1, 5)])
+
+    def test_restore_moves_everything_back(self):
+        before = self._state()
+        archive.archive_user(self.user, self.horizon)
+        self.assertEqual(archive.restore_user(self.user, batch_size=2), 3)
+        self.assertEqual(set(Transaction.objects.filter(user=self.user).values_list('pk', 'created_at')),
+                         {(transaction.pk, transaction.created_at) for transaction in self.transactions})
+        self.assertFalse(ArchivedTransaction.objects.filter(user=self.user).exists())
+        self.assertFalse(ArchiveHorizon.objects.filter(user=self.user).exists())
+        self.assertEqual(self._state(), before)
+
+
+class CategorizationTests(TestCase):
+    def setUp(self):
+        # Rolled back tests reuse user ids and rules versions, the compiled matchers' cache key
+        categorization._compiled.cache_clear()
+        self.user = User.objects.create_user('sorter')
+        self.household = Category.objects.create(user=self.user, name='Household')
+        self.travel = Category.objects.create(user=self.user, name='Travel')
+        self.big = Category.objects.create(user=self.user, name='Big spending')
+
+    def _rule(self, category, pattern='', **fields):
+        return CategorizationRule.objects.create(user=self.user, category=category, pattern=pattern, **fields)
+
+    def test_automaton_finds_overlapping_keywords(self):
+        automaton = categorization._Automaton([(word, word) for word in ('he', 'she', 'his', 'hers')])
+        self.assertEqual(automaton.find('ushers'), {'he', 'she', 'hers'})
+        self.assertEqual(automaton.find('history'), {'his'})
+        self.assertEqual(automaton.find('xyz'), set())
+
+    def test_rules_apply_by_priority_with_amount_and_type_conditions(self):
+        self._rule(self.big, min_amount=Decimal('500'), is_income=False, priority=1)
+        self._rule(self.travel, r'\b(train|air)\w*', match_type=CategorizationRule.REGEX, priority=5)
+        self._rule(self.household, 'hardware', max_amount=Decimal('100'))
+        matcher = categorization.matcher_for(self.user.pk)
+        cases = [
+            ('HARDWARE STORE', Decimal('20'), False, self.household.pk),
+            ('Hardware store', Decimal('200'), False, None),
+            ('Airline ticket', Decimal('200'), False, self.travel.pk),
+            ('Airline ticket', Decimal('900'), False, self.big.pk),
+            ('Airline refund', Decimal('900'), True, self.travel.pk),
+            ('Chair', Decimal('20'), False, None),
+        ]
+        for description, amount, is_income, expected in cases:
+            with self.subTest(description=description, amount=amount, is_income=is_income):
+                self.assertEqual(matcher.match(description, amount, is_income), expected)
+
+    def test_invalid_patterns_are_rejected(self):
+        for pattern in (r'(a)\1', '(?P<word>a)', '(?i)a', '(unclosed'):
+            with self.subTest(pattern), self.assertRaises(categorization.InvalidPattern):
+                categorization.validate_pattern(CategorizationRule.REGEX, pattern)
+        categorization.validate_pattern(CategorizationRule.REGEX, '(?s:a.b)')
+        categorization.validate_pattern(CategorizationRule.CONTAINS, '(unclosed')
+
+    def test_invalid_stored_regex_is_skipped(self):
+        self._rule(self.travel, '(unclosed', match_type=CategorizationRule.REGEX)
+        self._rule(self.household, 'lamp')
+        with self.assertLogs('finance_app.categorization', 'WARNING'):
+            self.assertEqual(categorization.matcher_for(self.user.pk).match('Lamp', Decimal('5'), False),
+                             self.household.pk)
+
+    def test_matcher_is_recompiled_when_rules_change(self):
+        rule = self._rule(self.household, 'lamp')
+        self.assertEqual(categorization.matcher_for(self.user.pk).match('Lamp', Decimal('5'), False),
+                         self.household.pk)
+        rule.category = self.travel
+        rule.save()
+        self.assertEqual(categorization.matcher_for(self.user.pk).match('Lamp', Decimal('5'), False),
+                         self.travel.pk)
+        rule.delete()
+        self.assertFalse(categorization.matcher_for(self.user.pk))
+
+    def test_new_transactions_are_categorized_on_save(self):
+        self._rule(self.household, 'lamp')
+        transaction = Transaction.objects.create(user=self.user, amount=Decimal('5'), description='Desk lamp',
+                                                 date=date(2026, 1, 5))
+        self.assertEqual(Transaction.objects.get(pk=transaction.pk).category_id, self.household.pk)
+
+    def test_recategorize_moves_stored_transactions_and_their_spending(self):
+        budget = Budget.objects.create(user=self.user, category=self.household, amount=Decimal('100'),
+                                       start_date=date(2026, 1, 1), end_date=date(2026, 1, 31))
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, amount=Decimal('5'), description=description, date=date(2026, 1, 5))
+            for description in ('Desk lamp', 'Floor lamp', 'Chair')
+        ])
+        self._rule(self.household, 'lamp')
+        self.assertEqual(categorization.recategorize(self.user, dry_run=True), 2)
+        self.assertFalse(Transaction.objects.filter(user=self.user, category=self.household).exists())
+        self.assertEqual(categorization.recategorize(self.user, batch_size=2), 2)
+        self.assertEqual(Transaction.objects.filter(user=self.user, category=self.household).count(), 2)
+        self.assertEqual(Budget.objects.get(pk=budget.pk).spent, Decimal('10'))
+
+    def test_deleting_a_user_with_rules_through_a_queryset(self):
+        self._rule(self.household, 'lamp')
+        User.objects.filter(pk=self.user.pk).delete()
+        self.assertFalse(CategorizationRule.objects.filter(user_id=self.user.pk).exists())
+        self.assertFalse(DataVersion.objects.filter(user_id=self.user.pk).exists())
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('finder')
+        self.descriptions = {
+            'short': 'Coffee',
+            'long': 'Coffee beans from the roastery down by the old station',
+            'phrase': 'Corner shop',
+            'other': 'Shop on the corner',
+            'accented': 'Café crème',
+        }
+        self.transactions = {
+            key: Transaction.objects.create(user=self.user, amount=Decimal(index + 1), description=description,
+                                            date=date(2026, 1, index + 1))
+            for index, (key, description) in enumerate(self.descriptions.items())
+        }
+        Transaction.objects.create(user=User.objects.create_user('stranger'), amount=Decimal('1'),
+                                   description='Coffee', date=date(2026, 1, 1))
+
+    def _found(self, text, queryset=None):
+        keys = {transaction.pk: key for key, transaction in self.transactions.items()}
+        return [keys[transaction.pk] for transaction in search.search(self.user, text, queryset).items]
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite search triggers')
+    def test_missing_search_triggers_are_reported(self):
+        self.assertEqual(database.check_search_triggers(None, databases=['default']), [])
+        # As when a migration makes SQLite rebuild the transaction table
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {database.FTS_TABLE}_update')
+        [warning] = database.check_search_triggers(None, databases=['default'])
+        self.assertEqual(warning.id, 'finance_app.W001')
+        self.assertIn(f'{database.FTS_TABLE}_update', warning.msg)
+
+    def test_parse_query(self):
+        cases = {
+            '': [],
+            None: [],
+            '*** -- ""': [],
+            'Coffee  BEANS': [(('coffee',), False), (('beans',), False)],
+            '"corner shop" coff*': [(('corner', 'shop'), False), (('coff',), True)],
+            '"unclosed phrase': [(('unclosed', 'phrase'), False)],
+            'fish_and-chips': [(('fish', 'and', 'chips'), False)],
+            'café': [(('café',), False)],
+            ' '.join(f'w{index}' for index in range(15)): [
+                ((f'w{index}',), False) for index in range(search.MAX_TERMS)
+            ],
+        }
+        for text, expected in cases.items():
+            with self.subTest(text):
+                self.assertEqual(search.parse_query(text), expected)
+
+    def test_fts5_query(self):
+        terms = search.parse_query('"corner shop" coff*')
+        self.assertEqual(search.fts5_query(terms, 7),
+                         'description : "corner shop" AND description : "coff" * AND owner : u7')
+
+    def test_words_phrases_and_prefixes(self):
+        cases = {
+            'coffee': {'short', 'long'},
+            'COFF*': {'short', 'long'},
+            'corner shop': {'phrase', 'other'},
+            '"corner shop"': {'phrase'},
+            'station coffee': {'long'},
+            'teapot': set(),
+        }
+        for text, expected in cases.items():
+            with self.subTest(text):
+                self.assertEqual(set(self._found(text)), expected)
+
+    @skipUnless(connection.vendor == 'sqlite', 'bm25 ranking and diacritic folding are the FTS5 index\'s')
+    def test_sqlite_ranks_closer_matches_first_and_folds_accents(self):
+        self.assertEqual(self._found('coffee'), ['short', 'long'])
+        self.assertEqual(self._found('cafe creme'), ['accented'])
+
+    def test_other_filters_apply_in_the_same_query(self):
+        queryset = Transaction.objects.filter(user=self.user, amount__gte=2)
+        self.assertEqual(self._found('coffee', queryset), ['long'])
+
+    def test_index_follows_edits_deletes_and_bulk_inserts(self):
+        short = self.transactions['short']
+        short.description = 'Tea'
+        short.save()
+        self.assertEqual(self._found('tea'), ['short'])
+        self.assertEqual(self._found('coffee'), ['long'])
+        self.transactions['long'].delete()
+        self.assertEqual(self._found('coffee'), [])
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, amount=Decimal('1'), description='Green tea', date=date(2026, 2, 1)),
+        ])
+        self.assertEqual(len(search.search(self.user, 'tea').items), 2)
+
+    def test_pages_and_invalid_searches(self):
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, amount=Decimal('1'), description='Coffee', date=date(2026, 2, day))
+            for day in range(1, 4)
+        ])
+        first = search.search(self.user, 'coffee', page_size=3)
+        second = search.search(self.user, 'coffee', page=2, page_size=3)
+        self.assertTrue(first.has_next)
+        self.assertFalse(second.has_next)
+        self.assertEqual(len({item.pk for item in first.items + second.items}), 5)
+        for text, page in (('', 1), ('***', 1), ('coffee', 0)):
+            with self.subTest(text=text, page=page), self.assertRaises(search.InvalidSearch):
+                search.search(self.user, text, page=page)
+
+    def test_api(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('api_transaction_search')
+        response = client.get(url, {'q': 'coffee', 'fields': 'id,description', 'min_amount': '2'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['results'],
+                         [{'id': self.transactions['long'].pk, 'description': self.descriptions['long']}])
+        self.assertEqual(client.get(url, {'q': ''}).status_code, 400)
+
+
+class ForecastTests(TestCase):
+    TODAY = date(2026, 1, 15)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('forecaster')
+        self.category = Category.objects.create(user=self.user, name='Household')
+
+    def _spend(self, amount, days):
+        """``amount`` on each of the ``days`` days up to and including today"""
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, category=self.category, amount=Decimal(amount), description='Shop',
+                        date=self.TODAY - timedelta(days=offset))
+            for offset in range(days)
+        ])
+        rollups.rebuild([self.user])
+        budget_tracking.reconcile(Budget.objects.filter(user=self.user))
+        user_cache.bump_version(self.user.pk)
+
+    def test_weekday_factors_without_history_are_neutral(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            factors = forecasting._weekday_factors(np.zeros((2, 91)), 3)
+        np.testing.assert_array_equal(factors, np.ones((2, 7)))
+
+    def test_weekday_factors_line_up_with_weekdays(self):
+        # Ten days starting on a Friday: only whole weeks count, so the first three are dropped
+        history = np.zeros((1, 10))
+        history[0, 3] = 14  # the Monday
+        factors = forecasting._weekday_factors(history, 4)
+        np.testing.assert_array_equal(factors, [[7, 0, 0, 0, 0, 0, 0]])
+
+    def test_expected_spending_stops_at_each_end(self):
+        today = date(2026, 1, 15)  # a Thursday
+        factors = np.ones((1, 7))
+        factors[0, 5] = 2  # Saturdays
+        expected = forecasting._expected(
+            np.array([10.0]), factors, today, np.array([0, 0]), [today + timedelta(days=3), today]
+        )
+        np.testing.assert_array_equal(expected, [[10, 20, 10], [0, 0, 0]])
+
+    def test_steady_spending_projects_to_the_end_of_the_month(self):
+        budget = Budget.objects.create(user=self.user, category=self.category, amount=Decimal('250'),
+                                       start_date=date(2026, 1, 1), end_date=date(2026, 1, 31))
+        self._spend('10', 120)
+        result = forecasting.build_forecast(self.user, self.TODAY)
+        [budget_forecast] = result.budgets
+        self.assertEqual((budget_forecast.budget_id, budget_forecast.spent), (budget.pk, 150.0))
+        self.assertAlmostEqual(budget_forecast.projected, 310.0)
+        self.assertTrue(budget_forecast.over_budget)
+        self.assertEqual(budget_forecast.projected_percentage, 124.0)
+        # 150 spent plus 10 a day passes 250 on the 11th day after today
+        self.assertEqual(budget_forecast.runs_out_on, date(2026, 1, 26))
+        [category_forecast] = result.categories
+        self.assertEqual((category_forecast.spent, category_forecast.projected), (150.0, 310.0))
+
+    def test_no_history(self):
+        Budget.objects.create(user=self.user, category=self.category, amount=Decimal('100'),
+                              start_date=date(2026, 1, 1), end_date=date(2026, 1, 31))
+        result = forecasting.build_forecast(self.user, self.TODAY)
+        [budget_forecast] = result.budgets
+        self.assertEqual((budget_forecast.spent, budget_forecast.projected), (0.0, 0.0))
+        self.assertIsNone(budget_forecast.runs_out_on)
+        self.assertEqual(result.categories, [])
+        self.assertEqual(forecasting.build_forecast(User.objects.create_user('empty'), self.TODAY).budgets, [])
+
+    def test_forecast_is_cached_until_the_data_changes(self):
+        self._spend('10', 30)
+        first = forecasting.forecast(self.user, self.TODAY)
+        with self.assertNumQueries(1):
+            self.assertEqual(forecasting.forecast(self.user, self.TODAY), first)
+        Transaction.objects.create(user=self.user, category=self.category, amount=Decimal('100'),
+                                   description='Shop', date=self.TODAY)
+        self.assertEqual(forecasting.forecast(self.user, self.TODAY).categories[0].spent, 250.0)
+
+    def test_api(self):
+        Budget.objects.create(user=self.user, category=self.category, amount=Decimal('100'),
+                              start_date=date.today().replace(day=1), end_date=date.today() + timedelta(days=40))
+        client = APIClient()
+        client.force_authenticate(self.user)
+        data = client.get(reverse('api_forecast')).data
+        self.assertEqual(data['budgets'][0]['projected_percentage'], 0)
+        self.assertFalse(data['budgets'][0]['over_budget'])
+
+
+class BudgetTrackingTests(TestCase):
+    def setUp(self):
+        budget_alerts._pending.state = None
+        self.user = User.objects.create_user('tracker')
+        self.household = Category.objects.create(user=self.user, name='Household')
+        self.travel = Category.objects.create(user=self.user, name='Travel')
+        self.budget = Budget.objects.create(user=self.user, category=self.household, amount=Decimal('500'),
+                                            start_date=date(2026, 3, 1), end_date=date(2026, 3, 31))
+        self.other = Budget.objects.create(user=self.user, category=self.travel, amount=Decimal('500'),
+                                           start_date=date(2026, 3, 1), end_date=date(2026, 3, 31))
+        self.expense = Transaction.objects.create(user=self.user, category=self.household, amount=Decimal('40'),
+                                                  description='Lamp', date=date(2026, 3, 10))
+
+    def assertSpent(self, household, travel):
+        self.assertEqual(Budget.objects.get(pk=self.budget.pk).spent, Decimal(household))
+        self.assertEqual(Budget.objects.get(pk=self.other.pk).spent, Decimal(travel))
+        self.assertFalse(budget_tracking.find_drift(Budget.objects.filter(user=self.user)).exists())
+
+    def _update(self, **values):
+        for name, value in values.items():
+            setattr(self.expense, name, value)
+        self.expense.save()
+
+    def test_editing_an_expense_moves_its_spending(self):
+        self.assertSpent('40', '0')
+        self._update(amount=Decimal('65.50'))
+        self.assertSpent('65.50', '0')
+        self._update(category=self.travel)
+        self.assertSpent('0', '65.50')
+        self._update(date=date(2026, 4, 2))
+        self.assertSpent('0', '0')
+        self._update(date=date(2026, 3, 31), category=self.household, amount=Decimal('12'))
+        self.assertSpent('12', '0')
+        self._update(category=None)
+        self.assertSpent('0', '0')
+        self._update(category=self.household)
+        self.expense.delete()
+        self.assertSpent('0', '0')
+
+    def test_income_is_not_spending(self):
+        self._update(is_income=True)
+        self.assertSpent('0', '0')
+        self._update(is_income=False, amount=Decimal('25'))
+        self.assertSpent('25', '0')
+
+    def test_reconcile_budgets_fixes_drift(self):
+        Budget.objects.filter(pk=self.budget.pk).update(spent=Decimal('999'))
+        Budget.objects.filter(pk=self.other.pk).update(spent=None)
+
+        out = StringIO()
+        call_command('reconcile_budgets', '--dry-run', stdout=out)
+        self.assertIn(f'Budget #{self.budget.pk}: stored 999.00, actual 40', out.getvalue())
+        self.assertIn('2 budget(s) out of date', out.getvalue())
+        self.assertEqual(Budget.objects.get(pk=self.budget.pk).spent, Decimal('999'))
+
+        out = StringIO()
+        call_command('reconcile_budgets', '--user', 'tracker', stdout=out)
+        self.assertIn('Reconciled 2 budget(s)', out.getvalue())
+        self.assertSpent('40', '0')
+
+        out = StringIO()
+        call_command('reconcile_budgets', stdout=out)
+        self.assertIn('Reconciled 0 budget(s)', out.getvalue())
+
+
+@override_settings(BUDGET_ALERT_THRESHOLDS=[70, 90, 100])
+class BudgetAlertTests(TestCase):
+    def setUp(self):
+        # Left over by tests whose on_commit callbacks never ran
+        budget_alerts._pending.state = None
+        self.user = User.objects.create_user('alerted')
+        self.category = Category.objects.create(user=self.user, name='Household')
+        self.today = date.today()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.budget = Budget.objects.create(user=self.user, category=self.category, amount=Decimal('100'),
+                                                start_date=self.today.replace(day=1),
+                                                end_date=self.today + timedelta(days=40))
+
+    def _spend(self, *amounts, day=None):
+        """One transaction per amount, committed together; returns them"""
+        with self.captureOnCommitCallbacks(execute=True):
+            return [
+                Transaction.objects.create(user=self.user, category=self.category, amount=Decimal(amount),
+                                           description='Shop', date=day or self.today)
+                for amount in amounts
+            ]
+
+    def _alerts(self):
+        return list(Notification.objects.filter(user=self.user).order_by('pk').values_list('threshold', flat=True))
+
+    def test_each_threshold_alerts_once(self):
+        self._spend('50')
+        self.assertEqual(self._alerts(), [])
+        self._spend('25')
+        self._spend('1')
+        self.assertEqual(self._alerts(), [70])
+        self._spend('20')
+        self.assertEqual(self._alerts(), [70, 90])
+        self.assertEqual(budget_alerts.evaluate(Budget.objects.filter(pk=self.budget.pk)), [])
+        self.assertEqual(Budget.objects.get(pk=self.budget.pk).alerted_threshold, 90)
+
+    def test_jumping_past_several_thresholds_alerts_the_highest(self):
+        # Many writes in one transaction are evaluated together
+        self._spend('60', '35', '30')
+        self.assertEqual(self._alerts(), [100])
+        self.assertIn('used up', Notification.objects.get(user=self.user).message)
+
+    def test_falling_back_below_re_arms_the_threshold(self):
+        first, _ = self._spend('50', '25')
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(Budget.objects.get(pk=self.budget.pk).alerted_threshold, 0)
+        self._spend('50')
+        self.assertEqual(self._alerts(), [70, 70])
+
+    def test_changing_the_amount_is_evaluated(self):
+        self._spend('75')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.budget.amount = Decimal('200')
+            self.budget.save()
+        self.assertEqual(Budget.objects.get(pk=self.budget.pk).alerted_threshold, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.budget.amount = Decimal('80')
+            self.budget.save()
+        self.assertEqual(self._alerts(), [70, 90])
+
+    def test_one_callback_per_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            for _ in range(5):
+                Transaction.objects.create(user=self.user, category=self.category, amount=Decimal('20'),
+                                           description='Shop', date=self.today)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_callback_dropped_by_a_rollback_is_registered_again(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with atomic():
+                    Transaction.objects.create(user=self.user, category=self.category, amount=Decimal('95'),
+                                               description='Shop', date=self.today)
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+            Transaction.objects.create(user=self.user, category=self.category, amount=Decimal('75'),
+                                       description='Shop', date=self.today)
+            Transaction.objects.create(user=self.user, category=self.category, amount=Decimal('5'),
+                                       description='Shop', date=self.today)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self._alerts(), [70])
+
+    def test_budgets_that_have_ended_do_not_alert(self):
+        last_month = self.today.replace(day=1) - timedelta(days=1)
+        Budget.objects.create(user=self.user, category=self.category, amount=Decimal('10'),
+                              start_date=last_month.replace(day=1), end_date=last_month)
+        self._spend('50', day=last_month)
+        self.assertEqual(self._alerts(), [])
+
+    def test_bulk_writes_alert(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(reverse('api_transactions_bulk'), [
+                {'amount': '45', 'description': 'Shop', 'date': self.today.isoformat(),
+                 'category_id': self.category.pk},
+            ] * 2, format='json')
+        self.assertEqual(self._alerts(), [90])
+
+    def test_notifications_api_and_badge(self):
+        self._spend('95')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('api_notifications')
+        data = client.get(url).data
+        self.assertEqual((data['unread'], [row['threshold'] for row in data['results']]), (1, [90]))
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('dashboard')).context['unread_notifications'], 1)
+        self.assertEqual(client.post(url, {'ids': [data['results'][0]['id']]}, format='json').data['marked_read'], 1)
+        self.assertEqual(client.get(url, {'unread': 'true'}).data['results'], [])
+        self.assertEqual(client.post(url, {'ids': 'all'}, format='json').status_code, 400)
+
+
+class RecurringTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('repeater')
+        self.category = Category.objects.create(user=self.user, name='Household')
+
+    def _recurring(self, rule, start_date, **fields):
+        return RecurringTransaction.objects.create(user=self.user, category=self.category, amount=Decimal('25'),
+                                                   description='Rent', rule=rule, start_date=start_date, **fields)
+
+    def _dates(self, recurring_transaction):
+        return list(Transaction.objects.filter(recurring=recurring_transaction).order_by('date')
+                    .values_list('date', flat=True))
+
+    def _reference(self, rule, start_date, until):
+        """The series as dateutil computes it from the start date"""
+        series = rrulestr(rule).replace(dtstart=datetime.combine(start_date, datetime.min.time()))
+        last = datetime.combine(until, datetime.min.time())
+        return [moment.date() for moment in series.between(datetime.min, last, inc=True)]
+
+    def test_running_again_creates_nothing(self):
+        rent = self._recurring('FREQ=MONTHLY;BYMONTHDAY=1', date(2026, 1, 1))
+        budget = Budget.objects.create(user=self.user, category=self.category, amount=Decimal('100'),
+                                       start_date=date(2026, 3, 1), end_date=date(2026, 3, 31))
+        first = recurring.materialize(until=date(2026, 3, 15))
+        self.assertEqual((first.rules, first.created), (1, 3))
+        second = recurring.materialize(until=date(2026, 3, 15))
+        self.assertEqual((second.rules, second.created), (0, 0))
+        self.assertEqual(self._dates(rent), [date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)])
+        rent.refresh_from_db()
+        self.assertEqual((rent.last_occurrence, rent.next_date), (date(2026, 3, 1), date(2026, 4, 1)))
+        # bulk_create skips the signals; the rollup and budget are still kept up to date
+        self.assertEqual(Budget.objects.get(pk=budget.pk).spent, Decimal('25'))
+        self.assertEqual(MonthlyCategoryTotal.objects.get(user=self.user, year=2026, month=2).total, Decimal('25'))
+
+    def test_series_match_the_series_from_the_start_date(self):
+        cases = [
+            ('FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,FR', date(2026, 1, 7)),
+            ('FREQ=MONTHLY;BYMONTHDAY=31', date(2026, 1, 31)),
+            ('FREQ=MONTHLY', date(2026, 1, 31)),
+            ('FREQ=YEARLY;BYMONTH=2;BYMONTHDAY=29', date(2024, 2, 29)),
+        ]
+        until = date(2028, 12, 31)
+        for rule, start_date in cases:
+            with self.subTest(rule):
+                series = self._recurring(rule, start_date)
+                # Many runs, each anchored on the previous one's next_date
+                day = start_date
+                while day <= until:
+                    recurring.materialize(until=day, users=[self.user])
+                    day += timedelta(days=17)
+                recurring.materialize(until=until, users=[self.user])
+                self.assertEqual(self._dates(series), self._reference(rule, start_date, until))
+
+    def test_end_date_cuts_the_series_off(self):
+        rent = self._recurring('FREQ=MONTHLY;BYMONTHDAY=1', date(2026, 1, 1), end_date=date(2026, 3, 15))
+        recurring.materialize(until=date(2026, 12, 31))
+        self.assertEqual(self._dates(rent), [date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)])
+        rent.refresh_from_db()
+        self.assertIsNone(rent.next_date)
+        self.assertEqual(recurring.materialize(until=date(2027, 12, 31)).rules, 0)
+
+    def test_editing_the_rule_reschedules_after_the_last_occurrence(self):
+        rent = self._recurring('FREQ=MONTHLY;BYMONTHDAY=1', date(2026, 1, 1))
+        recurring.materialize(until=date(2026, 2, 10))
+        rent.refresh_from_db()
+        rent.rule = 'FREQ=MONTHLY;BYMONTHDAY=15'
+        rent.save()
+        # Not the 15th of January, which would come before what was already created
+        self.assertEqual(rent.next_date, date(2026, 2, 15))
+        recurring.materialize(until=date(2026, 3, 31))
+        self.assertEqual(self._dates(rent),
+                         [date(2026, 1, 1), date(2026, 2, 1), date(2026, 2, 15), date(2026, 3, 15)])
+
+    def test_count_is_rejected(self):
+        for rule in ('FREQ=MONTHLY;COUNT=3', 'FREQ=HOURLY', 'nonsense', 'FREQ=DAILY\nFREQ=WEEKLY'):
+            with self.subTest(rule), self.assertRaises(recurring.InvalidRule):
+                recurring.parse_rule(rule)
+
+    def test_occurrences_written_by_another_run_are_skipped(self):
+        rent = self._recurring('FREQ=MONTHLY;BYMONTHDAY=1', date(2026, 1, 1))
+        occurrences = recurring._occurrences
+
+        def race(*args):
+            # Another run commits January and February after this one read what exists
+            if not race.done:
+                race.done = True
+                for day in (date(2026, 1, 1), date(2026, 2, 1)):
+                    Transaction.objects.create(user=self.user, amount=Decimal('25'), description='Rent', date=day,
+                                               recurring=rent, occurrence=day)
+                RecurringTransaction.objects.filter(pk=rent.pk).update(
+                    last_occurrence=date(2026, 2, 1), next_date=date(2026, 3, 1)
+                )
+            return occurrences(*args)
+        race.done = False
+
+        with mock.patch.object(recurring, '_occurrences', side_effect=race):
+            result = recurring.materialize(until=date(2026, 3, 15))
+        self.assertEqual((result.conflicts, result.created), (1, 1))
+        self.assertEqual(self._dates(rent), [date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)])
+
+    def test_conflict_retries_are_counted_per_batch(self):
+        for day in (1, 2):
+            self._recurring(f'FREQ=MONTHLY;BYMONTHDAY={day}', date(2026, 1, day))
+        materialize_batch = recurring._materialize_batch
+        attempts = {}
+
+        def conflicting(rules, *args):
+            attempts[rules[0].pk] = attempts.get(rules[0].pk, 0) + 1
+            if attempts[rules[0].pk] <= recurring.MAX_CONFLICT_RETRIES:
+                raise IntegrityError('duplicate occurrence')
+            return materialize_batch(rules, *args)
+
+        with mock.patch.object(recurring, '_materialize_batch', side_effect=conflicting):
+            result = recurring.materialize(until=date(2026, 1, 31), batch_size=1)
+        self.assertEqual((result.conflicts, result.created), (2 * recurring.MAX_CONFLICT_RETRIES, 2))
+
+        with mock.patch.object(recurring, '_materialize_batch', side_effect=IntegrityError('duplicate occurrence')):
+            with self.assertRaises(IntegrityError):
+                recurring.materialize(until=date(2026, 2, 28))
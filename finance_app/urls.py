@@ -15,6 +15,7 @@ urlpatterns = [
     
     # Transactions
     path('transactions/', views.TransactionListView.as_view(), name='transactions'),  # Changed name
+    path('transactions/import/', views.import_transactions, name='import_transactions'),
     path('transactions/add/', views.TransactionCreateView.as_view(), name='add_transaction'),
     path('transactions/<int:pk>/edit/', views.TransactionUpdateView.as_view(), name='edit_transaction'),
     path('transactions/<int:pk>/delete/', views.TransactionDeleteView.as_view(), name='delete_transaction'),
@@ -29,6 +30,24 @@ urlpatterns = [
     path('budgets/<int:pk>/edit/', views.BudgetUpdateView.as_view(), name='edit_budget'),
     path('budgets/<int:pk>/delete/', views.BudgetDeleteView.as_view(), name='delete_budget'),
     
+    # Recurring transactions
+    path('recurring/', views.RecurringTransactionListView.as_view(), name='recurring_list'),
+    path('recurring/add/', views.RecurringTransactionCreateView.as_view(), name='add_recurring'),
+    path('recurring/<int:pk>/edit/', views.RecurringTransactionUpdateView.as_view(), name='edit_recurring'),
+    path('recurring/<int:pk>/delete/', views.RecurringTransactionDeleteView.as_view(), name='delete_recurring'),
+
+    # Categorization rules
+    path('rules/', views.CategorizationRuleListView.as_view(), name='rule_list'),
+    path('rules/add/', views.CategorizationRuleCreateView.as_view(), name='add_rule'),
+    path('rules/<int:pk>/edit/', views.CategorizationRuleUpdateView.as_view(), name='edit_rule'),
+    path('rules/<int:pk>/delete/', views.CategorizationRuleDeleteView.as_view(), name='delete_rule'),
+    path('rules/apply/', views.apply_categorization_rules, name='apply_rules'),
+
+    # Notifications
+    path('notifications/', views.NotificationListView.as_view(), name='notification_list'),
+    path('notifications/read/', views.mark_notifications_read, name='mark_notifications_read'),
+    path('notifications/<int:pk>/read/', views.mark_notifications_read, name='mark_notification_read'),
+
     # Reports
     path('reports/', views.generate_report, name='generate_report'),
     path('reports/<int:pk>/', views.view_report, name='view_report'),
@@ -44,5 +63,13 @@ urlpatterns = [
 
     # API
     path('api/transactions/', views.api_transactions, name='api_transactions'),
+    path('api/transactions/bulk/', views.api_transactions_bulk, name='api_transactions_bulk'),
+    path('api/transactions/search/', views.api_transaction_search, name='api_transaction_search'),
+    path('api/sync/transactions/', views.api_sync_transactions, name='api_sync_transactions'),
     path('api/summary/', views.api_summary, name='api_summary'),
+    path('api/forecast/', views.api_forecast, name='api_forecast'),
+    path('api/notifications/', views.api_notifications, name='api_notifications'),
+    path('api/reports/<int:pk>/', views.api_report_status, name='api_report_status'),
+    path('api/cache-stats/', views.api_cache_stats, name='api_cache_stats'),
+    path('api/request-metrics/', views.api_request_metrics, name='api_request_metrics'),
 ]
\ No newline at end of file
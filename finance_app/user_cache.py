@@ -0,0 +1,109 @@
+"""
+Per-user cache for computed payloads. Keys embed the user's data version,
+which is bumped on every Transaction/Budget/Category write (see signals.py),
+so a cached value is never served after the data behind it changes.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import DataVersion
+
+_MISSING = object()
+
+
+class _LRUIndex:
+    """
+    Bounded record of the keys this process has cached, least recently used
+    first. Evicting from it deletes the entry from the backend, which gives
+    LRU behaviour on backends that cull arbitrarily (e.g. the file cache).
+    """
+    def __init__(self):
+        self.keys = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def hit(self, key):
+        with self.lock:
+            self.hits += 1
+            if key in self.keys:
+                self.keys.move_to_end(key)
+
+    def miss(self, key, limit):
+        with self.lock:
+            self.misses += 1
+            self.keys[key] = None
+            self.keys.move_to_end(key)
+            evicted = []
+            while len(self.keys) > limit:
+                evicted.append(self.keys.popitem(last=False)[0])
+            self.evictions += len(evicted)
+        return evicted
+
+
+_index = _LRUIndex()
+
+
+def _backend():
+    return caches[getattr(settings, 'FINANCE_CACHE_ALIAS', 'default')]
+
+
+def get_version(user_id, field='version'):
+    version = DataVersion.objects.filter(user_id=user_id).values_list(field, flat=True).first()
+    return version or 0
+
+
+def bump_version(user_id, field='version'):
+    """Invalidate everything cached for a user (or, with ``field``, what depends on that counter)"""
+    if DataVersion.objects.filter(user_id=user_id).update(**{field: F(field) + 1}):
+        return
+    try:
+        with transaction.atomic():
+            DataVersion.objects.create(user_id=user_id, **{field: 1})
+    except IntegrityError:
+        DataVersion.objects.filter(user_id=user_id).update(**{field: F(field) + 1})
+
+
+def bump_versions(user_ids):
+    """bump_version() for many users with two queries"""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    DataVersion.objects.filter(user_id__in=user_ids).update(version=F('version') + 1)
+    DataVersion.objects.bulk_create(
+        [DataVersion(user_id=user_id, version=1) for user_id in user_ids], ignore_conflicts=True
+    )
+
+
+def cached(user_id, name, compute, *key_parts):
+    """Return the cached value of ``compute()`` for this user's current data"""
+    key = ':'.join(['finance', name, str(user_id), str(get_version(user_id))] + [str(part) for part in key_parts])
+    backend = _backend()
+    value = backend.get(key, _MISSING)
+    if value is not _MISSING:
+        _index.hit(key)
+        return value
+
+    value = compute()
+    backend.set(key, value, timeout=None)
+    for evicted in _index.miss(key, getattr(settings, 'FINANCE_CACHE_MAX_ENTRIES', 1000)):
+        backend.delete(evicted)
+    return value
+
+
+def stats():
+    total = _index.hits + _index.misses
+    return {
+        'hits': _index.hits,
+        'misses': _index.misses,
+        'hit_rate': round(_index.hits / total, 4) if total else None,
+        'evictions': _index.evictions,
+        'entries': len(_index.keys),
+        'max_entries': getattr(settings, 'FINANCE_CACHE_MAX_ENTRIES', 1000),
+    }
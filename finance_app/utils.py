@@ -0,0 +1,5 @@
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty sequence, ``fraction`` in [0, 1]"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
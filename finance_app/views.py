@@ -1,24 +1,29 @@
+import heapq
 import json
+import os
 from datetime import datetime, timedelta
 from io import BytesIO
-import pandas as pd
+from itertools import islice
+from urllib.parse import urlencode
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse, FileResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, FileResponse, Http404
 from django.db.models import Sum, Q, F, Case, When, FloatField
 from django.contrib.auth import login, logout
 from django.db.models.functions import ExtractMonth, ExtractYear
-from django.urls import reverse_lazy
-from reportlab.pdfgen import canvas
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.utils.urls import replace_query_param
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import LoginView
-from .models import Transaction, Category, Budget, Report
+from .models import Transaction, Category, Budget, CategorizationRule, Notification, RecurringTransaction, Report
 from .forms import (
     TransactionForm, 
     CategoryForm, 
@@ -26,9 +31,15 @@ from .forms import (
     ReportForm, 
     UserRegisterForm,
     UserProfileForm,
-    ExpenseForm
+    ExpenseForm,
+    ImportForm,
+    RecurringTransactionForm,
+    CategorizationRuleForm
 )
 from .serializers import TransactionSerializer, CategorySerializer
+from .aggregates import get_dashboard_summary
+from . import api_rows, archive, bulk_writes, categorization, exports, forecasting, importers, instrumentation, report_engine, report_jobs, rollups, search, sync, user_cache
+from .pagination import InvalidCursor, approximate_count, paginate
 
 # ============== Authentication Views ==============
 def register(request):
@@ -64,12 +75,16 @@ def add_expense(request):
             return redirect('expense_list')
     else:
         form = ExpenseForm(user=request.user)
-    return render(request, 'finance_app/expense_add.html', {'form': form})
+    return render(request, 'finance_app/expenses/expense_add.html', {'form': form})
 
 def expense_list(request):
-    expenses = Transaction.objects.filter(user=request.user, is_income=False).order_by('-date')
-    total_expenses = expenses.aggregate(total=Sum('amount'))['total'] or 0
-    return render(request, 'finance_app/expense_list.html', {
+    parts = [
+        queryset.filter(is_income=False).select_related('category').order_by('-date', '-pk')
+        for queryset in archive.sources(request.user)
+    ]
+    expenses = heapq.merge(*parts, key=lambda expense: (expense.date, expense.pk), reverse=True)
+    total_expenses = sum(part.aggregate(total=Sum('amount'))['total'] or 0 for part in parts)
+    return render(request, 'finance_app/expenses/expense_list.html', {
         'expenses': expenses,
         'total_expenses': total_expenses
     })
@@ -81,58 +96,22 @@ def dashboard(request):
     start_of_month = today.replace(day=1)
     end_of_month = (start_of_month + timedelta(days=32)).replace(day=1) - timedelta(days=1)
 
-    transactions = Transaction.objects.filter(user=request.user).order_by('-date')[:5]
-
-    transaction_expenses = Transaction.objects.filter(
-        user=request.user,
-        is_income=False,
-        date__range=[start_of_month, end_of_month]
-    ).aggregate(total=Sum('amount'))['total'] or 0
-
-    budget_expenses = Budget.objects.filter(
-        user=request.user,
-        start_date__lte=end_of_month,
-        end_date__gte=start_of_month
-    ).aggregate(total=Sum('amount'))['total'] or 0
-
-    total_income = Transaction.objects.filter(
-        user=request.user,
-        is_income=True,
-        date__range=[start_of_month, end_of_month]
-    ).aggregate(total=Sum('amount'))['total'] or 0
-
-    categories = Category.objects.filter(user=request.user)
-    category_data = {'labels': [], 'expenses': [], 'budgets': []}
-
-    for category in categories:
-        actual_spending = Transaction.objects.filter(
-            user=request.user,
-            category=category,
-            is_income=False,
-            date__range=[start_of_month, end_of_month]
-        ).aggregate(total=Sum('amount'))['total'] or 0
-
-        budgeted_amount = Budget.objects.filter(
-            user=request.user,
-            category=category,
-            start_date__lte=end_of_month,
-            end_date__gte=start_of_month
-        ).aggregate(total=Sum('amount'))['total'] or 0
-
-        if actual_spending > 0 or budgeted_amount > 0:
-            category_data['labels'].append(category.name)
-            category_data['expenses'].append(float(actual_spending))
-            category_data['budgets'].append(float(budgeted_amount))
-
-    context = {
-        'transactions': transactions,
-        'total_income': total_income,
-        'transaction_expenses': transaction_expenses,
-        'budget_expenses': budget_expenses,
-        'balance': total_income - transaction_expenses,
-        'category_data': json.dumps(category_data),
-        'current_month': start_of_month.strftime('%B %Y')
-    }
+    def build_context():
+        summary = get_dashboard_summary(request.user, start_of_month, end_of_month)
+        recent = paginate(
+            Transaction.objects.filter(user=request.user).select_related('category'),
+            page_size=5, older=archive.older(request.user)
+        )
+        return {
+            'transactions': recent.items,
+            'summary': summary,
+            'category_data': json.dumps(summary.chart_data()),
+            'current_month': start_of_month.strftime('%B %Y')
+        }
+
+    context = user_cache.cached(request.user.pk, 'dashboard', build_context, start_of_month.isoformat())
+    # Cached on its own: it moves daily, and the API serves the same result
+    context['forecast'] = forecasting.forecast(request.user, today)
     return render(request, 'finance_app/dashboard.html', context)
 
 # ============== Transaction Views ==============
@@ -140,10 +119,64 @@ class TransactionListView(LoginRequiredMixin, ListView):
     model = Transaction
     template_name = 'finance_app/transactions/list.html'
     context_object_name = 'transactions'
-    paginate_by = 10
+    page_size = 10
 
     def get_queryset(self):
-        return Transaction.objects.filter(user=self.request.user).order_by('-date')
+        return Transaction.objects.filter(user=self.request.user).select_related('category')
+
+    def get_context_data(self, **kwargs):
+        params = self.request.GET
+        query = params.get('q', '').strip()
+        filters = {name: params.get(name, '') for name in api_rows.FILTERS}
+        # Page links carry the search and filters along
+        kwargs['querystring'] = urlencode({name: value for name, value in [('q', query), *filters.items()] if value})
+        kwargs['query'] = query
+        kwargs['filters'] = filters
+        kwargs['categories'] = Category.objects.filter(user=self.request.user).order_by('name')
+        kwargs['approximate_count'] = approximate_count(self.request.user)
+
+        page = None
+        try:
+            transactions = api_rows.filter_transactions(self.object_list, params)
+            if query:
+                try:
+                    number = int(params.get('page', 1))
+                except ValueError:
+                    raise Http404('Invalid page')
+                page = search.search(self.request.user, query, transactions, number, self.page_size)
+            else:
+                archived = archive.older(self.request.user, api_rows.start_date(params))
+                if archived is not None:
+                    archived = (api_rows.filter_transactions(archived[0], params), archived[1])
+                page = paginate(transactions, params.get('cursor'), self.page_size, older=archived)
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        except (api_rows.InvalidQuery, search.InvalidSearch) as exc:
+            kwargs['search_error'] = str(exc)
+        kwargs['page'] = page
+        return super().get_context_data(object_list=page.items if page else [], **kwargs)
+
+@login_required
+def import_transactions(request):
+    result = None
+    if request.method == 'POST':
+        form = ImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                result = importers.import_transactions(
+                    request.user,
+                    importers.open_text(form.cleaned_data['file']),
+                    form.cleaned_data['format'],
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+            except importers.StatementError as exc:
+                form.add_error('file', str(exc))
+            else:
+                if not result.dry_run:
+                    messages.success(request, f'Imported {result.created} transactions.')
+    else:
+        form = ImportForm()
+    return render(request, 'finance_app/transactions/import.html', {'form': form, 'result': result})
 
 class TransactionCreateView(LoginRequiredMixin, CreateView):
     model = Transaction
@@ -295,6 +328,155 @@ class BudgetDeleteView(LoginRequiredMixin, DeleteView):
         messages.success(request, 'Budget deleted successfully!')
         return super().delete(request, *args, **kwargs)
 
+# ============== Recurring Transaction Views ==============
+class RecurringTransactionListView(LoginRequiredMixin, ListView):
+    model = RecurringTransaction
+    template_name = 'finance_app/recurring/list.html'
+    context_object_name = 'recurring_transactions'
+
+    def get_queryset(self):
+        return RecurringTransaction.objects.filter(user=self.request.user).select_related('category').order_by(
+            '-active', 'next_date', 'pk'
+        )
+
+class RecurringTransactionCreateView(LoginRequiredMixin, CreateView):
+    model = RecurringTransaction
+    form_class = RecurringTransactionForm
+    template_name = 'finance_app/recurring/form.html'
+    success_url = reverse_lazy('recurring_list')
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
+    def form_valid(self, form):
+        recurring_transaction = form.save(commit=False)
+        recurring_transaction.user = self.request.user
+        recurring_transaction.save()
+        messages.success(self.request, 'Recurring transaction added successfully!')
+        return redirect(self.success_url)
+
+class RecurringTransactionUpdateView(LoginRequiredMixin, UpdateView):
+    model = RecurringTransaction
+    form_class = RecurringTransactionForm
+    template_name = 'finance_app/recurring/form.html'
+    success_url = reverse_lazy('recurring_list')
+
+    def get_queryset(self):
+        return RecurringTransaction.objects.filter(user=self.request.user)
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
+    def form_valid(self, form):
+        form.save()
+        messages.success(self.request, 'Recurring transaction updated successfully!')
+        return redirect(self.success_url)
+
+class RecurringTransactionDeleteView(LoginRequiredMixin, DeleteView):
+    model = RecurringTransaction
+    template_name = 'finance_app/recurring/delete.html'
+    success_url = reverse_lazy('recurring_list')
+
+    def get_queryset(self):
+        return RecurringTransaction.objects.filter(user=self.request.user)
+
+    def form_valid(self, form):
+        messages.success(self.request, 'Recurring transaction deleted successfully!')
+        return super().form_valid(form)
+
+# ============== Categorization Rule Views ==============
+class CategorizationRuleListView(LoginRequiredMixin, ListView):
+    model = CategorizationRule
+    template_name = 'finance_app/rules/list.html'
+    context_object_name = 'rules'
+
+    def get_queryset(self):
+        return CategorizationRule.objects.filter(user=self.request.user).select_related('category')
+
+    def get_context_data(self, **kwargs):
+        kwargs['uncategorized'] = Transaction.objects.filter(user=self.request.user, category__isnull=True).count()
+        return super().get_context_data(**kwargs)
+
+class CategorizationRuleCreateView(LoginRequiredMixin, CreateView):
+    model = CategorizationRule
+    form_class = CategorizationRuleForm
+    template_name = 'finance_app/rules/form.html'
+    success_url = reverse_lazy('rule_list')
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
+    def form_valid(self, form):
+        rule = form.save(commit=False)
+        rule.user = self.request.user
+        rule.save()
+        messages.success(self.request, 'Rule added successfully!')
+        return redirect(self.success_url)
+
+class CategorizationRuleUpdateView(LoginRequiredMixin, UpdateView):
+    model = CategorizationRule
+    form_class = CategorizationRuleForm
+    template_name = 'finance_app/rules/form.html'
+    success_url = reverse_lazy('rule_list')
+
+    def get_queryset(self):
+        return CategorizationRule.objects.filter(user=self.request.user)
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
+    def form_valid(self, form):
+        form.save()
+        messages.success(self.request, 'Rule updated successfully!')
+        return redirect(self.success_url)
+
+class CategorizationRuleDeleteView(LoginRequiredMixin, DeleteView):
+    model = CategorizationRule
+    template_name = 'finance_app/rules/delete.html'
+    success_url = reverse_lazy('rule_list')
+
+    def get_queryset(self):
+        return CategorizationRule.objects.filter(user=self.request.user)
+
+    def form_valid(self, form):
+        messages.success(self.request, 'Rule deleted successfully!')
+        return super().form_valid(form)
+
+@login_required
+def apply_categorization_rules(request):
+    if request.method == 'POST':
+        count = categorization.recategorize(request.user)
+        messages.success(request, f'Categorized {count} transactions.')
+    return redirect('rule_list')
+
+# ============== Notification Views ==============
+class NotificationListView(LoginRequiredMixin, ListView):
+    model = Notification
+    template_name = 'finance_app/notifications/list.html'
+    context_object_name = 'notifications'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return Notification.objects.filter(user=self.request.user).select_related('budget__category')
+
+@login_required
+def mark_notifications_read(request, pk=None):
+    """Mark one notification, or all of them, as read"""
+    if request.method == 'POST':
+        unread = Notification.objects.filter(user=request.user, read_at__isnull=True)
+        if pk is not None:
+            unread = unread.filter(pk=pk)
+        unread.update(read_at=timezone.now())
+    return redirect('notification_list')
+
 # ============== Report Views ==============
 @login_required
 def generate_report(request):
@@ -305,31 +487,38 @@ def generate_report(request):
             start_date = form.cleaned_data['start_date']
             end_date = form.cleaned_data['end_date']
             format = form.cleaned_data['format']
+            granularity = form.cleaned_data.get('granularity') or None
+
+            long_range = (end_date - start_date).days > settings.REPORT_BACKGROUND_AFTER_DAYS
+            if format == 'pdf' or form.cleaned_data.get('background') or (format != 'html' and long_range):
+                report = report_jobs.enqueue(request.user, report_type, start_date, end_date, format, granularity)
+                messages.info(request, 'Your report is being generated.')
+                return redirect('view_report', pk=report.pk)
+
+            result = report_engine.build_report(
+                request.user, report_type, start_date, end_date, granularity
+            )
+
+            if format in exports.RENDERERS:
+                return exports.export_response(result, format)
 
-            transactions = Transaction.objects.filter(user=request.user, date__range=[start_date, end_date])
-
-            if report_type == 'monthly':
-                data = transactions.annotate(
-                    month=ExtractMonth('date'),
-                    year=ExtractYear('date')
-                ).values('month', 'year', 'is_income').annotate(
-                    total=Sum('amount')
-                ).order_by('year', 'month')
-
-                if format == 'json':
-                    return JsonResponse(list(data), safe=False)
-                elif format == 'csv':
-                    df = pd.DataFrame(data)
-                    response = HttpResponse(content_type='text/csv')
-                    response['Content-Disposition'] = f'attachment; filename="monthly_report_{start_date}_{end_date}.csv"'
-                    df.to_csv(response, index=False)
-                    return response
+            # Raw transactions are read lazily; the page shows the first rows
+            # only and the exports stream the rest
+            limit = settings.REPORT_HTML_MAX_ROWS
+            truncated = False
+            if report_type == 'transactions':
+                rows = list(islice(result.rows, limit + 1))
+                truncated = len(rows) > limit
+                result.rows = rows[:limit]
 
             return render(request, 'finance_app/reports/result.html', {
-                'report_type': report_type,
-                'data': data,
+                'report': result,
+                'report_type': form.get_report_type_display(),
                 'start_date': start_date,
-                'end_date': end_date
+                'end_date': end_date,
+                'truncated': truncated,
+                'row_limit': limit,
+                'export_formats': ('csv', 'ndjson'),
             })
     else:
         end_date = datetime.now().date()
@@ -345,30 +534,239 @@ def view_report(request, pk):
 @login_required
 def download_report(request, pk):
     report = get_object_or_404(Report, pk=pk, user=request.user)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="report_{pk}.pdf"'
-    p = canvas.Canvas(response)
-    p.drawString(100, 100, f"Report #{report.id}")
-    p.showPage()
-    p.save()
-    return response
+    if report.status != Report.DONE or not report.file:
+        messages.warning(request, 'This report is not ready yet.')
+        return redirect('view_report', pk=pk)
+    extension = os.path.splitext(report.file.name)[1]
+    return FileResponse(report.file.open('rb'), as_attachment=True, filename=f"report_{pk}{extension}")
 
 # ============== API Views ==============
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+API_SYNC_PAGE_SIZE = 500
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def api_transactions(request):
-    transactions = Transaction.objects.filter(user=request.user)
-    serializer = TransactionSerializer(transactions, many=True)
-    return Response(serializer.data)
+    """
+    Keyset-paginated transactions, newest first. Supports ?fields=,
+    ?start_date=, ?end_date=, ?category= (id or 'none'), ?type=
+    (income/expense), ?min_amount= and ?max_amount=. Encoded without DRF
+    serializers, see api_rows.py.
+    """
+    try:
+        page_size = min(int(request.query_params.get('page_size', API_PAGE_SIZE)), API_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({'detail': 'page_size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    if page_size < 1:
+        return Response({'detail': 'page_size must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        fields = api_rows.parse_fields(request.query_params.get('fields'))
+        transactions = api_rows.filter_transactions(
+            Transaction.objects.filter(user=request.user), request.query_params
+        )
+        archived = archive.older(request.user, api_rows.start_date(request.query_params))
+        if archived is not None:
+            archived = (api_rows.filter_transactions(archived[0], request.query_params), archived[1])
+        columns = api_rows.columns_for(fields)
+        page = paginate(transactions, request.query_params.get('cursor'), page_size, fields=columns, older=archived)
+    except (api_rows.InvalidQuery, InvalidCursor) as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    url = request.build_absolute_uri()
+    data = {
+        'next': replace_query_param(url, 'cursor', page.next_cursor) if page.has_next else None,
+        'previous': replace_query_param(url, 'cursor', page.previous_cursor) if page.has_previous else None,
+        'results': api_rows.to_dicts(request.user, page.items, fields, columns),
+    }
+    if request.query_params.get('count') in ('1', 'true'):
+        if any(request.query_params.get(name) for name in api_rows.FILTERS):
+            data['count'] = transactions.count() + (archived[0].count() if archived is not None else 0)
+        else:
+            data['count'] = approximate_count(request.user)
+    return HttpResponse(api_rows.encode(data), content_type='application/json')
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def api_summary(request):
-    summary = {
-        'total_income': Transaction.objects.filter(user=request.user, is_income=True).aggregate(Sum('amount'))['amount__sum'] or 0,
-        'total_expenses': Transaction.objects.filter(user=request.user, is_income=False).aggregate(Sum('amount'))['amount__sum'] or 0
+def api_sync_transactions(request):
+    """
+    Transactions changed and ids deleted since ``?since=<watermark>``. Repeat
+    with the returned watermark while ``has_more`` is true.
+    """
+    try:
+        page_size = min(int(request.query_params.get('page_size', API_SYNC_PAGE_SIZE)), API_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({'detail': 'page_size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    if page_size < 1:
+        return Response({'detail': 'page_size must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        page = sync.changes_since(request.user, request.query_params.get('since'), page_size)
+    except sync.InvalidWatermark as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'changed': TransactionSerializer(page.changed, many=True).data,
+        'deleted': page.deleted,
+        'watermark': page.watermark,
+        'has_more': page.has_more,
+        'reset': page.reset,
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def api_transaction_search(request):
+    """
+    Transactions whose description matches ?q=, best match first, a page
+    (?page=) at a time. Takes the same ?fields= and filters as
+    api_transactions; see search.py for the query syntax.
+    """
+    try:
+        page_size = min(int(request.query_params.get('page_size', search.DEFAULT_PAGE_SIZE)), API_MAX_PAGE_SIZE)
+        page_number = int(request.query_params.get('page', 1))
+    except ValueError:
+        return Response({'detail': 'page and page_size must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    if page_size < 1:
+        return Response({'detail': 'page_size must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        fields = api_rows.parse_fields(request.query_params.get('fields'))
+        transactions = api_rows.filter_transactions(
+            Transaction.objects.filter(user=request.user), request.query_params
+        )
+        columns = api_rows.columns_for(fields)
+        page = search.search(
+            request.user, request.query_params.get('q'), transactions, page_number, page_size, fields=columns
+        )
+    except (api_rows.InvalidQuery, search.InvalidSearch) as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    url = request.build_absolute_uri()
+    data = {
+        'next': replace_query_param(url, 'page', page.number + 1) if page.has_next else None,
+        'previous': replace_query_param(url, 'page', page.number - 1) if page.has_previous else None,
+        'results': api_rows.to_dicts(request.user, page.items, fields, columns),
     }
-    return Response(summary)
+    return HttpResponse(api_rows.encode(data), content_type='application/json')
+
+@api_view(['POST', 'PATCH', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def api_transactions_bulk(request):
+    """
+    POST a list of transactions to create, PATCH a list of partial updates
+    with ids, or DELETE a list of ids. Items that fail validation are
+    returned in ``errors`` with their index; the rest are written.
+    """
+    items = request.data
+    if request.method == 'DELETE' and isinstance(items, dict):
+        items = items.get('ids')
+    if not isinstance(items, list):
+        return Response({'detail': 'Expected a list of items'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = getattr(settings, 'API_BULK_MAX_ITEMS', 500)
+    if len(items) > limit:
+        return Response({'detail': f'At most {limit} items per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if request.method == 'DELETE':
+        result = bulk_writes.delete(request.user, items)
+        return Response({'deleted': result.objects, 'errors': result.errors})
+    if request.method == 'POST':
+        result = bulk_writes.create(request.user, items)
+        key = 'created'
+    else:
+        result = bulk_writes.update(request.user, items)
+        key = 'updated'
+    return Response({key: TransactionSerializer(result.objects, many=True).data, 'errors': result.errors})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def api_summary(request):
+    def build_summary():
+        total_income, total_expenses = rollups.totals_by_type(request.user)
+        return {
+            'total_income': total_income,
+            'total_expenses': total_expenses
+        }
+
+    return Response(user_cache.cached(request.user.pk, 'summary', build_summary))
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def api_forecast(request):
+    """Projected end-of-period spending of the current budgets and of each category this month"""
+    return Response(forecasting.forecast(request.user).as_dict())
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def api_notifications(request):
+    """
+    GET: the unread count and the latest notifications (?unread=true for
+    unread ones only, ?limit= how many). POST: mark the notifications in
+    ``ids`` as read, or all of them without ``ids``.
+    """
+    notifications = Notification.objects.filter(user=request.user)
+    if request.method == 'POST':
+        unread = notifications.filter(read_at__isnull=True)
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+                return Response({'detail': 'ids must be a list of integers'}, status=status.HTTP_400_BAD_REQUEST)
+            unread = unread.filter(pk__in=ids)
+        return Response({'marked_read': unread.update(read_at=timezone.now())})
+
+    try:
+        limit = min(int(request.query_params.get('limit', 20)), API_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({'detail': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    if limit < 1:
+        return Response({'detail': 'limit must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+    unread_count = notifications.filter(read_at__isnull=True).count()
+    if request.query_params.get('unread', '').lower() in ('1', 'true', 'yes'):
+        notifications = notifications.filter(read_at__isnull=True)
+    return Response({
+        'unread': unread_count,
+        'results': list(notifications.values(
+            'id', 'kind', 'message', 'budget_id', 'threshold', 'created_at', 'read_at'
+        )[:limit]),
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def api_cache_stats(request):
+    return Response(user_cache.stats())
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def api_request_metrics(request):
+    """
+    Per-view timings from this process's request buffer. ?recent=N adds the
+    last N requests and ?profiles=1 the cProfile stats of the slowest
+    sampled ones; DELETE clears the buffer.
+    """
+    if request.method == 'DELETE':
+        instrumentation.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    data = instrumentation.summary()
+    try:
+        recent = int(request.query_params.get('recent', 0))
+    except ValueError:
+        return Response({'detail': 'recent must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    if recent > 0:
+        data['recent'] = instrumentation.recent(recent)
+    if request.query_params.get('profiles') in ('1', 'true'):
+        data['profiles'] = instrumentation.profiles()
+    return Response(data)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def api_report_status(request, pk):
+    report = get_object_or_404(Report, pk=pk, user=request.user)
+    return Response({
+        'id': report.pk,
+        'status': report.status,
+        'progress': report.progress,
+        'error': report.error,
+        'download_url': reverse('download_report', args=[report.pk]) if report.status == Report.DONE else None,
+    })
 
 # ============== Profile Views ==============
 @login_required